@@ -0,0 +1,275 @@
+"""
+Nucleo analitico del dashboard, importable sin Streamlit.
+
+Funciones puras (DataFrame de entrada -> resultado tipado) para cada calculo
+que hace `main.py`: limpieza, filtrado, metricas, estadisticas, ranking,
+agregacion del mapa, comparacion y contexto del AI Analyst. `main.py` solo
+las llama y pinta el resultado; el benchmark y los procesos batch las usan
+directamente.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from imputacion import Imputador
+from ingesta import CLAVE_NATURAL, detectar_duplicados, hash_filas
+from piramide import Piramide, es_agregado, es_total, tasas
+
+VARIABLES_COMPARACION = ["casos_100k", "letalidad_pct", "camas_por_100k", "avg_temp"]
+COLUMNAS_MAPA = ["ISO3", "country", "weekly_count", "population", "casos_100k", "letalidad_pct", "camas_por_100k"]
+
+
+@dataclass(frozen=True)
+class ResultadoLimpieza:
+    df: pd.DataFrame
+    filas_duplicadas: int
+    grupos_duplicados: pd.DataFrame
+    iso_imputados: int
+
+
+@dataclass(frozen=True)
+class MetricasResumen:
+    letalidad_media: float
+    incidencia_media: float
+    temperatura_media: float
+    paises: int
+
+
+# --- ETL ---
+def columnas_numericas(df: pd.DataFrame) -> pd.Index:
+    return df.select_dtypes(include=[np.number]).columns
+
+
+def quitar_duplicados(df: pd.DataFrame, hashes: Optional[np.ndarray] = None,
+                      por_clave: bool = True) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Elimina duplicados (por clave natural o fila exacta); devuelve (df, grupos)."""
+    columnas = CLAVE_NATURAL if por_clave else None
+    if hashes is None:
+        hashes = hash_filas(df, columnas)
+    mascara, grupos = detectar_duplicados(df, hashes, columnas)
+    return df[mascara], grupos
+
+
+def imputar_iso(df: pd.DataFrame, valor: str = "UNK") -> tuple[pd.DataFrame, int]:
+    # Los agregados "(total)" no tienen ISO3 propio: con "UNK" todos pasarian
+    # a ser la misma serie
+    nulos = df["ISO3"].isnull().to_numpy() & ~es_total(df)
+    return df.assign(ISO3=df["ISO3"].mask(nulos, valor)), int(nulos.sum())
+
+
+def limpiar(df: pd.DataFrame, duplicados: Optional[str] = "clave", iso: bool = True,
+            metodo_nulos: str = "Ninguno") -> ResultadoLimpieza:
+    """Pipeline de limpieza completo con las mismas opciones del sidebar."""
+    grupos = pd.DataFrame()
+    filas = len(df)
+    if duplicados:
+        df, grupos = quitar_duplicados(df, por_clave=duplicados == "clave")
+    iso_imputados = 0
+    if iso:
+        df, iso_imputados = imputar_iso(df)
+    if metodo_nulos != "Ninguno":
+        df = Imputador(df).aplicar(metodo_nulos)
+    return ResultadoLimpieza(df, filas - len(df), grupos, iso_imputados)
+
+
+def filtrar(df: pd.DataFrame, indicador: str, continentes: Iterable[str]) -> pd.DataFrame:
+    return df[(df["indicator"] == indicador) & (df["continent"].isin(list(continentes)))]
+
+
+# --- Analisis cuantitativo ---
+def metricas_resumen(df: pd.DataFrame, piramide: Optional[Piramide] = None) -> MetricasResumen:
+    """Medias semanales del nivel mundo de la jerarquia (ponderadas por poblacion)."""
+    if piramide is None:
+        piramide = Piramide(df)
+    mundo = piramide.mundo("semana")
+    return MetricasResumen(
+        letalidad_media=float(mundo["letalidad_pct"].mean()),
+        incidencia_media=float(mundo["casos_100k"].mean()),
+        temperatura_media=float(mundo["avg_temp"].mean()),
+        paises=int(piramide.paises("semana")["country"].nunique()),
+    )
+
+
+def estadisticas_descriptivas(df: pd.DataFrame, num_cols: Sequence[str]) -> pd.DataFrame:
+    stats_df = df[num_cols].describe().T
+    stats_df = stats_df[["mean", "std", "min", "25%", "50%", "75%", "max"]]
+    stats_df.columns = ["Media", "Desv.Est", "Min", "Q1", "Mediana", "Q3", "Max"]
+    return stats_df
+
+
+def matriz_correlacion(df: pd.DataFrame, num_cols: Sequence[str],
+                       continente: Optional[str] = None) -> pd.DataFrame:
+    if continente is not None:
+        return df.loc[df["continent"] == continente, num_cols].corr()
+    return df[num_cols].corr()
+
+
+# --- Visualizaciones ---
+def preparar_viz(df: pd.DataFrame) -> pd.DataFrame:
+    """Vista con `size_ref` (tamaño de burbuja > 0 para Plotly), sin copiar el resto."""
+    camas = df["camas_por_100k"].fillna(0)
+    return df.assign(size_ref=np.where(camas > 0, camas, 0.1))
+
+
+def serie_temporal(df: pd.DataFrame, paises: Sequence[str], variable: str,
+                   time_col: str = "date") -> pd.DataFrame:
+    return df.loc[df["country"].isin(paises), [time_col, variable, "country"]].sort_values(time_col)
+
+
+def ranking_paises(df: pd.DataFrame, variable: str, n: int = 10,
+                   ascendente: bool = False) -> pd.DataFrame:
+    ranking = df.groupby("country")[variable].mean().reset_index()
+    return ranking.sort_values(variable, ascending=ascendente).head(n)
+
+
+def agregacion_mapa(variable: str) -> dict:
+    # conteos y poblacion para recalcular las tasas (`tasas_mapa`), no sumarlas
+    return {
+        "weekly_count": "sum",
+        "population": "max",
+        variable: "mean",
+    }
+
+
+def tasas_mapa(df_map: pd.DataFrame, variable: str) -> pd.DataFrame:
+    """casos_100k/letalidad_pct del pais desde sus conteos agregados."""
+    df_map = tasas(df_map)
+    columnas = [c for c in df_map.columns if c not in ("weekly_count", "population")]
+    return df_map[list(dict.fromkeys([*columnas, variable]))]
+
+
+def agregar_mapa(df: pd.DataFrame, fecha, variable: str) -> pd.DataFrame:
+    """Una fila por pais para la fecha del slider del mapa."""
+    df_fecha = df.loc[df["date"] == fecha, COLUMNAS_MAPA]
+    df_map = df_fecha.groupby(["ISO3", "country"]).agg(agregacion_mapa(variable)).reset_index()
+    return tasas_mapa(df_map, variable)
+
+
+def agregar_mapa_por_fecha(df: pd.DataFrame, variable: str) -> pd.DataFrame:
+    """`agregar_mapa` para todas las fechas en un solo groupby (reportes batch)."""
+    df_map = (
+        df[["date", *COLUMNAS_MAPA]]
+        .groupby(["date", "ISO3", "country"])
+        .agg(agregacion_mapa(variable))
+        .reset_index()
+        .sort_values("date")
+    )
+    return tasas_mapa(df_map, variable)
+
+
+def unir_geometrias(world, df_map: pd.DataFrame):
+    """Left join del GeoDataFrame de paises con la agregacion del mapa."""
+    return world.merge(df_map, left_on="ISO3166-1-Alpha-3", right_on="ISO3", how="left")
+
+
+class IndicePaises:
+    """
+    ISO3 -> rango de filas del dataset ordenado por pais. Seleccionar paises
+    (seleccion cruzada del mapa/scatter) cuesta O(filas de esos paises) en vez
+    de recorrer la tabla completa con una mascara. Los agregados "(total)" y
+    el ISO3 imputado "UNK" no son un pais seleccionable y quedan fuera.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        # codigo -1 (al principio del orden) para las filas fuera del indice
+        fuera = es_agregado(df) | (df["ISO3"] == "UNK").to_numpy()
+        codigos, isos = pd.factorize(df["ISO3"].mask(fuera))
+        self._orden = np.argsort(codigos, kind="stable")
+        limites = np.searchsorted(codigos[self._orden], np.arange(len(isos) + 1))
+        self._rangos = {iso: (limites[i], limites[i + 1]) for i, iso in enumerate(isos)}
+        primeras = self._orden[limites[:-1]]
+        self.pais_por_iso = dict(zip(isos, df["country"].to_numpy()[primeras]))
+        self.iso_por_pais = {pais: iso for iso, pais in self.pais_por_iso.items()}
+
+    def posiciones(self, isos: Iterable[str]) -> np.ndarray:
+        tramos = [self._orden[slice(*self._rangos[iso])] for iso in isos if iso in self._rangos]
+        if not tramos:
+            return np.empty(0, dtype=np.intp)
+        # orden original del dataset (las series quedan ordenadas por fecha)
+        return np.sort(np.concatenate(tramos))
+
+    def filas(self, isos: Iterable[str]) -> pd.DataFrame:
+        return self.df.iloc[self.posiciones(isos)]
+
+    def paises(self, isos: Iterable[str]) -> list[str]:
+        return [self.pais_por_iso[iso] for iso in isos if iso in self.pais_por_iso]
+
+
+def comparar_paises(df: pd.DataFrame, paises: Sequence[str],
+                    variables: Sequence[str] = VARIABLES_COMPARACION) -> pd.DataFrame:
+    df_compare = df.loc[df["country"].isin(paises), ["country", *variables]]
+    return df_compare.groupby("country").mean().reset_index()
+
+
+# --- AI Analyst ---
+def construir_contexto_ia(df_final: pd.DataFrame, indicador: str) -> str:
+    # Preparar contexto rico del dataset
+    resumen_estadistico = df_final.describe().to_string()
+    columnas_disponibles = ", ".join(df_final.columns.tolist())
+    total_registros = len(df_final)
+    continentes_unicos = ", ".join(df_final['continent'].unique().tolist())
+    paises_unicos = df_final['country'].nunique()
+
+    # Calcular algunas métricas clave
+    letalidad_max = df_final['letalidad_pct'].max()
+    letalidad_min = df_final['letalidad_pct'].min()
+    casos_max = df_final['casos_100k'].max()
+
+    # Contexto del sistema para la IA
+    contexto_sistema = f"""
+Eres un analista de datos senior especializado en epidemiología y salud pública global.
+Tienes acceso a un dataset completo de COVID-19 con las siguientes características:
+
+📋 INFORMACIÓN GENERAL:
+- Total de registros: {total_registros:,}
+- Países únicos: {paises_unicos}
+- Continentes: {continentes_unicos}
+- Indicador actual filtrado: {indicador}
+
+📊 VARIABLES DISPONIBLES:
+{columnas_disponibles}
+
+📈 ESTADÍSTICAS DESCRIPTIVAS COMPLETAS:
+{resumen_estadistico}
+
+🔑 DEFINICIONES DE VARIABLES CLAVE:
+- casos_100k: Tasa de incidencia por cada 100,000 habitantes
+- camas_por_100k: Capacidad hospitalaria instalada por cada 100,000 habitantes
+- letalidad_pct: Porcentaje de fallecimientos respecto a la población
+- avg_temp: Temperatura promedio mensual del país (°C)
+
+📌 DATOS DESTACADOS:
+- Letalidad máxima registrada: {letalidad_max:.4f}%
+- Letalidad mínima registrada: {letalidad_min:.4f}%
+- Tasa de casos más alta: {casos_max:.2f} por 100k habitantes
+
+INSTRUCCIONES DE RESPUESTA:
+1. Sé específico y usa datos reales del dataset cuando sea relevante
+2. Si mencionas números, cítalos correctamente de las estadísticas
+3. Mantén un tono profesional pero accesible
+4. Si detectas patrones interesantes, mencionálos
+5. Ofrece insights accionables cuando sea apropiado
+6. Usa emojis ocasionalmente para hacer las respuestas más amigables
+7. Si no tienes información suficiente, sé honesto al respecto
+8. Para rankings, correlaciones, series de un país o agregados por continente
+   usa SIEMPRE las herramientas disponibles en lugar de estimar desde el resumen
+"""
+    return contexto_sistema
+
+
+def contexto_seleccion(df_seleccion: pd.DataFrame, paises: Sequence[str]) -> str:
+    """Bloque extra del prompt cuando hay paises seleccionados en el mapa o el scatter."""
+    resumen = df_seleccion[VARIABLES_COMPARACION].describe().to_string()
+    return f"""
+🎯 SELECCIÓN ACTIVA EN EL DASHBOARD:
+El usuario seleccionó en el mapa o en el gráfico de dispersión: {", ".join(paises)}.
+Prioriza estos países en tus respuestas salvo que pregunte explícitamente por otros.
+
+📈 ESTADÍSTICAS DE LA SELECCIÓN:
+{resumen}
+"""
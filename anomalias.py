@@ -0,0 +1,113 @@
+"""
+Deteccion de semanas anomalas (posibles brotes) por pais e indicador.
+
+Se calcula una sola vez al ingerir el dataset y queda guardada junto a el (en
+el registro del modo en memoria, o como `_anomalias.parquet` dentro del
+almacen por bloques), asi que los graficos solo filtran marcas ya hechas.
+
+Para cada serie semanal se compara cada semana contra la ventana de
+`VENTANA` semanas previas (sin incluirla): z robusto = (x - mediana) / escala,
+con la escala del rango intercuartil. Se marca:
+  - conteo: z de `weekly_count` > `UMBRAL_Z`
+  - tasa: z de `rate_14_day` > `UMBRAL_Z`
+  - crecimiento: salto en el crecimiento semanal (log) respecto a su propia
+    ventana, con al menos `UMBRAL_CRECIMIENTO` de aumento
+Todo son operaciones rolling agrupadas de pandas, sin bucles por pais.
+"""
+import numpy as np
+import pandas as pd
+
+from piramide import NIVELES
+
+SERIE = ["ISO3", "indicator"]
+COLUMNAS_ENTRADA = ["ISO3", "indicator", "country", "continent", "date", "weekly_count", "rate_14_day"]
+VENTANA = 8
+MIN_SEMANAS = 4
+UMBRAL_Z = 3.5
+UMBRAL_CRECIMIENTO = 0.5  # +50 % respecto a la semana anterior
+MIN_CONTEO = 10  # por debajo, un salto de 1 a 5 casos no es un brote
+IQR_A_SIGMA = 1.349
+MOTIVOS = {"anomalia_conteo": "conteo", "anomalia_tasa": "tasa 14d", "quiebre_crecimiento": "crecimiento"}
+
+
+def _z_robusto(valores, grupo):
+    """z de cada semana contra las `VENTANA` semanas previas de su serie."""
+    previos = valores.groupby(grupo, sort=False).shift(1)
+    ventana = previos.groupby(grupo, sort=False).rolling(VENTANA, min_periods=MIN_SEMANAS)
+    mediana = ventana.median().droplevel(0)
+    iqr = (ventana.quantile(0.75) - ventana.quantile(0.25)).droplevel(0)
+    # series planas: la escala no baja del 10 % de la mediana (sin escala, sin z)
+    escala = np.fmax(iqr / IQR_A_SIGMA, 0.1 * mediana.abs())
+    return (valores - mediana) / escala.where(escala > 0)
+
+
+def detectar(df):
+    """Una fila por (ISO3, indicator, date) con los z, las marcas y la puntuacion."""
+    columnas = [c for c in COLUMNAS_ENTRADA if c in df.columns]
+    # duplicados de la clave natural (aun sin limpiar) cuentan una vez
+    semanas = df[columnas].dropna(subset=["date"]).groupby([*SERIE, "date"], sort=True, observed=True).agg(
+        **{c: (c, "first") for c in ("country", "continent") if c in columnas},
+        **{c: (c, "max") for c in ("weekly_count", "rate_14_day") if c in columnas},
+    ).reset_index()
+    grupo = semanas.groupby(SERIE, sort=False).ngroup()
+
+    conteo = semanas["weekly_count"].astype("float64")
+    semanas["z_conteo"] = _z_robusto(conteo, grupo)
+    semanas["anomalia_conteo"] = (semanas["z_conteo"] > UMBRAL_Z) & (conteo >= MIN_CONTEO)
+
+    if "rate_14_day" in semanas.columns:
+        semanas["z_tasa"] = _z_robusto(semanas["rate_14_day"].astype("float64"), grupo)
+        semanas["anomalia_tasa"] = (semanas["z_tasa"] > UMBRAL_Z) & (conteo >= MIN_CONTEO)
+    else:
+        semanas["z_tasa"] = np.nan
+        semanas["anomalia_tasa"] = False
+
+    anterior = conteo.groupby(grupo, sort=False).shift(1)
+    semanas["crecimiento"] = conteo / anterior.where(anterior > 0) - 1
+    log_crecimiento = np.log1p(conteo.clip(lower=0)) - np.log1p(anterior.clip(lower=0))
+    semanas["z_crecimiento"] = _z_robusto(log_crecimiento, grupo)
+    semanas["quiebre_crecimiento"] = (
+        (semanas["z_crecimiento"] > UMBRAL_Z)
+        & (semanas["crecimiento"] >= UMBRAL_CRECIMIENTO)
+        & (conteo >= MIN_CONTEO)
+    )
+
+    marcas = semanas[list(MOTIVOS)]
+    semanas["anomalia"] = marcas.any(axis=1)
+    z = semanas[["z_conteo", "z_tasa", "z_crecimiento"]].where(marcas.to_numpy())
+    semanas["puntuacion"] = z.max(axis=1).fillna(0.0)
+    return semanas
+
+
+def actualizar(previas, df, series):
+    """
+    Recalcula solo las `series` [(ISO3, indicator), ...] que trajo un anexo;
+    las demas conservan sus marcas.
+    """
+    tocadas = pd.MultiIndex.from_tuples(list(series), names=SERIE)
+    en_df = pd.MultiIndex.from_frame(df[SERIE]).isin(tocadas)
+    en_previas = pd.MultiIndex.from_frame(previas[SERIE]).isin(tocadas)
+    return pd.concat([previas[~en_previas], detectar(df[en_df])], ignore_index=True)
+
+
+def por_periodo(anomalias, nivel):
+    """Semanas anomalas con `date` llevada al inicio de su periodo del `nivel`."""
+    marcadas = anomalias[anomalias["anomalia"]]
+    if NIVELES[nivel] is not None:
+        marcadas = marcadas.assign(date=marcadas["date"].dt.to_period(NIVELES[nivel]).dt.start_time)
+    return marcadas
+
+
+def paises_en_periodo(anomalias, fecha, nivel):
+    """ISO3 con al menos una semana anomala en el periodo que empieza en `fecha`."""
+    marcadas = por_periodo(anomalias, nivel)
+    return set(marcadas.loc[marcadas["date"] == pd.Timestamp(fecha), "ISO3"])
+
+
+def alertas(anomalias, n=20):
+    """Las `n` semanas anomalas de mayor puntuacion, con el motivo legible."""
+    tabla = anomalias[anomalias["anomalia"]].nlargest(n, "puntuacion")
+    partes = [np.where(tabla[columna], etiqueta, "") for columna, etiqueta in MOTIVOS.items()]
+    tabla = tabla.assign(motivo=[" · ".join(p for p in fila if p) for fila in zip(*partes)])
+    columnas = ["country", "ISO3", "date", "weekly_count", "crecimiento", "puntuacion", "motivo"]
+    return tabla[[c for c in columnas if c in tabla.columns]].reset_index(drop=True)
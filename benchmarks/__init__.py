@@ -0,0 +1 @@
+"""Benchmarks de escalabilidad del dashboard (`python -m benchmarks`)."""
@@ -0,0 +1,153 @@
+"""
+Benchmark de punta a punta del pipeline del dashboard.
+
+Uso (desde la raiz del repo):
+
+    python -m benchmarks                       # factores 1, 10, 100 y 1000
+    python -m benchmarks --factores 1 10 -r 5
+    python -m benchmarks --motor ambos         # pandas vs. DuckDB
+
+Genera (o reutiliza) los CSV escalados en benchmarks/datos/, mide cada etapa
+y guarda un reporte JSON en benchmarks/resultados/.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks import importtime
+import motor_duckdb
+from benchmarks.etapas import ETAPAS, MOTORES
+from benchmarks.generador import generar_csv
+
+DIR_RESULTADOS = os.path.join("benchmarks", "resultados")
+
+
+def medir_factor(ruta, repeticiones, etapas=ETAPAS):
+    """Ejecuta todas las etapas `repeticiones` veces y resume tiempos por etapa."""
+    tiempos = {nombre: {"wall": [], "cpu": []} for nombre, _ in etapas}
+    omitidas = {}
+    ctx = {}
+    for _ in range(repeticiones):
+        ctx = {"ruta": ruta, **({"world": ctx["world"]} if "world" in ctx else {})}
+        for nombre, etapa in etapas:
+            if nombre in omitidas:
+                continue
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                etapa(ctx)
+            except (ImportError, FileNotFoundError) as e:
+                omitidas[nombre] = f"{type(e).__name__}: {e}"
+                continue
+            tiempos[nombre]["wall"].append(time.perf_counter() - wall)
+            tiempos[nombre]["cpu"].append(time.process_time() - cpu)
+
+    etapas = {}
+    for nombre, t in tiempos.items():
+        if nombre in omitidas:
+            etapas[nombre] = {"omitida": omitidas[nombre]}
+            continue
+        etapas[nombre] = {
+            "wall_s": round(statistics.median(t["wall"]), 6),
+            "wall_min_s": round(min(t["wall"]), 6),
+            "cpu_s": round(statistics.median(t["cpu"]), 6),
+        }
+    return {
+        "filas": int(len(ctx["df_raw"])),
+        "filas_final": int(len(ctx["df_final"])),
+        "bytes_csv": os.path.getsize(ruta),
+        "bytes_memoria": int(ctx["df_raw"].memory_usage(deep=True).sum()),
+        "etapas": etapas,
+        "total_s": round(sum(e.get("wall_s", 0) for e in etapas.values()), 6),
+    }
+
+
+def imprimir(resultados):
+    nombres = [n for n, _ in ETAPAS]
+    print(f"{'factor':>7} {'motor':>7} {'filas':>11} " + " ".join(f"{n[:14]:>14}" for n in nombres))
+    for r in resultados:
+        celdas = [
+            f"{r['etapas'][n]['wall_s']:>14.4f}" if "wall_s" in r["etapas"][n] else f"{'-':>14}"
+            for n in nombres
+        ]
+        print(f"{r['factor']:>7} {r['motor']:>7} {r['filas']:>11,} " + " ".join(celdas))
+
+
+def comparar_motores(resultados):
+    """pandas / duckdb por etapa y factor (> 1: DuckDB mas rapido)."""
+    por_factor = {}
+    for r in resultados:
+        por_factor.setdefault(r["factor"], {})[r["motor"]] = r["etapas"]
+    comparacion = {}
+    for factor, motores in por_factor.items():
+        if {"pandas", "duckdb"} <= motores.keys():
+            comparacion[factor] = {
+                nombre: round(etapa["wall_s"] / motores["duckdb"][nombre]["wall_s"], 2)
+                for nombre, etapa in motores["pandas"].items()
+                if "wall_s" in etapa and motores["duckdb"][nombre].get("wall_s")
+            }
+    return comparacion
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factores", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("-r", "--repeticiones", type=int, default=3)
+    parser.add_argument("-o", "--salida", help="ruta del reporte JSON")
+    parser.add_argument("--motor", choices=["pandas", "duckdb", "ambos"], default="pandas",
+                        help="camino de filtros/agregaciones a medir")
+    parser.add_argument("--sin-importtime", action="store_true",
+                        help="omite el reporte de tiempos de importacion")
+    args = parser.parse_args(argv)
+
+    motores = ["pandas", "duckdb"] if args.motor == "ambos" else [args.motor]
+    if "duckdb" in motores and not motor_duckdb.disponible():
+        print("duckdb no esta instalado: se mide solo pandas", file=sys.stderr)
+        motores = ["pandas"]
+
+    resultados = []
+    for factor in args.factores:
+        inicio = time.perf_counter()
+        ruta = generar_csv(factor)
+        print(f"x{factor}: datos listos en {time.perf_counter() - inicio:.1f} s ({ruta})", file=sys.stderr)
+        for motor in motores:
+            resultados.append({"factor": factor, "motor": motor,
+                               **medir_factor(ruta, args.repeticiones, MOTORES[motor])})
+
+    reporte = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entorno": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    if len(motores) > 1:
+        reporte["pandas_vs_duckdb"] = comparar_motores(resultados)
+    if not args.sin_importtime:
+        reporte["importtime"] = importtime.reporte()
+    salida = args.salida or os.path.join(DIR_RESULTADOS, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+    imprimir(resultados)
+    for factor, ratios in reporte.get("pandas_vs_duckdb", {}).items():
+        print(f"x{factor} pandas/duckdb: " + ", ".join(f"{n} {v}x" for n, v in ratios.items()))
+    if "importtime" in reporte:
+        for grupo, datos in reporte["importtime"].items():
+            print(f"importacion {grupo}: {datos['total_ms']} ms")
+    print(f"\nReporte: {salida}")
+
+
+if __name__ == "__main__":
+    main()
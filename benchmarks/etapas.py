@@ -0,0 +1,110 @@
+"""
+Etapas del pipeline del dashboard, ejecutadas sin Streamlit.
+
+Cada etapa recibe y completa un diccionario de contexto llamando al nucleo
+`analitica` con los valores por defecto de los widgets de `main.py`.
+`ETAPAS_DUCKDB` reemplaza filtro y agregaciones por el motor SQL opcional
+(`motor_duckdb`), con los mismos nombres de etapa para compararlos.
+"""
+import os
+
+import analitica
+import geometrias
+from herramientas_ia import HerramientasAnalista
+from ingesta import leer_csv
+
+RUTA_GEOJSON = geometrias.RUTA_GEOJSON
+
+
+def ingesta(ctx):
+    ctx["df_raw"] = leer_csv(ctx["ruta"])
+
+
+def limpieza(ctx):
+    resultado = analitica.limpiar(ctx["df_raw"], duplicados="clave", iso=True, metodo_nulos="Media por Pais")
+    ctx["df_clean"] = resultado.df
+    ctx["num_cols"] = analitica.columnas_numericas(resultado.df)
+
+
+def filtrado(ctx):
+    df = ctx["df_clean"]
+    ctx["df_final"] = analitica.filtrar(df, df["indicator"].iloc[0], df["continent"].unique())
+
+
+def describe_corr(ctx):
+    ctx["stats"] = analitica.estadisticas_descriptivas(ctx["df_final"], ctx["num_cols"])
+    ctx["corr"] = analitica.matriz_correlacion(ctx["df_final"], ctx["num_cols"])
+
+
+def ranking(ctx):
+    ctx["ranking"] = analitica.ranking_paises(ctx["df_final"], "letalidad_pct", 10)
+
+
+def agregacion_mapa(ctx):
+    df = ctx["df_final"]
+    ctx["df_map"] = analitica.agregar_mapa(df, df["date"].max(), "camas_por_100k")
+
+
+def merge_geojson(ctx):
+    if "world" not in ctx:
+        if not os.path.exists(RUTA_GEOJSON) and not os.path.exists(geometrias.RUTA_BINARIA):
+            raise FileNotFoundError(RUTA_GEOJSON)
+        ctx["world"] = geometrias.cargar()
+    gdf = analitica.unir_geometrias(ctx["world"], ctx["df_map"])
+    ctx["geojson_bytes"] = len(gdf.to_json())
+
+
+def contexto_llm(ctx):
+    ctx["contexto"] = analitica.construir_contexto_ia(ctx["df_final"], ctx["df_final"]["indicator"].iloc[0])
+    ctx["herramientas"] = HerramientasAnalista(ctx["df_final"])
+
+
+# Orden de ejecucion (cada etapa depende de las anteriores)
+ETAPAS = [
+    ("ingesta", ingesta),
+    ("limpieza", limpieza),
+    ("filtrado", filtrado),
+    ("describe_corr", describe_corr),
+    ("ranking", ranking),
+    ("agregacion_mapa", agregacion_mapa),
+    ("merge_geojson", merge_geojson),
+    ("contexto_llm", contexto_llm),
+]
+
+
+# --- Variante DuckDB ---
+def _motor(ctx):
+    if "motor" not in ctx:
+        from motor_duckdb import MotorDuckDB
+        ctx["motor"] = MotorDuckDB(ctx["df_clean"])
+    return ctx["motor"]
+
+
+def filtrado_duckdb(ctx):
+    df = ctx["df_clean"]
+    ctx["filtro"] = (df["indicator"].iloc[0], df["continent"].unique().tolist())
+    ctx["df_final"] = _motor(ctx).filtrar(*ctx["filtro"])
+
+
+def describe_corr_duckdb(ctx):
+    ctx["stats"] = analitica.estadisticas_descriptivas(ctx["df_final"], ctx["num_cols"])
+    ctx["corr"] = _motor(ctx).matriz_correlacion(*ctx["filtro"], ctx["num_cols"])
+
+
+def ranking_duckdb(ctx):
+    ctx["ranking"] = _motor(ctx).ranking_paises(*ctx["filtro"], "letalidad_pct", 10)
+
+
+def agregacion_mapa_duckdb(ctx):
+    fecha = ctx["df_final"]["date"].max()
+    ctx["df_map"] = _motor(ctx).agregar_mapa(*ctx["filtro"], fecha, "camas_por_100k")
+
+
+_VARIANTES_DUCKDB = {
+    "filtrado": filtrado_duckdb,
+    "describe_corr": describe_corr_duckdb,
+    "ranking": ranking_duckdb,
+    "agregacion_mapa": agregacion_mapa_duckdb,
+}
+ETAPAS_DUCKDB = [(nombre, _VARIANTES_DUCKDB.get(nombre, etapa)) for nombre, etapa in ETAPAS]
+MOTORES = {"pandas": ETAPAS, "duckdb": ETAPAS_DUCKDB}
@@ -0,0 +1,84 @@
+"""
+Generador sintetico: escala `bd_final_eafit.csv` a N veces sus filas.
+
+El factor se reparte entre mas paises (copias con otro nombre/ISO3), mas
+semanas (la serie se prolonga desplazando las fechas) y mas indicadores. Los
+valores se perturban con ruido log-normal y se inyectan duplicados exactos y
+nulos en ISO3 para que la etapa de limpieza tenga trabajo real. El CSV se
+escribe por partes, sin tener el resultado completo en memoria.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+RUTA_BASE = "bd_final_eafit.csv"
+DIR_DATOS = os.path.join("benchmarks", "datos")
+
+FRACCION_DUPLICADOS = 0.005
+FRACCION_NULOS_ISO = 0.001
+
+
+def reparto(factor):
+    """(paises, semanas, indicadores) cuyo producto es `factor`."""
+    indicadores = 2 if factor >= 100 else 1
+    semanas = 2 if factor >= 10 else 1
+    paises = max(1, round(factor / (indicadores * semanas)))
+    return paises, semanas, indicadores
+
+
+def _replica(base, c, w, i, span, rng):
+    df = base.copy()
+    if c:
+        df["country"] = df["country"] + f" {c}"
+        df["ISO3"] = df["ISO3"] + str(c)
+    if i:
+        df["indicator"] = df["indicator"] + f"_{i}"
+    if w:
+        fechas = df["date"] + w * span
+        df["date"] = fechas
+        df["year_week"] = fechas.dt.strftime("%G-%V")
+        df["month_name"] = fechas.dt.strftime("%b")
+        df["cumulative_count"] = df["cumulative_count"] + w * df.groupby("country")["cumulative_count"].transform("max")
+
+    ruido = rng.lognormal(0.0, 0.05, size=len(df))
+    df["weekly_count"] = np.round(df["weekly_count"] * ruido)
+    df["rate_14_day"] = df["rate_14_day"] * ruido
+    df["avg_temp"] = df["avg_temp"] + rng.normal(0.0, 0.5, size=len(df))
+    df["casos_100k"] = df["weekly_count"] / df["population"] * 100_000
+    df["letalidad_pct"] = df["weekly_count"] / df["population"] * 100
+
+    nulos = rng.random(len(df)) < FRACCION_NULOS_ISO
+    df.loc[nulos, "ISO3"] = np.nan
+    duplicados = df.sample(frac=FRACCION_DUPLICADOS, random_state=int(rng.integers(1 << 31)))
+    return pd.concat([df, duplicados], ignore_index=True)
+
+
+def generar_csv(factor, destino=None, base=RUTA_BASE, semilla=0):
+    """Escribe (si no existe) el CSV escalado `factor` veces y devuelve su ruta."""
+    destino = destino or os.path.join(DIR_DATOS, f"bd_x{factor}.csv")
+    if os.path.exists(destino):
+        return destino
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+    df = pd.read_csv(base, parse_dates=["date"])
+    if factor == 1:
+        df.to_csv(destino, index=False, date_format="%Y-%m-%d")
+        return destino
+
+    rng = np.random.default_rng(semilla)
+    span = (df["date"].max() - df["date"].min()) + pd.Timedelta(days=7)
+    paises, semanas, indicadores = reparto(factor)
+
+    temporal = destino + ".tmp"
+    primero = True
+    for c in range(paises):
+        for w in range(semanas):
+            for i in range(indicadores):
+                _replica(df, c, w, i, span, rng).to_csv(
+                    temporal, mode="w" if primero else "a", header=primero,
+                    index=False, date_format="%Y-%m-%d",
+                )
+                primero = False
+    os.replace(temporal, destino)
+    return destino
@@ -0,0 +1,95 @@
+"""
+Tiempo de importacion de los modulos del dashboard (`python -X importtime`).
+
+Cada modulo se importa en un interprete nuevo y se toma su tiempo acumulado,
+separando lo que `main.py` carga antes de la bienvenida (ARRANQUE) de lo que
+se difiere hasta que una seccion lo necesita (DIFERIDOS).
+"""
+import ast
+import os
+import subprocess
+import sys
+
+RUTA_MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def modulos_arranque(ruta=RUTA_MAIN):
+    """Modulos que `main.py` importa a nivel de modulo (los imports dentro de funciones se difieren)."""
+    with open(ruta, encoding="utf-8") as f:
+        arbol = ast.parse(f.read())
+    modulos = []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Import):
+            nombres = [alias.name for alias in nodo.names]
+        elif isinstance(nodo, ast.ImportFrom) and nodo.level == 0:
+            nombres = [nodo.module]
+        else:
+            continue
+        modulos.extend(n for n in nombres if n not in modulos)
+    return modulos
+
+
+# Derivado de main.py: no se desactualiza cuando se agregan modulos
+ARRANQUE = modulos_arranque()
+DIFERIDOS = [
+    "plotly.express", "plotly.graph_objects", "matplotlib.pyplot", "seaborn",
+    "geopandas", "folium", "streamlit_folium", "groq", "statsmodels.api",
+    "pyarrow.parquet", "duckdb",
+]
+
+
+def _parsear(stderr):
+    """Microsegundos acumulados de cada import de primer nivel (-X importtime)."""
+    tiempos = {}
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        partes = linea[len("import time:"):].split("|")
+        try:
+            acumulado = int(partes[1])
+        except ValueError:
+            continue  # encabezado
+        nombre = partes[2]
+        # los imports anidados vienen indentados; solo cuentan los de primer nivel
+        if len(nombre) - len(nombre.lstrip()) == 1:
+            tiempos[nombre.strip()] = acumulado
+    return tiempos
+
+
+def _importtime(codigo):
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True,
+    )
+    return None if proceso.returncode != 0 else _parsear(proceso.stderr)
+
+
+def medir(modulos):
+    """Importa `modulos` en un proceso nuevo; devuelve el total en ms (o None si falla)."""
+    tiempos = _importtime("; ".join(f"import {m}" for m in modulos))
+    if tiempos is None:
+        return None
+    # lo que el interprete importa al arrancar (site, encodings...) no cuenta
+    base = _importtime("pass") or {}
+    return round(sum(us for nombre, us in tiempos.items() if nombre not in base) / 1000, 1)
+
+
+def reporte():
+    resultado = {}
+    for grupo, modulos in (("arranque", ARRANQUE), ("diferidos", DIFERIDOS)):
+        detalle = {}
+        for modulo in modulos:
+            ms = medir([modulo])
+            detalle[modulo] = ms if ms is not None else {"error": "no importable"}
+        resultado[grupo] = {
+            "modulos_ms": detalle,
+            # juntos: las dependencias compartidas se cargan una sola vez
+            "total_ms": medir([m for m in modulos if isinstance(detalle[m], float)]),
+        }
+    return resultado
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(reporte(), indent=2))
@@ -0,0 +1,76 @@
+"""
+Cache LRU de figuras Plotly ya construidas y compactadas.
+
+Clave: (seccion, parametros de la seccion, huella del dataset). Al cambiar un
+widget solo se reconstruye la figura de su seccion; las demas se sirven del
+cache sin volver a agregar datos, armar la figura ni parsear JSON: se guarda
+el objeto `go.Figure` (de solo lectura una vez guardado) y su tamaño
+serializado, que es lo que cuenta para el tope. Es uno por proceso
+(compartido por las sesiones: la huella del dataset ya separa los datos) y
+se desalojan las figuras menos usadas cuando se pasa de `max_bytes`.
+"""
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = 128 * 2**20
+
+
+class CacheFiguras:
+    """Figuras con desalojo LRU por bytes serializados y aciertos por seccion."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.desalojos = 0
+        self._entradas = OrderedDict()
+        self._secciones = {}
+        self._lock = threading.Lock()
+
+    def _contador(self, seccion):
+        return self._secciones.setdefault(seccion, {"aciertos": 0, "fallos": 0})
+
+    def obtener(self, seccion, parametros, huella):
+        """(figura, bytes serializados), o None (y cuenta un fallo) si no esta en cache."""
+        clave = (seccion, parametros, huella)
+        with self._lock:
+            contador = self._contador(seccion)
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                contador["fallos"] += 1
+                return None
+            self._entradas.move_to_end(clave)
+            contador["aciertos"] += 1
+            return entrada
+
+    def guardar(self, seccion, parametros, huella, fig, nbytes):
+        """Guarda `fig` (no se modifica despues) con su tamaño serializado `nbytes`."""
+        if nbytes > self.max_bytes:
+            return
+        clave = (seccion, parametros, huella)
+        with self._lock:
+            previo = self._entradas.pop(clave, None)
+            if previo is not None:
+                self.bytes -= previo[1]
+            self._entradas[clave] = (fig, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, viejo) = self._entradas.popitem(last=False)
+                self.bytes -= viejo
+                self.desalojos += 1
+
+    def estadisticas(self):
+        """Por seccion: aciertos, fallos, tasa de acierto, figuras y KB en cache."""
+        with self._lock:
+            filas = {
+                seccion: {**contador, "figuras": 0, "kb": 0.0}
+                for seccion, contador in self._secciones.items()
+            }
+            for (seccion, _, _), (_, nbytes) in self._entradas.items():
+                fila = filas.setdefault(seccion, {"aciertos": 0, "fallos": 0, "figuras": 0, "kb": 0.0})
+                fila["figuras"] += 1
+                fila["kb"] += nbytes / 1024
+        for fila in filas.values():
+            total = fila["aciertos"] + fila["fallos"]
+            fila["tasa_pct"] = round(100 * fila["aciertos"] / total, 1) if total else 0.0
+            fila["kb"] = round(fila["kb"], 1)
+        return filas
@@ -0,0 +1,129 @@
+"""
+Generacion del chat en segundo plano.
+
+La llamada a Groq (rondas de herramientas + streaming) corre en un pool de
+hilos compartido por todo el proceso. El texto se va acumulando en un
+`TrabajoChat` que la sesion guarda en `st.session_state`; la UI lo consulta
+periodicamente y lo pinta de forma incremental, de modo que el script de
+Streamlit nunca queda bloqueado y un cambio de widget no corta la respuesta.
+
+La respuesta terminada la guarda el propio worker en el historial de la
+conversacion: si el navegador se desconecta antes de que la UI la lea, la
+pregunta no queda sin responder.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from herramientas_ia import resolver_herramientas
+
+# Respuestas generandose a la vez en todo el proceso (todas las sesiones)
+MAX_CONCURRENTES = 4
+
+EN_COLA = "en_cola"
+GENERANDO = "generando"
+LISTO = "listo"
+ERROR = "error"
+CANCELADO = "cancelado"
+
+
+class TrabajoChat:
+    """Buffer de una respuesta en curso, escrito por el worker y leido por la UI."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.estado = EN_COLA
+        self.error = None
+        self.llamadas = []
+        self.creado = time.time()
+        self._partes = []
+        self._lock = threading.Lock()
+        self._cancelado = threading.Event()
+
+    def agregar(self, texto):
+        with self._lock:
+            self._partes.append(texto)
+
+    def texto(self):
+        with self._lock:
+            return "".join(self._partes)
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    @property
+    def terminado(self):
+        return self.estado in (LISTO, ERROR, CANCELADO)
+
+
+class GestorChat:
+    """Pool acotado de workers de chat, unico por proceso (via st.cache_resource)."""
+
+    def __init__(self, max_concurrentes=MAX_CONCURRENTES):
+        self.max_concurrentes = max_concurrentes
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_concurrentes, thread_name_prefix="chat-groq"
+        )
+        self._activos = 0
+        self._lock = threading.Lock()
+
+    @property
+    def activos(self):
+        with self._lock:
+            return self._activos
+
+    def enviar(self, api_key, modelo, mensajes, herramientas, historial, conversacion, **params):
+        """Encola la respuesta; al terminar se guarda en `historial` bajo `conversacion`."""
+        trabajo = TrabajoChat()
+        self._pool.submit(
+            self._ejecutar, trabajo, api_key, modelo, mensajes, herramientas,
+            historial, conversacion, params
+        )
+        return trabajo
+
+    def _ejecutar(self, trabajo, api_key, modelo, mensajes, herramientas,
+                  historial, conversacion, params):
+        if trabajo.cancelado:
+            trabajo.estado = CANCELADO
+            return
+        with self._lock:
+            self._activos += 1
+        trabajo.estado = GENERANDO
+        try:
+            from groq import Groq  # diferido: solo se carga con la primera pregunta
+
+            client = Groq(api_key=api_key)
+            mensajes, respuesta, llamadas = resolver_herramientas(
+                client, modelo, mensajes, herramientas, **params
+            )
+            trabajo.llamadas = llamadas
+
+            if respuesta is not None:
+                trabajo.agregar(respuesta)
+            else:
+                stream = client.chat.completions.create(
+                    model=modelo, messages=mensajes, stream=True, **params
+                )
+                for chunk in stream:
+                    if trabajo.cancelado:
+                        break
+                    if chunk.choices[0].delta.content:
+                        trabajo.agregar(chunk.choices[0].delta.content)
+
+            if trabajo.cancelado:
+                trabajo.estado = CANCELADO
+            else:
+                # se guarda antes de marcarla lista: la UI la lee del historial
+                historial.agregar(conversacion, "assistant", trabajo.texto(), llamadas)
+                trabajo.estado = LISTO
+        except Exception as e:
+            trabajo.error = str(e)
+            trabajo.estado = ERROR
+        finally:
+            with self._lock:
+                self._activos -= 1
@@ -0,0 +1,126 @@
+"""
+Capa de paises en formato binario columnar (Arrow IPC / Feather v2 con WKB).
+
+`countries.geojson` se parsea como texto (fiona) cada vez que se carga. Se
+convierte una sola vez a `countries.arrow`: atributos como columnas Arrow,
+geometria como WKB, limites (minx, miny, maxx, maxy) precalculados y sin
+compresion, para que `cargar()` abra el archivo con memory-map y solo
+decodifique el WKB (vectorizado con shapely). En la conversion las
+geometrias invalidas se reparan (`make_valid`) y las vacias se descartan.
+
+    python geometrias.py [--origen countries.geojson] [--destino countries.arrow]
+
+La conversion es reproducible (mismo GeoJSON -> mismo archivo; el hash del
+origen queda en los metadatos) y `cargar()` la rehace sola si falta el
+binario o si el GeoJSON es mas reciente.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+RUTA_GEOJSON = "countries.geojson"
+RUTA_BINARIA = "countries.arrow"
+COLUMNA_ISO = "ISO3166-1-Alpha-3"
+LIMITES = ["minx", "miny", "maxx", "maxy"]
+CRS = "EPSG:4326"
+
+
+def _hash(ruta):
+    with open(ruta, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def convertir(origen=RUTA_GEOJSON, destino=RUTA_BINARIA):
+    """GeoJSON -> Arrow IPC sin comprimir; devuelve el resumen de la validacion."""
+    import geopandas as gpd
+    import pyarrow as pa
+    import shapely
+
+    world = gpd.read_file(origen)
+    if COLUMNA_ISO not in world.columns:
+        raise ValueError(f"{origen} no tiene la columna {COLUMNA_ISO}")
+    if world.crs is not None and world.crs != CRS:
+        world = world.to_crs(CRS)
+
+    geometrias = world.geometry.to_numpy()
+    invalidas = ~shapely.is_valid(geometrias)
+    geometrias[invalidas] = shapely.make_valid(geometrias[invalidas])
+    vacias = shapely.is_missing(geometrias) | shapely.is_empty(geometrias)
+    world = world.loc[~vacias]
+    geometrias = geometrias[~vacias]
+
+    atributos = world.drop(columns=world.geometry.name)
+    tabla = pa.Table.from_pandas(atributos, preserve_index=False)
+    for nombre, valores in zip(LIMITES, shapely.bounds(geometrias).T):
+        tabla = tabla.append_column(nombre, pa.array(valores, type=pa.float64()))
+    tabla = tabla.append_column("geometry", pa.array(shapely.to_wkb(geometrias), type=pa.binary()))
+
+    resumen = {
+        "paises": len(world),
+        "reparadas": int(invalidas.sum()),
+        "descartadas_vacias": int(vacias.sum()),
+        "crs": CRS,
+        "origen_blake2b": _hash(origen),
+    }
+    tabla = tabla.replace_schema_metadata({"geometrias": json.dumps(resumen)})
+
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with pa.OSFile(temporal, "wb") as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    os.replace(temporal, destino)
+    return resumen
+
+
+def _vigente(origen, destino):
+    # por fecha de modificacion: hashear el GeoJSON en cada carga costaria mas que leer el binario
+    if not os.path.exists(destino):
+        return False
+    return not os.path.exists(origen) or os.path.getmtime(destino) >= os.path.getmtime(origen)
+
+
+def cargar(destino=RUTA_BINARIA, origen=RUTA_GEOJSON, con_limites=False):
+    """
+    GeoDataFrame de paises desde el binario (memory-map + WKB). Los limites
+    precalculados solo se incluyen con `con_limites` (el mapa envia todas las
+    columnas al navegador).
+    """
+    import geopandas as gpd
+    import pyarrow as pa
+    import shapely
+
+    if not _vigente(origen, destino):
+        convertir(origen, destino)
+    with pa.memory_map(destino) as fuente:
+        # sin compresion: las columnas son vistas sobre el archivo mapeado
+        tabla = pa.ipc.open_file(fuente).read_all()
+        geometrias = shapely.from_wkb(tabla.column("geometry").to_numpy(zero_copy_only=False))
+        atributos = tabla.drop_columns(["geometry"] if con_limites else ["geometry", *LIMITES]).to_pandas()
+    return gpd.GeoDataFrame(atributos, geometry=geometrias, crs=CRS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte la capa de paises a Arrow IPC con WKB.")
+    parser.add_argument("--origen", default=RUTA_GEOJSON)
+    parser.add_argument("--destino", default=RUTA_BINARIA)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    resumen = convertir(args.origen, args.destino)
+    segundos_conversion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    world = cargar(args.destino, args.origen)
+    ms_carga = (time.perf_counter() - inicio) * 1000
+
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    print(f"Conversion: {segundos_conversion:.2f} s -> {args.destino} "
+          f"({os.path.getsize(args.destino) / 1e6:.1f} MB)")
+    print(f"Carga desde el binario: {ms_carga:.1f} ms ({len(world)} paises)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Explorador paginado del dataset, con orden y busqueda del lado del servidor.
+
+`Grilla` guarda una permutacion de orden por columna (argsort calculado la
+primera vez que se ordena por ella) y las mascaras de las ultimas busquedas;
+cada pagina es un `take` de `tamano` filas, asi que al navegador solo llega
+la pagina visible y ordenar/paginar no vuelve a ordenar el DataFrame.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Columnas de texto donde busca el cuadro de busqueda
+COLUMNAS_BUSQUEDA = ["country", "ISO3", "continent", "indicator", "year_week", "month_name"]
+MAX_BUSQUEDAS = 16
+
+
+class Grilla:
+    """Vista paginable de un DataFrame inmutable (uno por dataset filtrado)."""
+
+    def __init__(self, df):
+        self.df = df
+        self._ordenes = {}
+        self._texto = {}
+        self._busquedas = OrderedDict()
+        self._perfil = None
+        self._lock = threading.Lock()
+        # int32 alcanza para los indices y ocupa la mitad por columna ordenada
+        self._tipo_indice = np.int32 if len(df) < 2**31 else np.int64
+
+    def perfil(self):
+        """(nulos por columna, conteo de dtypes); se calcula una vez."""
+        with self._lock:
+            if self._perfil is None:
+                self._perfil = (
+                    self.df.isnull().sum().rename("Nulos"),
+                    self.df.dtypes.astype(str).value_counts().rename("Cantidad"),
+                )
+            return self._perfil
+
+    def _orden(self, columna):
+        """(permutacion ascendente con nulos al final, filas no nulas)."""
+        if columna not in self._ordenes:
+            serie = self.df[columna]
+            validos = serie.notna().to_numpy()
+            idx_validos = np.flatnonzero(validos)
+            valores = serie.to_numpy()[idx_validos]
+            if valores.dtype == object:
+                valores = valores.astype(str)
+            perm = idx_validos[np.argsort(valores, kind="stable")]
+            perm = np.concatenate([perm, np.flatnonzero(~validos)]).astype(self._tipo_indice)
+            self._ordenes[columna] = (perm, len(idx_validos))
+        return self._ordenes[columna]
+
+    def _mascara(self, busqueda):
+        """Filas que contienen `busqueda` (sin distinguir mayusculas) en alguna columna de texto."""
+        if busqueda in self._busquedas:
+            self._busquedas.move_to_end(busqueda)
+            return self._busquedas[busqueda]
+        mascara = np.zeros(len(self.df), dtype=bool)
+        for col in COLUMNAS_BUSQUEDA:
+            if col not in self.df.columns:
+                continue
+            if col not in self._texto:
+                self._texto[col] = self.df[col].astype("string").str.lower()
+            mascara |= self._texto[col].str.contains(busqueda, regex=False, na=False).to_numpy()
+        self._busquedas[busqueda] = mascara
+        if len(self._busquedas) > MAX_BUSQUEDAS:
+            self._busquedas.popitem(last=False)
+        return mascara
+
+    def indices(self, orden=None, descendente=False, busqueda=""):
+        """Posiciones de las filas en el orden de la grilla (sin materializar filas)."""
+        busqueda = busqueda.strip().lower()
+        with self._lock:
+            if orden is None:
+                perm = np.arange(len(self.df), dtype=self._tipo_indice)
+            else:
+                perm, validos = self._orden(orden)
+                if descendente:
+                    # los nulos siguen al final tambien en orden descendente
+                    perm = np.concatenate([perm[:validos][::-1], perm[validos:]])
+            if busqueda:
+                perm = perm[self._mascara(busqueda)[perm]]
+        return perm
+
+    def pagina(self, indices, numero, tamano):
+        """Filas de la pagina `numero` (desde 1) de `indices`."""
+        inicio = (numero - 1) * tamano
+        return self.df.iloc[indices[inicio:inicio + tamano]]
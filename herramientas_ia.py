@@ -0,0 +1,316 @@
+"""
+Herramientas analiticas locales para el AI Analyst.
+
+El modelo de Groq no ve el dataset completo, solo un resumen. Para preguntas
+concretas ("Top 5 paises por letalidad", "correlacion temperatura vs casos")
+se le exponen estas funciones via function calling: se ejecutan localmente
+sobre agregados precalculados una sola vez por dataset y devuelven JSON
+pequeño que el modelo cita en su respuesta.
+"""
+import json
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Numero maximo de rondas modelo -> herramienta -> modelo por turno de chat
+MAX_RONDAS_HERRAMIENTAS = 3
+
+
+def _normalizar(texto):
+    # minusculas y sin tildes para que "Peru", "perú" y "PERU" coincidan
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in texto if not unicodedata.combining(c)).strip().lower()
+
+
+def _redondear(valor, decimales=4):
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return None
+    if isinstance(valor, (np.integer, int)):
+        return int(valor)
+    return round(float(valor), decimales)
+
+
+class HerramientasAnalista:
+    """Agregados precalculados + ejecutor de las herramientas del chat."""
+
+    def __init__(self, df):
+        self.num_cols = list(df.select_dtypes(include=[np.number]).columns)
+        self.tiene_fecha = "date" in df.columns
+
+        # --- Agregados por pais (una sola pasada de groupby) ---
+        por_pais = df.groupby("country", sort=False)
+        self.media_pais = por_pais[self.num_cols].mean()
+        self.max_pais = por_pais[self.num_cols].max()
+        self.min_pais = por_pais[self.num_cols].min()
+        self.semanas_pais = por_pais.size()
+        self.continente_pais = por_pais["continent"].first()
+        self.iso_pais = por_pais["ISO3"].first() if "ISO3" in df.columns else None
+
+        if self.tiene_fecha:
+            ordenado = df.sort_values("date")
+            por_pais_ord = ordenado.groupby("country", sort=False)
+            self.primera_fecha = por_pais_ord["date"].first()
+            self.ultima_fecha = por_pais_ord["date"].last()
+            self.ultimo_valor = por_pais_ord[self.num_cols].last()
+            # fecha del pico de cada variable (se omiten los nulos: idxmax
+            # sobre un grupo todo-NaN no esta definido)
+            self.fecha_pico = pd.DataFrame(index=self.media_pais.index)
+            for var in self.num_cols:
+                validos = df.loc[df[var].notna(), ["country", var, "date"]]
+                idx = validos.groupby("country", sort=False)[var].idxmax()
+                self.fecha_pico[var] = pd.Series(
+                    validos.loc[idx.values, "date"].values, index=idx.index
+                )
+
+        # --- Agregados por continente ---
+        por_cont = df.groupby("continent", sort=False)
+        self.media_cont = por_cont[self.num_cols].mean()
+        self.mediana_cont = por_cont[self.num_cols].median()
+        self.max_cont = por_cont[self.num_cols].max()
+        self.min_cont = por_cont[self.num_cols].min()
+        self.paises_cont = por_cont["country"].nunique()
+
+        # --- Correlaciones (global y por continente) ---
+        self.corr_global = df[self.num_cols].corr()
+        self.corr_cont = {
+            cont: grupo[self.num_cols].corr() for cont, grupo in por_cont
+        }
+
+        # Indices de busqueda tolerantes a mayusculas/tildes/ISO3
+        self._paises = {_normalizar(p): p for p in self.media_pais.index}
+        if self.iso_pais is not None:
+            self._paises.update({_normalizar(iso): p for p, iso in self.iso_pais.items()})
+        self._continentes = {_normalizar(c): c for c in self.media_cont.index}
+
+    # --- Resolucion de nombres ---
+    def _variable(self, variable):
+        if variable not in self.num_cols:
+            raise ValueError(
+                f"Variable '{variable}' no disponible. Opciones: {', '.join(self.num_cols)}"
+            )
+        return variable
+
+    def _pais(self, pais):
+        clave = _normalizar(pais)
+        if clave not in self._paises:
+            raise ValueError(f"Pais '{pais}' no encontrado en el dataset filtrado.")
+        return self._paises[clave]
+
+    def _continente(self, continente):
+        clave = _normalizar(continente)
+        if clave not in self._continentes:
+            raise ValueError(
+                f"Continente '{continente}' no disponible. Opciones: {', '.join(self.media_cont.index)}"
+            )
+        return self._continentes[clave]
+
+    # --- Herramientas ---
+    def top_k_paises(self, variable, k=5, orden="mayores", continente=None):
+        variable = self._variable(variable)
+        k = max(1, min(int(k), 50))
+        serie = self.media_pais[variable].dropna()
+        if continente:
+            cont = self._continente(continente)
+            serie = serie[self.continente_pais.reindex(serie.index) == cont]
+        serie = serie.nsmallest(k) if orden == "menores" else serie.nlargest(k)
+        return {
+            "variable": variable,
+            "agregacion": "media semanal por pais",
+            "orden": orden,
+            "continente": continente,
+            "resultados": [
+                {"pais": p, "continente": self.continente_pais.get(p), "valor": _redondear(v)}
+                for p, v in serie.items()
+            ],
+        }
+
+    def correlacion(self, var_x, var_y, continente=None):
+        var_x, var_y = self._variable(var_x), self._variable(var_y)
+        if continente:
+            cont = self._continente(continente)
+            corr = self.corr_cont[cont]
+        else:
+            cont, corr = None, self.corr_global
+        r = corr.loc[var_x, var_y]
+        return {
+            "var_x": var_x,
+            "var_y": var_y,
+            "continente": cont,
+            "pearson_r": _redondear(r),
+            "r_cuadrado": _redondear(r * r) if pd.notnull(r) else None,
+        }
+
+    def resumen_pais(self, pais, variables=None):
+        pais = self._pais(pais)
+        variables = [self._variable(v) for v in variables] if variables else self.num_cols
+        resumen = {
+            "pais": pais,
+            "continente": self.continente_pais.get(pais),
+            "semanas": int(self.semanas_pais.get(pais, 0)),
+            "variables": {},
+        }
+        if self.tiene_fecha:
+            resumen["desde"] = str(self.primera_fecha.get(pais))
+            resumen["hasta"] = str(self.ultima_fecha.get(pais))
+        for var in variables:
+            detalle = {
+                "media": _redondear(self.media_pais.at[pais, var]),
+                "min": _redondear(self.min_pais.at[pais, var]),
+                "max": _redondear(self.max_pais.at[pais, var]),
+            }
+            if self.tiene_fecha:
+                detalle["ultimo"] = _redondear(self.ultimo_valor.at[pais, var])
+                pico = self.fecha_pico.at[pais, var]
+                detalle["fecha_max"] = str(pico) if pd.notnull(pico) else None
+            resumen["variables"][var] = detalle
+        return resumen
+
+    def agregado_continente(self, variable, continente=None):
+        variable = self._variable(variable)
+        continentes = [self._continente(continente)] if continente else list(self.media_cont.index)
+        return {
+            "variable": variable,
+            "resultados": [
+                {
+                    "continente": c,
+                    "paises": int(self.paises_cont[c]),
+                    "media": _redondear(self.media_cont.at[c, variable]),
+                    "mediana": _redondear(self.mediana_cont.at[c, variable]),
+                    "min": _redondear(self.min_cont.at[c, variable]),
+                    "max": _redondear(self.max_cont.at[c, variable]),
+                }
+                for c in continentes
+            ],
+        }
+
+    # --- Function calling ---
+    def esquema(self):
+        """Definicion de herramientas en formato OpenAI/Groq (`tools=`)."""
+        var = {"type": "string", "enum": self.num_cols}
+        cont = {
+            "type": "string",
+            "description": "Continente opcional para restringir el calculo",
+            "enum": list(self.media_cont.index),
+        }
+        return [
+            {
+                "type": "function",
+                "function": {
+                    "name": "top_k_paises",
+                    "description": "Ranking de paises por la media semanal de una variable.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "variable": var,
+                            "k": {"type": "integer", "description": "Cantidad de paises (1-50)"},
+                            "orden": {"type": "string", "enum": ["mayores", "menores"]},
+                            "continente": cont,
+                        },
+                        "required": ["variable"],
+                    },
+                },
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "correlacion",
+                    "description": "Correlacion de Pearson entre dos variables numericas.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {"var_x": var, "var_y": var, "continente": cont},
+                        "required": ["var_x", "var_y"],
+                    },
+                },
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "resumen_pais",
+                    "description": "Resumen de la serie temporal de un pais: media, min, max, ultimo valor y fecha del pico.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "pais": {"type": "string", "description": "Nombre del pais o codigo ISO3"},
+                            "variables": {"type": "array", "items": var},
+                        },
+                        "required": ["pais"],
+                    },
+                },
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "agregado_continente",
+                    "description": "Media, mediana, min y max de una variable por continente.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {"variable": var, "continente": cont},
+                        "required": ["variable"],
+                    },
+                },
+            },
+        ]
+
+    def ejecutar(self, nombre, argumentos):
+        """Ejecuta una herramienta y devuelve el resultado serializado en JSON."""
+        funciones = {
+            "top_k_paises": self.top_k_paises,
+            "correlacion": self.correlacion,
+            "resumen_pais": self.resumen_pais,
+            "agregado_continente": self.agregado_continente,
+        }
+        try:
+            if nombre not in funciones:
+                raise ValueError(f"Herramienta desconocida: {nombre}")
+            args = json.loads(argumentos) if isinstance(argumentos, str) else (argumentos or {})
+            resultado = funciones[nombre](**args)
+        except (ValueError, TypeError, KeyError) as e:
+            # el error vuelve al modelo para que corrija la llamada
+            resultado = {"error": str(e)}
+        return json.dumps(resultado, ensure_ascii=False, default=str)
+
+
+def resolver_herramientas(client, modelo, mensajes, herramientas, **kwargs):
+    """
+    Ejecuta las rondas de function calling.
+
+    Devuelve (mensajes, respuesta, llamadas): `respuesta` es el texto final si
+    el modelo contesto sin pedir herramientas, o None si hay que generar la
+    respuesta final (en streaming) con los resultados ya agregados a `mensajes`.
+    """
+    mensajes = list(mensajes)
+    llamadas = []
+    tools = herramientas.esquema()
+    for _ in range(MAX_RONDAS_HERRAMIENTAS):
+        resp = client.chat.completions.create(
+            model=modelo,
+            messages=mensajes,
+            tools=tools,
+            tool_choice="auto",
+            **kwargs,
+        )
+        msg = resp.choices[0].message
+        if not msg.tool_calls:
+            return mensajes, (msg.content or ""), llamadas
+
+        mensajes.append({
+            "role": "assistant",
+            "content": msg.content or "",
+            "tool_calls": [
+                {
+                    "id": tc.id,
+                    "type": "function",
+                    "function": {"name": tc.function.name, "arguments": tc.function.arguments},
+                }
+                for tc in msg.tool_calls
+            ],
+        })
+        for tc in msg.tool_calls:
+            llamadas.append(f"{tc.function.name}({tc.function.arguments})")
+            mensajes.append({
+                "role": "tool",
+                "tool_call_id": tc.id,
+                "content": herramientas.ejecutar(tc.function.name, tc.function.arguments),
+            })
+    return mensajes, None, llamadas
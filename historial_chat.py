@@ -0,0 +1,85 @@
+"""
+Historial persistente del chat en SQLite, por conversacion.
+
+Cada conversacion (usuario autenticado o identificador de la URL) guarda sus
+mensajes en `.chat/historial.sqlite3`, de modo que sobreviven a reconexiones
+y reinicios del servidor. La UI no carga el historial completo: pide la
+ultima pagina (`pagina`) y las anteriores solo cuando el analista las
+solicita; el contexto para el modelo sale de `ultimos`.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+RUTA_HISTORIAL = os.path.join(".chat", "historial.sqlite3")
+MENSAJES_POR_PAGINA = 20
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mensajes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversacion TEXT NOT NULL,
+    rol TEXT NOT NULL,
+    contenido TEXT NOT NULL,
+    herramientas TEXT,
+    creado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mensajes_conversacion ON mensajes (conversacion, id);
+"""
+
+
+def _mensaje(fila):
+    id_mensaje, rol, contenido, herramientas = fila
+    return {
+        "id": id_mensaje,
+        "role": rol,
+        "content": contenido,
+        "herramientas": json.loads(herramientas) if herramientas else [],
+    }
+
+
+class HistorialChat:
+    """Una conexion por proceso (compartida por las sesiones, serializada con un lock)."""
+
+    def __init__(self, ruta=RUTA_HISTORIAL):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self._con = sqlite3.connect(ruta, check_same_thread=False)
+        # WAL: las lecturas no esperan a las escrituras de otras sesiones
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.executescript(_ESQUEMA)
+        self._lock = threading.Lock()
+
+    def agregar(self, conversacion, rol, contenido, herramientas=None):
+        with self._lock, self._con:
+            cursor = self._con.execute(
+                "INSERT INTO mensajes (conversacion, rol, contenido, herramientas, creado) VALUES (?, ?, ?, ?, ?)",
+                (conversacion, rol, contenido, json.dumps(herramientas) if herramientas else None, time.time()),
+            )
+            return cursor.lastrowid
+
+    def pagina(self, conversacion, limite=MENSAJES_POR_PAGINA, antes_de=None):
+        """Los `limite` mensajes anteriores al id `antes_de` (o los ultimos), en orden cronologico."""
+        with self._lock:
+            filas = self._con.execute(
+                "SELECT id, rol, contenido, herramientas FROM mensajes "
+                "WHERE conversacion = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (conversacion, antes_de if antes_de is not None else 2**63 - 1, limite),
+            ).fetchall()
+        return [_mensaje(fila) for fila in reversed(filas)]
+
+    def ultimos(self, conversacion, n):
+        return self.pagina(conversacion, n)
+
+    def resumen(self, conversacion):
+        """(id del ultimo mensaje, mensajes, preguntas del usuario); el id versiona las paginas cacheadas."""
+        with self._lock:
+            ultimo, total, preguntas = self._con.execute(
+                "SELECT max(id), count(*), sum(rol = 'user') FROM mensajes WHERE conversacion = ?",
+                (conversacion,),
+            ).fetchone()
+        return ultimo or 0, total, preguntas or 0
+
+    def borrar(self, conversacion):
+        with self._lock, self._con:
+            self._con.execute("DELETE FROM mensajes WHERE conversacion = ?", (conversacion,))
@@ -0,0 +1,125 @@
+"""
+Imputacion de nulos numericos por grupo (pais / continente) y a lo largo del tiempo.
+
+Todos los metodos son vectorizados: las estadisticas de grupo se calculan una
+sola vez por dataset (`Imputador` se cachea en `main.py`) y se reparten a las
+filas con un `reindex`; el forward-fill y la interpolacion usan un unico
+ordenamiento (pais, indicador, fecha) y `groupby().ffill()/bfill()`, sin
+bucles por pais. Cada pais tiene una fila de casos y otra de muertes por
+fecha, asi que los metodos por grupo y en el tiempo agrupan tambien por
+`indicator`: los nulos de muertes nunca se llenan con valores de casos.
+"Llenar con Media" sigue usando la media de todo el dataset; "Media por
+Indicador" es la variante global que separa casos de muertes.
+"""
+import numpy as np
+import pandas as pd
+
+# etiqueta del selectbox -> (tipo, agregacion)
+METODOS = {
+    "Ninguno": (None, None),
+    "Llenar con Media": ("global", "mean"),
+    "Media por Indicador": ("indicator", "mean"),
+    "Llenar con Cero": ("cero", None),
+    "Media por Pais": ("country", "mean"),
+    "Mediana por Pais": ("country", "median"),
+    "Media por Continente": ("continent", "mean"),
+    "Mediana por Continente": ("continent", "median"),
+    "Forward-fill por Pais (fecha)": ("ffill", None),
+    "Interpolacion lineal por Pais (fecha)": ("interpolar", None),
+}
+
+
+class Imputador:
+    """Estadisticas y orden temporal de un dataset, memorizados entre reruns."""
+
+    def __init__(self, df):
+        self.df = df
+        self.num_cols = list(df.select_dtypes(include=[np.number]).columns)
+        self._estadisticas = {}
+        self._orden = None
+
+    def grupo(self, por):
+        """Columnas de agrupacion: `por` y el indicador, o ninguna (`por=None` = todo el dataset)."""
+        if por is None:
+            return []
+        return [c for c in dict.fromkeys((por, "indicator")) if c in self.df.columns]
+
+    def estadisticas(self, por, agg):
+        """Media/mediana de las columnas numericas por (`por`, indicador); `por=None` = global."""
+        clave = (por, agg)
+        if clave not in self._estadisticas:
+            grupo = self.grupo(por)
+            if not grupo:
+                self._estadisticas[clave] = self.df[self.num_cols].agg(agg)
+            else:
+                self._estadisticas[clave] = self.df.groupby(grupo, sort=False)[self.num_cols].agg(agg)
+        return self._estadisticas[clave]
+
+    def orden_temporal(self):
+        """Permutacion que ordena por (pais, indicador, fecha), grupos y tiempos ya ordenados."""
+        if self._orden is None:
+            codigos = self.df.groupby(self.grupo("country"), sort=False, dropna=False).ngroup().to_numpy()
+            if "date" in self.df.columns:
+                fechas = self.df["date"].to_numpy()
+                t = fechas.astype("datetime64[ns]").astype("int64").astype(float)
+                t[np.isnat(fechas.astype("datetime64[ns]"))] = np.nan
+            else:
+                t = np.arange(len(self.df), dtype=float)
+            orden = np.lexsort((t, codigos))
+            self._orden = (orden, codigos[orden], t[orden])
+        return self._orden
+
+    def aplicar(self, metodo, columnas=None):
+        """Devuelve el dataset con los nulos de `columnas` imputados segun `metodo`."""
+        tipo, agg = METODOS[metodo]
+        cols = [c for c in (columnas if columnas is not None else self.num_cols) if c in self.num_cols]
+        df = self.df
+        if tipo is None or not cols:
+            return df
+        if tipo == "cero":
+            return df.fillna({c: 0 for c in cols})
+        if tipo in ("global", "indicator", "country", "continent"):
+            por = None if tipo == "global" else tipo
+            grupo = self.grupo(por)
+            estadisticas = self.estadisticas(por, agg)
+            if not grupo:
+                return df.fillna(estadisticas[cols].to_dict())
+            # Estadistica de su grupo para cada fila; los grupos sin ningun
+            # valor observado siguen en NaN
+            filas = pd.MultiIndex.from_frame(df[grupo]) if len(grupo) > 1 else df[grupo[0]].to_numpy()
+            relleno = estadisticas[cols].reindex(filas)
+            relleno.index = df.index
+            return df.fillna(relleno)
+
+        orden, grupos, t = self.orden_temporal()
+        ordenado = df[cols].iloc[orden]
+        if tipo == "ffill":
+            llenado = ordenado.groupby(grupos, sort=False).ffill()
+        else:
+            llenado = _interpolar(ordenado, grupos, t)
+        return df.fillna(llenado)
+
+
+def _interpolar(valores, grupos, t):
+    """
+    Interpolacion lineal en `t` dentro de cada grupo, sin cruzar de una serie
+    (pais, indicador) a otra. `valores` ya viene ordenado por (grupo, t); los huecos al inicio o al
+    final de una serie no se rellenan.
+    """
+    posiciones = np.arange(len(valores), dtype=float)
+    salida = {}
+    for col in valores.columns:
+        x = valores[col].to_numpy(dtype=float, na_value=np.nan).copy()
+        validos = pd.Series(np.where(np.isnan(x), np.nan, posiciones))
+        previo = validos.groupby(grupos, sort=False).ffill().to_numpy()
+        siguiente = validos.groupby(grupos, sort=False).bfill().to_numpy()
+
+        hueco = np.isnan(x) & ~np.isnan(previo) & ~np.isnan(siguiente)
+        p = previo[hueco].astype(np.int64)
+        q = siguiente[hueco].astype(np.int64)
+        dt = t[q] - t[p]
+        peso = np.where(dt > 0, (t[hueco] - t[p]) / np.where(dt > 0, dt, 1), 0.0)
+        peso = np.nan_to_num(peso, nan=0.0)
+        x[hueco] = x[p] + (x[q] - x[p]) * peso
+        salida[col] = x
+    return pd.DataFrame(salida, index=valores.index)
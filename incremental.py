@@ -0,0 +1,93 @@
+"""
+Anexo incremental de semanas nuevas a un dataset ya cargado.
+
+Las columnas derivadas dependen de la serie completa de cada pais/indicador,
+pero solo a traves de su ultima semana: `cumulative_count` continua desde el
+acumulado previo y `rate_14_day` necesita el `weekly_count` de la semana
+anterior. Con esa "cola" por serie se derivan las filas nuevas sin releer ni
+recalcular el historico.
+
+Las series se identifican por (country, indicator) y no por ISO3: los
+agregados "(total)" no tienen ISO3 y con el se perderian al agrupar.
+"""
+import numpy as np
+import pandas as pd
+
+# Una serie = un pais (o agregado "(total)") y un indicador
+SERIE = ["country", "indicator"]
+# Series de pais como las identifica la deteccion de anomalias
+SERIE_ISO = ["ISO3", "indicator"]
+# Atributos del pais que se heredan de la cola si el archivo nuevo no los trae
+COLUMNAS_PAIS = ["ISO3", "continent", "population", "hospital_beds", "camas_por_100k"]
+COLUMNAS_COLA = ["year_week", "weekly_count", "cumulative_count", *COLUMNAS_PAIS]
+# rate_14_day (convencion ECDC): casos por 100 mil, muertes por millon
+ESCALA_TASA_14 = {"cases": 1e5, "deaths": 1e6}
+
+
+def estado_cola(df):
+    """Ultima semana de cada serie, indexada por (country, indicator)."""
+    columnas = [c for c in COLUMNAS_COLA if c in df.columns]
+    cola = df.sort_values("year_week", kind="stable").groupby(SERIE, sort=False).tail(1)
+    return cola.set_index(SERIE)[columnas]
+
+
+def derivar_semanas(nuevas, cola):
+    """Calcula las columnas derivadas de `nuevas` continuando desde `cola`."""
+    nuevas = nuevas.sort_values([*SERIE, "year_week"], kind="stable").reset_index(drop=True)
+    previa = cola.reindex(pd.MultiIndex.from_frame(nuevas[SERIE]))
+
+    for col in COLUMNAS_PAIS:
+        if col not in previa.columns:
+            continue
+        heredada = previa[col].to_numpy()
+        nuevas[col] = nuevas[col].fillna(pd.Series(heredada)) if col in nuevas.columns else heredada
+    if "month_name" not in nuevas.columns or nuevas["month_name"].isna().any():
+        mes = nuevas["date"].dt.strftime("%b")
+        nuevas["month_name"] = nuevas.get("month_name", mes).fillna(mes)
+
+    semanal = nuevas["weekly_count"].astype("float64")
+    grupos = semanal.groupby([nuevas[c] for c in SERIE], sort=False)
+    # series sin historia (pais o indicador nuevo) arrancan desde cero
+    nuevas["cumulative_count"] = previa["cumulative_count"].fillna(0).to_numpy() + grupos.cumsum().to_numpy()
+    primera = grupos.cumcount().to_numpy() == 0
+    anterior = np.where(primera, previa["weekly_count"].to_numpy(), grupos.shift(1).to_numpy())
+
+    poblacion = nuevas["population"].astype("float64")
+    escala = nuevas["indicator"].map(ESCALA_TASA_14).fillna(1e5)
+    nuevas["rate_14_day"] = (semanal + anterior) / poblacion * escala
+    nuevas["casos_100k"] = semanal / poblacion * 1e5
+    nuevas["letalidad_pct"] = semanal / poblacion * 100
+    return nuevas
+
+
+def anexar_semanas(df, nuevas, cola=None):
+    """
+    Agrega a `df` las semanas de `nuevas` posteriores a la cola de cada serie.
+
+    Devuelve (df_total, cola_actualizada, reporte); las `reporte["filas"]`
+    filas nuevas quedan al final de `df_total`. Las semanas que ya existen (o
+    son anteriores a la ultima cargada) se descartan.
+    """
+    if cola is None:
+        cola = estado_cola(df)
+    nuevas = nuevas.drop_duplicates([*SERIE, "year_week"])
+    ultima = cola["year_week"].reindex(pd.MultiIndex.from_frame(nuevas[SERIE])).to_numpy()
+    posteriores = pd.isna(ultima) | (nuevas["year_week"].to_numpy() > np.where(pd.isna(ultima), "", ultima))
+    descartadas = int((~posteriores).sum())
+    nuevas = derivar_semanas(nuevas[posteriores], cola)
+
+    nuevas = nuevas.reindex(columns=df.columns)
+    total = pd.concat([df, nuevas], ignore_index=True)
+
+    cola_nueva = pd.concat([cola, estado_cola(nuevas)])
+    cola_nueva = cola_nueva[~cola_nueva.index.duplicated(keep="last")]
+    reporte = {
+        "filas": len(nuevas),
+        "descartadas": descartadas,
+        # las anomalias se recalculan por (ISO3, indicator); los "(total)" no tienen
+        "series": sorted(set(nuevas[SERIE_ISO].dropna().itertuples(index=False, name=None))),
+        "indicadores": sorted(nuevas["indicator"].dropna().unique().tolist()),
+        "continentes": sorted(nuevas["continent"].dropna().unique().tolist()),
+        "fechas": pd.DatetimeIndex(nuevas["date"].dropna().unique()).sort_values().tolist(),
+    }
+    return total, cola_nueva, reporte
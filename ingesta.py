@@ -0,0 +1,329 @@
+"""
+Ingesta del CSV: lectura en memoria y modo por bloques para archivos grandes.
+
+El modo por bloques lee el CSV en trozos de `TAMANO_BLOQUE` filas, aplica el
+esquema a cada trozo y lo escribe en un almacen Parquet particionado por
+`indicator`/`continent`. La limpieza (duplicados, ISO3) se hace despues,
+particion por particion y bloque por bloque: una fila y su duplicado siempre
+caen en la misma particion, y de los bloques ya vistos solo se guarda una
+huella de 128 bits por fila, asi que ni la particion entera tiene que caber
+en memoria. El dashboard luego consulta solo la particion que necesita.
+Las semanas anomalas se detectan al terminar la ingesta (sobre las columnas
+que necesitan, no el dataset completo) y se guardan en `_anomalias.parquet`.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import anomalias
+from piramide import es_total
+
+# Carpeta local donde se guardan los almacenes (uno por archivo + opciones)
+DIR_ALMACEN = ".almacen"
+# Unica carpeta de la que el modo por bloques lee CSV del servidor
+DIR_DATOS = os.environ.get("DSS_DIR_DATOS", ".")
+TAMANO_BLOQUE = 200_000
+
+COLUMNAS_TEXTO = ["country", "ISO3", "continent", "indicator", "year_week", "month_name"]
+COLUMNAS_NUMERICAS = [
+    "population", "weekly_count", "rate_14_day", "cumulative_count", "avg_temp",
+    "hospital_beds", "letalidad_pct", "camas_por_100k", "casos_100k",
+]
+# float64 para las numericas: en extractos grandes cualquier columna puede traer nulos
+ESQUEMA = {**{c: "object" for c in COLUMNAS_TEXTO}, **{c: "float64" for c in COLUMNAS_NUMERICAS}}
+PARTICIONES = ["indicator", "continent"]
+# Los archivos con prefijo "_" no forman parte del dataset particionado
+ARCHIVO_ANOMALIAS = "_anomalias.parquet"
+# Una fila por pais, indicador y semana
+CLAVE_NATURAL = ["ISO3", "indicator", "year_week"]
+# Huella de fila del modo por bloques: dos hashes de 64 bits con semillas distintas
+HUELLA = np.dtype([("a", "u8"), ("b", "u8")])
+SEMILLA_HUELLA = "dss-huella-fila1"
+
+
+def preparar_columnas(df):
+    """Columnas derivadas que se calculan una sola vez al ingerir."""
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    if "ISO3" in df.columns:
+        df["ISO3"] = df["ISO3"].str.upper().str.strip()
+    return df
+
+
+def leer_csv(origen):
+    """Lectura completa en memoria (modo normal del dashboard)."""
+    return preparar_columnas(pd.read_csv(origen))
+
+
+def _verificar_columnas(df, columnas):
+    faltantes = [c for c in columnas if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"El dataset no tiene las columnas de la clave de duplicados: {', '.join(faltantes)}")
+
+
+def hash_filas(df, columnas=None):
+    """Hash vectorizado de 64 bits por fila (todas las columnas o solo `columnas`)."""
+    if columnas is not None:
+        _verificar_columnas(df, columnas)
+    datos = df if columnas is None else df[columnas]
+    return pd.util.hash_pandas_object(datos, index=False).to_numpy()
+
+
+def detectar_duplicados(df, hashes, columnas=CLAVE_NATURAL):
+    """
+    Mascara de filas a conservar (primera de cada grupo) y reporte de grupos
+    duplicados con su tamaño. `columnas` es la clave (None = fila completa).
+
+    Los hashes ya calculados solo preseleccionan candidatas; los valores de
+    la clave se comparan para confirmarlas. Las filas con la clave incompleta
+    (los agregados "(total)" no tienen ISO3) nunca son duplicadas por clave.
+    """
+    if columnas is not None:
+        _verificar_columnas(df, columnas)
+    clave = list(df.columns) if columnas is None else list(columnas)
+    reporte_cols = [c for c in CLAVE_NATURAL if c in df.columns] if columnas is None else clave
+    vacio = pd.DataFrame(columns=reporte_cols + ["filas"])
+
+    candidatas = pd.Series(hashes).duplicated(keep=False).to_numpy().copy()
+    if columnas is not None:
+        candidatas &= df[clave].notna().all(axis=1).to_numpy()
+    mascara = np.ones(len(df), dtype=bool)
+    if not candidatas.any():
+        return mascara, vacio
+
+    grupo = df.loc[candidatas, clave].groupby(clave, sort=False, dropna=False).ngroup()
+    mascara[candidatas] = ~grupo.duplicated().to_numpy()
+    repetidas = grupo.duplicated(keep=False).to_numpy()
+    if not repetidas.any():
+        return mascara, vacio
+    grupos = df.loc[candidatas, reporte_cols][repetidas].groupby(grupo.to_numpy()[repetidas], sort=False)
+    reporte = grupos.first().assign(filas=grupos.size())
+    reporte = reporte.sort_values("filas", ascending=False).reset_index(drop=True)
+    return mascara, reporte
+
+
+def csv_disponibles(directorio=DIR_DATOS):
+    """Nombres de los CSV de `directorio` (sin subcarpetas) que se ofrecen en el sidebar."""
+    try:
+        nombres = sorted(os.listdir(directorio))
+    except OSError:
+        return []
+    return [n for n in nombres if n.lower().endswith(".csv") and _dentro(directorio, n)]
+
+
+def _dentro(directorio, nombre):
+    base = os.path.realpath(directorio)
+    ruta = os.path.realpath(os.path.join(base, nombre))
+    return os.path.dirname(ruta) == base and os.path.isfile(ruta)
+
+
+def resolver_csv(nombre, directorio=DIR_DATOS):
+    """Ruta real del CSV `nombre` de `directorio`; ValueError si apunta fuera de el."""
+    if not nombre.lower().endswith(".csv") or not _dentro(directorio, nombre):
+        raise ValueError(f"{nombre!r} no es un CSV de {directorio}")
+    return os.path.realpath(os.path.join(directorio, nombre))
+
+
+def clave_archivo(ruta, **opciones):
+    """Identifica un CSV local sin leerlo: ruta, tamaño, fecha de modificacion y opciones."""
+    info = os.stat(ruta)
+    firma = f"{os.path.realpath(ruta)}|{info.st_size}|{info.st_mtime_ns}|{sorted(opciones.items())}"
+    return hashlib.blake2b(firma.encode(), digest_size=16).hexdigest()
+
+
+class Almacen:
+    """Almacen Parquet particionado ya ingerido; se consulta de forma perezosa."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(os.path.join(ruta, "_meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+    @property
+    def indicadores(self):
+        return self.meta["indicadores"]
+
+    @property
+    def continentes(self):
+        return self.meta["continentes"]
+
+    def consultar(self, indicador, continentes, columnas=None):
+        """Lee solo las particiones (y columnas) pedidas."""
+        if not continentes:
+            return pd.DataFrame(columns=columnas or self.meta["columnas"])
+        df = pd.read_parquet(
+            self.ruta,
+            engine="pyarrow",
+            columns=columnas,
+            filters=[("indicator", "==", indicador), ("continent", "in", list(continentes))],
+        )
+        # las columnas de particion vuelven como categoricas
+        for col in PARTICIONES:
+            if col in df.columns:
+                df[col] = df[col].astype(str)
+        orden = [c for c in self.meta["columnas"] if c in df.columns]
+        return df[orden]
+
+    def anomalias(self, indicador, continentes):
+        """Semanas anomalas de las particiones pedidas (precalculadas en la ingesta)."""
+        ruta = os.path.join(self.ruta, ARCHIVO_ANOMALIAS)
+        if not os.path.exists(ruta):
+            # almacen ingerido antes de la deteccion de anomalias
+            escribir_anomalias(self.ruta, self.meta["columnas"])
+        return pd.read_parquet(
+            ruta,
+            engine="pyarrow",
+            filters=[("indicator", "==", indicador), ("continent", "in", list(continentes) or [""])],
+        )
+
+
+def escribir_anomalias(ruta, columnas):
+    """Detecta las anomalias del almacen en `ruta` y las guarda junto a sus particiones."""
+    df = pd.read_parquet(ruta, engine="pyarrow", columns=[c for c in anomalias.COLUMNAS_ENTRADA if c in columnas])
+    for col in PARTICIONES:
+        df[col] = df[col].astype(str)
+    destino = os.path.join(ruta, ARCHIVO_ANOMALIAS)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    anomalias.detectar(df).to_parquet(temporal, index=False)
+    os.replace(temporal, destino)
+
+
+def existe_almacen(clave, directorio=DIR_ALMACEN):
+    return os.path.exists(os.path.join(directorio, clave, "_meta.json"))
+
+
+def _huellas(df, columnas):
+    datos = df if columnas is None else df[columnas]
+    huellas = np.empty(len(df), dtype=HUELLA)
+    huellas["a"] = pd.util.hash_pandas_object(datos, index=False).to_numpy()
+    huellas["b"] = pd.util.hash_pandas_object(datos, index=False, hash_key=SEMILLA_HUELLA).to_numpy()
+    return huellas
+
+
+def _limpiar_particiones(ruta, quitar_duplicados, imputar_iso, por_clave_natural):
+    """
+    Quita los duplicados entre bloques e imputa ISO3 en cada particion de
+    `ruta`, reescribiendola en un solo archivo. Devuelve (duplicados, iso_imputados).
+
+    Los bloques se procesan de a uno, en orden (se queda la primera
+    aparicion): de los anteriores solo se conservan las huellas ordenadas de
+    sus filas. Con 128 bits una colision es despreciable aun con miles de
+    millones de filas. Las columnas de particion no estan en los archivos y
+    son constantes dentro de cada particion, asi que la clave se compara sin
+    ellas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    clave = [c for c in CLAVE_NATURAL if c not in PARTICIONES] if por_clave_natural else None
+    duplicados = iso_imputados = 0
+    for carpeta, _, archivos in os.walk(ruta):
+        bloques = sorted(a for a in archivos if a.startswith("bloque-"))
+        if not bloques:
+            continue
+        rutas = [os.path.join(carpeta, a) for a in bloques]
+        # un bloque con una columna toda nula la trae como tipo null
+        esquema = pa.unify_schemas([pq.read_schema(r) for r in rutas])
+        vistas = np.empty(0, dtype=HUELLA)
+        with pq.ParquetWriter(os.path.join(carpeta, "limpio.parquet"), esquema) as escritor:
+            for r in rutas:
+                df = pq.read_table(r).cast(esquema).to_pandas()
+                if quitar_duplicados:
+                    huellas = _huellas(df, clave)
+                    conservar = np.zeros(len(df), dtype=bool)
+                    conservar[np.unique(huellas, return_index=True)[1]] = True
+                    posicion = np.searchsorted(vistas, huellas)
+                    if len(vistas):
+                        conservar &= vistas[np.minimum(posicion, len(vistas) - 1)] != huellas
+                    if clave is not None:
+                        # clave incompleta (agregados "(total)" sin ISO3): nunca es duplicado
+                        incompleta = df[clave].isna().any(axis=1).to_numpy()
+                        conservar |= incompleta
+                        nuevas = np.sort(huellas[conservar & ~incompleta])
+                    else:
+                        nuevas = np.sort(huellas[conservar])
+                    vistas = np.insert(vistas, np.searchsorted(vistas, nuevas), nuevas)
+                    duplicados += int((~conservar).sum())
+                    df = df[conservar]
+                if imputar_iso and "ISO3" in df.columns:
+                    # los "(total)" conservan el ISO3 nulo: con "UNK" serian una sola serie
+                    nulos = df["ISO3"].isna().to_numpy() & ~es_total(df)
+                    iso_imputados += int(nulos.sum())
+                    df = df.assign(ISO3=df["ISO3"].mask(nulos, "UNK"))
+                escritor.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False))
+        for r in rutas:
+            os.remove(r)
+    return duplicados, iso_imputados
+
+
+def ingerir_por_bloques(origen, clave, quitar_duplicados=True, imputar_iso=True,
+                        por_clave_natural=False, directorio=DIR_ALMACEN,
+                        tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """
+    Ingiere `origen` (ruta o buffer) bloque a bloque y devuelve el `Almacen`.
+
+    `progreso(filas_leidas)` se llama despues de cada bloque. Los duplicados
+    (fila completa, o solo `CLAVE_NATURAL` si `por_clave_natural`) se quitan
+    al final, comparando valores dentro de cada particion.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    destino = os.path.join(directorio, clave)
+    temporal = destino + ".tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    inicio = time.perf_counter()
+    filas = 0
+    columnas = None
+    indicadores, continentes = set(), set()
+
+    lector = pd.read_csv(origen, chunksize=tamano_bloque, dtype=ESQUEMA)
+    for i, bloque in enumerate(lector):
+        filas += len(bloque)
+        if columnas is None:
+            columnas = list(bloque.columns)
+            if quitar_duplicados and por_clave_natural:
+                _verificar_columnas(bloque, CLAVE_NATURAL)
+        bloque = preparar_columnas(bloque)
+
+        indicadores.update(bloque["indicator"].dropna().unique().tolist())
+        continentes.update(bloque["continent"].dropna().unique().tolist())
+
+        pq.write_to_dataset(
+            pa.Table.from_pandas(bloque, preserve_index=False),
+            root_path=temporal,
+            partition_cols=PARTICIONES,
+            basename_template=f"bloque-{i:05d}-{{i}}.parquet",
+        )
+        if progreso is not None:
+            progreso(filas)
+
+    duplicados = iso_imputados = 0
+    if quitar_duplicados or imputar_iso:
+        duplicados, iso_imputados = _limpiar_particiones(temporal, quitar_duplicados, imputar_iso, por_clave_natural)
+
+    meta = {
+        "filas": filas,
+        "duplicados": duplicados,
+        "iso_imputados": iso_imputados,
+        "columnas": columnas or [],
+        "indicadores": sorted(indicadores),
+        "continentes": sorted(continentes),
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+    with open(os.path.join(temporal, "_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    if columnas:
+        escribir_anomalias(temporal, columnas)
+
+    # publicacion atomica: nunca se consulta un almacen a medio escribir
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporal, destino)
+    return Almacen(destino)
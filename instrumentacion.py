@@ -0,0 +1,143 @@
+"""
+Instrumentacion por seccion del dashboard.
+
+`Perfilador.seccion(nombre)` (context manager) y `Perfilador.medir(nombre)`
+(decorador) registran, por rerun, el tiempo de pared, el tiempo de CPU del
+hilo del script, el pico de memoria (tracemalloc) y los bytes enviados al
+navegador que se reporten con `payload()`.
+
+tracemalloc es global al proceso: el pico de una seccion (`pico_proceso_mb`)
+incluye lo que asignen a la vez otras sesiones y los hilos de fondo (chat,
+precalentamiento, pronosticos), no solo la seccion. Se enciende mientras al
+menos una sesion tenga la instrumentacion activa y se apaga con la ultima. `figura()` registra ademas el
+tamaño serializado de cada grafico antes y despues de compactarlo. Desactivado
+no tiene costo: las secciones no miden nada.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+RUTA_EXPORTACION = os.path.join(".metricas", "instrumentacion.jsonl")
+
+# Sesiones con la instrumentacion activa (conteo de referencias de tracemalloc)
+_sesiones_trazando = set()
+_lock_trazado = threading.Lock()
+
+
+def _trazar(session_id, activo, sesion_activa=None):
+    """Registra la sesion y enciende/apaga tracemalloc segun queden sesiones instrumentando."""
+    with _lock_trazado:
+        if activo:
+            _sesiones_trazando.add(session_id)
+        else:
+            _sesiones_trazando.discard(session_id)
+        if sesion_activa is not None:
+            # sesiones cerradas sin apagar el toggle
+            _sesiones_trazando.intersection_update([s for s in _sesiones_trazando if sesion_activa(s)])
+        if _sesiones_trazando and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not _sesiones_trazando and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class _Marco:
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        self.base = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self.pico = self.base
+        self.payload = 0
+
+
+class Perfilador:
+    """Mediciones de un rerun; se crea uno nuevo al inicio de cada ejecucion del script."""
+
+    def __init__(self, activo=False, session_id=None, sesion_activa=None):
+        self.activo = activo
+        self.inicio = time.perf_counter()
+        self.secciones = []
+        self.figuras = []
+        self._pila = []
+        # tracemalloc encarece cada asignacion: solo corre mientras alguna sesion instrumenta
+        _trazar(session_id, activo, sesion_activa)
+
+    @contextmanager
+    def seccion(self, nombre):
+        if not self.activo:
+            yield
+            return
+        if tracemalloc.is_tracing():
+            # el pico acumulado hasta aqui pertenece a las secciones abiertas
+            pico = tracemalloc.get_traced_memory()[1]
+            for marco in self._pila:
+                marco.pico = max(marco.pico, pico)
+            tracemalloc.reset_peak()
+        marco = _Marco(nombre)
+        # se registra al abrir para conservar el orden de la pagina
+        registro = {"seccion": nombre, "nivel": len(self._pila)}
+        self.secciones.append(registro)
+        self._pila.append(marco)
+        try:
+            yield
+        finally:
+            self._pila.pop()
+            if tracemalloc.is_tracing():
+                marco.pico = max(marco.pico, tracemalloc.get_traced_memory()[1])
+            if self._pila:
+                self._pila[-1].pico = max(self._pila[-1].pico, marco.pico)
+                self._pila[-1].payload += marco.payload
+            registro.update({
+                "wall_ms": round((time.perf_counter() - marco.wall) * 1000, 2),
+                "cpu_ms": round((time.thread_time() - marco.cpu) * 1000, 2),
+                "pico_proceso_mb": round((marco.pico - marco.base) / 1e6, 3),
+                "payload_kb": round(marco.payload / 1024, 1),
+            })
+
+    def medir(self, nombre=None):
+        """Decorador equivalente a envolver la funcion en `seccion(nombre)`."""
+        def decorador(func):
+            @functools.wraps(func)
+            def envoltura(*args, **kwargs):
+                with self.seccion(nombre or func.__name__):
+                    return func(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def payload(self, nbytes):
+        """Suma bytes enviados al frontend a la seccion abierta mas interna."""
+        if self.activo and self._pila:
+            self._pila[-1].payload += int(nbytes)
+
+    def figura(self, bytes_original, bytes_enviados):
+        """Registra un grafico (JSON sin compactar vs. lo enviado) y suma lo enviado al payload."""
+        if not (self.activo and self._pila):
+            return
+        self.figuras.append({
+            "seccion": self._pila[-1].nombre,
+            "original_kb": round(bytes_original / 1024, 1),
+            "enviado_kb": round(bytes_enviados / 1024, 1),
+            "reduccion_pct": round(100 * (1 - bytes_enviados / bytes_original), 1) if bytes_original else 0.0,
+        })
+        self.payload(bytes_enviados)
+
+    @property
+    def total_ms(self):
+        return round((time.perf_counter() - self.inicio) * 1000, 2)
+
+    def exportar(self, session_id, ruta=RUTA_EXPORTACION):
+        """Agrega las mediciones de este rerun como una linea JSON."""
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        linea = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "session_id": session_id,
+            "total_ms": self.total_ms,
+            "secciones": self.secciones,
+            "figuras": self.figuras,
+        }
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(linea, ensure_ascii=False) + "\n")
@@ -1,15 +1,37 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import seaborn as sns
-import matplotlib.pyplot as plt
-from groq import Groq
-from datetime import datetime
-import geopandas as gpd
-import folium
-from streamlit_folium import st_folium
+import io
+import os
+import uuid
+# plotly, seaborn/matplotlib, geopandas, folium y groq se importan en la
+# seccion que los usa: la bienvenida se muestra sin pagar su carga
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import analitica
+import anomalias
+from cache_figuras import CacheFiguras
+import chat_worker
+import figuras
+import geometrias
+import motor_duckdb
+from herramientas_ia import HerramientasAnalista
+from grilla import Grilla
+from historial_chat import MENSAJES_POR_PAGINA, HistorialChat
+from imputacion import METODOS, Imputador
+from instrumentacion import Perfilador, RUTA_EXPORTACION
+from piramide import ETIQUETAS, NIVELES, Piramide, etiqueta_periodo
+from precalentamiento import RUTA_CSV, Precalentamiento, importar_modulos, activo as precalentamiento_activo
+from pronostico import MODELOS, Pronosticador, series_por_pais
+from ingesta import (
+    Almacen, clave_archivo, csv_disponibles, existe_almacen, ingerir_por_bloques, resolver_csv, DIR_ALMACEN
+)
+from registro_datos import RegistroDatasets, bytes_propios, clave_anexo, hash_contenido
+
+# Copy-on-write: las sesiones trabajan sobre vistas del dataset compartido
+# y solo se copian las columnas que se modifican. Desde pandas 3 es el unico
+# modo (la opcion esta deprecada); en pandas 2 hay que activarlo.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 # --- CONFIGURACIÓN DE LA PÁGINA ---
 st.set_page_config(
@@ -477,64 +499,507 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# --- INSTRUMENTACIÓN (tiempo, CPU, memoria y payload por sección) ---
+def sesion_activa(session_id):
+    try:
+        return Runtime.instance().is_active_session(session_id)
+    except Exception:
+        return True
+
+session_id = get_script_run_ctx().session_id
+perfil = Perfilador(
+    activo=st.session_state.get("instrumentacion", False),
+    session_id=session_id,
+    sesion_activa=sesion_activa,
+)
+
+def mostrar_plotly(fig, customdata=(), **kwargs):
+    # Arreglos en float32 binario y sin columnas de hover sin usar (figuras.compactar)
+    if perfil.activo:
+        bytes_original = len(fig.to_json())
+    figuras.compactar(fig, customdata)
+    if perfil.activo:
+        perfil.figura(bytes_original, len(fig.to_json()))
+    return st.plotly_chart(fig, **kwargs)
+
+@st.cache_resource
+def obtener_cache_figuras():
+    # Figuras serializadas compartidas por las sesiones (LRU con tope de memoria)
+    return CacheFiguras()
+
+def mostrar_figura(seccion, parametros, construir, customdata=(), **kwargs):
+    # La figura de la seccion sale del cache si no cambiaron sus parametros ni
+    # el dataset (clave_final); si no, se construye, se compacta y se guarda.
+    # Se cachea el objeto: un acierto no vuelve a parsear JSON
+    cache = obtener_cache_figuras()
+    guardada = cache.obtener(seccion, parametros, clave_final)
+    if guardada is None:
+        fig = construir()
+        if perfil.activo:
+            bytes_original = len(fig.to_json())
+        nbytes = len(figuras.compactar(fig, customdata).to_json())
+        cache.guardar(seccion, parametros, clave_final, fig, nbytes)
+        if perfil.activo:
+            perfil.figura(bytes_original, nbytes)
+    else:
+        fig, nbytes = guardada
+        perfil.payload(nbytes)
+    return st.plotly_chart(fig, **kwargs)
+
+def mostrar_pyplot(fig, **kwargs):
+    if perfil.activo:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        perfil.payload(buffer.tell())
+    return st.pyplot(fig, **kwargs)
+
+def mostrar_folium(mapa, **kwargs):
+    from streamlit_folium import st_folium
+    if perfil.activo:
+        perfil.payload(len(mapa.get_root().render()))
+    return st_folium(mapa, **kwargs)
+
+def mostrar_tabla(data, **kwargs):
+    if perfil.activo:
+        # Styler -> DataFrame; aproximacion del tamaño Arrow enviado
+        datos = pd.DataFrame(getattr(data, "data", data))
+        perfil.payload(datos.memory_usage(deep=True).sum())
+    return st.dataframe(data, **kwargs)
+
 # --- SIDEBAR: MÓDULO ETL (INGESTA Y LIMPIEZA) ---
 st.sidebar.markdown("### Modulo ETL e Ingesta")
 st.sidebar.markdown("---")
 uploaded_file = st.sidebar.file_uploader("Cargar Base de Datos Final (CSV)", type="csv")
 
-@st.cache_data
+# Modo por bloques: para CSV que no caben en memoria se ingiere a un almacen
+# Parquet particionado y el dashboard consulta solo lo que necesita
+modo_bloques = st.sidebar.toggle("Ingesta por bloques (CSV grandes)", key="modo_bloques")
+ruta_csv = ""
+disponibles = csv_disponibles() if modo_bloques else []
+if disponibles:
+    # Solo CSV de la carpeta de datos configurada (DSS_DIR_DATOS), nunca una ruta libre
+    nombre_csv = st.sidebar.selectbox(
+        "CSV del servidor (opcional):",
+        ["", *disponibles],
+        key="csv_servidor",
+        format_func=lambda nombre: nombre or "—",
+        help="Para extractos mas grandes que el limite de carga del navegador"
+    )
+    if nombre_csv:
+        ruta_csv = resolver_csv(nombre_csv)
+
+# Anexos semanales: solo las semanas nuevas, sin volver a subir el historico
+anexos = []
+if not modo_bloques and uploaded_file is not None:
+    anexos = st.sidebar.file_uploader(
+        "Anexar semanas nuevas (CSV)",
+        type="csv",
+        accept_multiple_files=True,
+        key="anexos",
+        help="Se aplican en orden sobre el dataset cargado; las derivadas se recalculan desde la ultima semana de cada pais"
+    )
+
+@st.cache_resource
 def load_world():
-    return gpd.read_file("countries.geojson")
+    # Capa binaria (Arrow IPC + WKB, memory-map) en vez de parsear el GeoJSON;
+    # cache_resource: solo lectura, sin copiar el GeoDataFrame en cada rerun
+    return geometrias.cargar()
 
-if uploaded_file is not None:
-    # Lectura de datos
-    df_raw = pd.read_csv(uploaded_file)
-    
-    # 1. Limpieza Interactiva (Requisito 2.1)
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("#### Limpieza de Datos")
-    
-    if st.sidebar.checkbox("Eliminar Duplicados"):
-        df_raw = df_raw.drop_duplicates()
-        st.sidebar.success("Duplicados eliminados.")
-
-    if st.sidebar.checkbox("Tratar Nulos en ISO3 (Codigos Pais)"):
-        nulos_iso = df_raw['ISO3'].isnull().sum() 
-        df_raw['ISO3'] = df_raw['ISO3'].fillna('UNK')
-        st.sidebar.info(f"Se imputaron {nulos_iso} codigos en el dataset global.")
-
-    metodo_nulos = st.sidebar.selectbox(
-        "Metodo de Imputacion (Variables Numericas):",
-        ["Ninguno", "Llenar con Media", "Llenar con Cero"]
+@st.cache_resource
+def obtener_registro():
+    # Datasets parseados compartidos por todas las sesiones (clave = hash del CSV)
+    return RegistroDatasets()
+
+CRITERIOS_DUPLICADO = ["Clave natural (ISO3, indicator, year_week)", "Filas exactas"]
+
+def hash_subida(archivo):
+    # El hash del contenido solo se calcula cuando cambia el archivo subido
+    if st.session_state.get("dataset_file_id") != archivo.file_id:
+        st.session_state.dataset_clave = hash_contenido(archivo.getvalue())
+        st.session_state.dataset_file_id = archivo.file_id
+    return st.session_state.dataset_clave
+
+@st.cache_resource(max_entries=4)
+def obtener_motor(clave, _fuente):
+    # Conexion DuckDB en proceso sobre el DataFrame registrado o el almacen Parquet
+    return motor_duckdb.MotorDuckDB(_fuente)
+
+@st.cache_resource(max_entries=16)
+def consultar_almacen(ruta, indicador, continentes, duckdb=False):
+    # Lectura perezosa: solo las particiones indicador/continente seleccionadas
+    if duckdb:
+        columnas = Almacen(ruta).meta["columnas"]
+        return obtener_motor(ruta, ruta).filtrar(indicador, continentes, columnas)
+    return Almacen(ruta).consultar(indicador, continentes)
+
+@st.cache_resource(max_entries=16)
+def consultar_anomalias(ruta, indicador, continentes):
+    # Marcas guardadas en el almacen por la ingesta: solo se leen las particiones pedidas
+    return Almacen(ruta).anomalias(indicador, continentes)
+
+@st.cache_resource(max_entries=16)
+def filtrar_anomalias(clave_dataset, indicador, continentes, _anomalias):
+    # Marcas calculadas al registrar el dataset, filtradas a la navegacion
+    return analitica.filtrar(_anomalias, indicador, continentes)
+
+@st.cache_resource(max_entries=16)
+def obtener_imputador(clave_limpieza, _df):
+    # Estadisticas de grupo y orden temporal cacheados por dataset limpio
+    return Imputador(_df)
+
+@st.cache_resource(max_entries=8)
+def obtener_grilla(clave_final, _df):
+    # Permutaciones de orden, busquedas y perfil de nulos/dtypes por dataset filtrado
+    return Grilla(_df)
+
+@st.cache_resource(max_entries=8)
+def obtener_piramide(clave_final, _df):
+    # Jerarquia pais/continente/mundo a cada granularidad (se construye a demanda)
+    return Piramide(_df)
+
+# Puntos por serie / pasos del slider que caben comodos en cada grafico
+MAX_PUNTOS_SERIE = 60
+MAX_PASOS_MAPA = 36
+
+@st.cache_resource(max_entries=8)
+def obtener_indice(clave_final, _df):
+    # ISO3 -> rango de filas para la seleccion cruzada
+    return analitica.IndicePaises(_df)
+
+# --- SELECCIÓN CRUZADA (click en el mapa / lazo en el scatter) ---
+def isos_scatter(evento):
+    puntos = ((evento or {}).get("selection") or {}).get("points", [])
+    return sorted({p["customdata"][0] for p in puntos if p.get("customdata")})
+
+def iso_mapa(datos_mapa):
+    dibujo = (datos_mapa or {}).get("last_active_drawing")
+    iso = dibujo["properties"].get("ISO3166-1-Alpha-3") if dibujo else None
+    return [iso] if iso else []
+
+def actualizar_seleccion():
+    # Los widgets guardan su ultimo valor en session_state: al inicio del rerun
+    # ya se sabe que cambio, antes de pintar los graficos que dependen de ello.
+    # La ultima interaccion (mapa o scatter) define la seleccion.
+    origenes = (
+        ("mapa", iso_mapa(st.session_state.get("mapa_gis"))),
+        ("scatter", isos_scatter(st.session_state.get("scatter_sel"))),
     )
+    for origen, isos in origenes:
+        if isos == st.session_state.get(f"seleccion_{origen}"):
+            continue
+        st.session_state[f"seleccion_{origen}"] = isos
+        if isos:
+            st.session_state.seleccion_iso = isos
+            st.session_state.seleccion_origen = origen
+        elif st.session_state.get("seleccion_origen") == origen:
+            st.session_state.seleccion_iso = []
+
+def limpiar_seleccion():
+    st.session_state.seleccion_iso = []
+
+@st.cache_resource(max_entries=8)
+def cargar_herramientas(df):
+    # Agregados del AI Analyst: se construyen una vez por dataset filtrado
+    return HerramientasAnalista(df)
+
+@st.cache_resource
+def obtener_pronosticador():
+    # Pool de procesos + cache de ajustes por huella de serie, compartido por las sesiones
+    return Pronosticador()
+
+@st.cache_resource
+def obtener_gestor_chat():
+    # Pool de generacion compartido por todas las sesiones del proceso
+    return chat_worker.GestorChat(chat_worker.MAX_CONCURRENTES)
+
+@st.cache_resource
+def obtener_historial_chat():
+    # Historial persistente (SQLite) compartido por las sesiones del proceso
+    return HistorialChat()
+
+def conversacion_chat():
+    # Usuario autenticado si lo hay; si no, un id en la URL (?chat=...) que
+    # sobrevive a recargas y reconexiones
+    try:
+        correo = st.user.get("email")
+    except Exception:
+        correo = None
+    if correo:
+        return f"usuario:{correo}"
+    if "chat" not in st.query_params:
+        st.query_params["chat"] = uuid.uuid4().hex
+    return f"url:{st.query_params['chat']}"
+
+@st.cache_data(max_entries=64)
+def pagina_chat(conversacion, ultimo_id, limite):
+    # Mensajes completos no cambian: la pagina se lee y prepara una vez por
+    # version del historial (ultimo_id), no en cada rerun
+    mensajes = obtener_historial_chat().pagina(conversacion, limite, antes_de=ultimo_id + 1)
+    for mensaje in mensajes:
+        mensaje["avatar"] = "🧑‍💻" if mensaje["role"] == "user" else "🤖"
+        mensaje["pie"] = "🔧 " + " · ".join(mensaje["herramientas"]) if mensaje["herramientas"] else ""
+    return mensajes
+
+@st.cache_data(max_entries=256)
+def frame_mapa(clave_frame, _df_viz, fecha, variable):
+    # Un frame por fecha; la clave solo cambia si un anexo toco esa fecha
+    return analitica.agregar_mapa(_df_viz, fecha, variable)
+
+@st.cache_data(max_entries=256)
+def frame_mapa_periodo(clave_final, nivel, fecha, variable, _piramide):
+    # Mes/trimestre/año: un frame por periodo desde el cubo pais de la jerarquia
+    return analitica.agregar_mapa(_piramide.paises(nivel), fecha, variable)
+
+@st.cache_data(max_entries=8)
+def contexto_ia(df_final, indicador):
+    # Contexto del sistema para la IA (cacheado por dataset filtrado)
+    return analitica.construir_contexto_ia(df_final, indicador)
+
+registro = obtener_registro()
+
+# --- PRECALENTAMIENTO DEL DATASET INCLUIDO ---
+def precalentar_memoria(pre):
+    # El mismo camino que la primera carga de bd_final_eafit.csv con las
+    # opciones por defecto del sidebar, para que las claves coincidan
+    with pre.etapa("lectura + registro (parseo, hashes, anomalias)"):
+        with open(RUTA_CSV, "rb") as f:
+            contenido = f.read()
+        clave = hash_contenido(contenido)
+        df = registro.precargar(clave, contenido)
+    with pre.etapa("geometrias (load_world)"):
+        load_world()
+    
+    indicador = df["indicator"].unique()[0]
+    continentes = list(df["continent"].unique())
+    metodo = next(iter(METODOS))
+    df_final = analitica.filtrar(df, indicador, continentes)
+    clave_final = f"{clave}|{metodo}|{indicador}|{sorted(continentes)}"
     
-    df_clean = df_raw.copy()
-    num_cols = df_clean.select_dtypes(include=[np.number]).columns
+    with pre.etapa("indices (grilla, paises)"):
+        obtener_grilla(clave_final, df_final).perfil()
+        obtener_indice(clave_final, df_final)
+    with pre.etapa("cubos (pais/continente/mundo)"):
+        piramide = obtener_piramide(clave_final, df_final)
+        for nivel in NIVELES:
+            piramide.paises(nivel)
+            piramide.continentes(nivel)
+            piramide.mundo(nivel)
+            piramide.periodos(nivel)
+        piramide.resumen_continentes()
+    with pre.etapa("anomalias"):
+        filtrar_anomalias(clave, indicador, tuple(continentes), registro.anomalias(clave))
+    with pre.etapa("primer frame del mapa"):
+        nivel = piramide.nivel_para(MAX_PASOS_MAPA)
+        fecha = piramide.periodos(nivel)[0]
+        if nivel == "semana":
+            version = registro.version_fecha(clave, pd.Timestamp(fecha))
+            frame_mapa(f"{version}|{indicador}|{sorted(continentes)}",
+                       analitica.preparar_viz(df_final), fecha, "casos_100k")
+        else:
+            frame_mapa_periodo(clave_final, nivel, fecha, "casos_100k", piramide)
+    importar_modulos(pre)
+
+@st.cache_resource
+def obtener_precalentamiento():
+    # Una vez por proceso, en segundo plano: la bienvenida no espera
+    pre = Precalentamiento()
+    if precalentamiento_activo():
+        pre.iniciar(precalentar_memoria)
+    return pre
+
+precalentamiento = obtener_precalentamiento()
+if precalentamiento.estado == "listo":
+    st.sidebar.caption(f"🔥 `{RUTA_CSV}` precalentado en {precalentamiento.segundos:.1f} s")
+elif precalentamiento.estado == "en curso":
+    st.sidebar.caption(f"⏳ Precalentando `{RUTA_CSV}`...")
+
+if uploaded_file is not None or ruta_csv:
+    with perfil.seccion("etl"):
+        # 1. Limpieza Interactiva (Requisito 2.1)
+        st.sidebar.markdown("---")
+        st.sidebar.markdown("#### Limpieza de Datos")
     
-    if metodo_nulos == "Llenar con Media":
-        df_clean[num_cols] = df_clean[num_cols].fillna(df_clean[num_cols].mean())
-    elif metodo_nulos == "Llenar con Cero":
-        df_clean[num_cols] = df_clean[num_cols].fillna(0)
-
-    # 2. Filtros de Navegación
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("#### Navegacion de Analisis")
-    indicador = st.sidebar.selectbox("Seleccione Indicador:", df_clean['indicator'].unique())
-    continentes = st.sidebar.multiselect("Filtrar Continentes:", df_clean['continent'].unique(), default=df_clean['continent'].unique())
+        if modo_bloques:
+            # En modo bloques la limpieza se aplica a cada bloque durante la ingesta
+            quitar_duplicados = st.sidebar.checkbox("Eliminar Duplicados", value=True)
+            por_clave = quitar_duplicados and st.sidebar.radio(
+                "Criterio de duplicado:", CRITERIOS_DUPLICADO, key="criterio_dup_bloques"
+            ) == CRITERIOS_DUPLICADO[0]
+            imputar_iso = st.sidebar.checkbox("Tratar Nulos en ISO3 (Codigos Pais)", value=True)
+        
+            if ruta_csv:
+                clave_dataset = clave_archivo(ruta_csv, dup=quitar_duplicados, clave=por_clave, iso=imputar_iso)
+            else:
+                clave_dataset = hash_contenido(
+                    f"{hash_subida(uploaded_file)}|{quitar_duplicados}|{por_clave}|{imputar_iso}".encode()
+                )
+            ruta_almacen = os.path.join(DIR_ALMACEN, clave_dataset)
+            registro.liberar(session_id)
+        
+            if not existe_almacen(clave_dataset):
+                avance = st.sidebar.empty()
+                if uploaded_file is not None and not ruta_csv:
+                    uploaded_file.seek(0)
+                ingerir_por_bloques(
+                    ruta_csv or uploaded_file,
+                    clave_dataset,
+                    quitar_duplicados=quitar_duplicados,
+                    imputar_iso=imputar_iso,
+                    por_clave_natural=por_clave,
+                    progreso=lambda filas: avance.caption(f"⏳ Ingeridas {filas:,} filas...")
+                )
+                avance.empty()
+        
+            almacen = Almacen(ruta_almacen)
+            st.sidebar.info(
+                f"Almacen por bloques: {almacen.meta['filas']:,} filas, "
+                f"{almacen.meta['duplicados']:,} duplicados eliminados, "
+                f"{almacen.meta['iso_imputados']:,} ISO3 imputados."
+            )
+            opciones_indicador = almacen.indicadores
+            opciones_continente = almacen.continentes
+        else:
+            clave_dataset = hash_subida(uploaded_file)
+        
+            # Cada anexo se encadena sobre la version anterior del dataset
+            hashes_anexo = st.session_state.setdefault("hashes_anexo", {})
+            claves = [clave_dataset]
+            for archivo in anexos:
+                if archivo.file_id not in hashes_anexo:
+                    hashes_anexo[archivo.file_id] = hash_contenido(archivo.getvalue())
+                claves.append(clave_anexo(claves[-1], hashes_anexo[archivo.file_id]))
+        
+            registro.purgar(sesion_activa)
+            # Se parte de la version mas reciente ya registrada: lo anterior no se
+            # re-parsea. Buscarla y tomar la referencia es un solo paso del
+            # registro, asi otra sesion no puede purgarla en medio
+            df_raw, inicio = None, len(claves)
+            while df_raw is None and inicio > 0:
+                inicio -= 1
+                df_raw = registro.adquirir_si_existe(claves[inicio], session_id)
+            if df_raw is None:
+                # solo en un fallo del registro se copia el buffer subido
+                df_raw = registro.adquirir(claves[0], uploaded_file.getvalue(), session_id)
+            for i in range(inicio + 1, len(claves)):
+                df_raw = registro.anexar(claves[i - 1], claves[i], anexos[i - 1].getvalue(), session_id)
+            clave_dataset = claves[-1]
+        
+            reporte_anexo = registro.anexo(clave_dataset)
+            if reporte_anexo is not None:
+                st.sidebar.success(
+                    f"Ultimo anexo: {reporte_anexo['filas']:,} filas nuevas en "
+                    f"{len(reporte_anexo['series'])} series ({len(reporte_anexo['fechas'])} fechas); "
+                    f"{reporte_anexo['descartadas']:,} ya existentes descartadas."
+                )
+        
+            # Identifica el dataset limpio (para cachear lo que depende de la limpieza)
+            opciones_limpieza = ""
+        
+            if st.sidebar.checkbox("Eliminar Duplicados"):
+                criterio_dup = st.sidebar.radio("Criterio de duplicado:", CRITERIOS_DUPLICADO, key="criterio_dup")
+                opciones_limpieza += f"|dup:{criterio_dup}"
+                # Hashes precalculados en la ingesta: no se re-hashea en cada rerun
+                try:
+                    mascara_dup, grupos_dup = registro.duplicados(
+                        clave_dataset, "clave" if criterio_dup == CRITERIOS_DUPLICADO[0] else "exactas"
+                    )
+                except ValueError as e:
+                    st.sidebar.error(str(e))
+                else:
+                    df_raw = df_raw[mascara_dup]
+                    st.sidebar.success(f"Duplicados eliminados: {(~mascara_dup).sum()} filas en {len(grupos_dup)} grupos.")
+                    if len(grupos_dup):
+                        with st.sidebar.expander("Grupos duplicados"):
+                            mostrar_tabla(grupos_dup.head(100), use_container_width=True)
+
+            if st.sidebar.checkbox("Tratar Nulos en ISO3 (Codigos Pais)"):
+                df_raw, nulos_iso = analitica.imputar_iso(df_raw)
+                opciones_limpieza += "|iso"
+                st.sidebar.info(f"Se imputaron {nulos_iso} codigos en el dataset global.")
+        
+            clave_limpieza = clave_dataset + opciones_limpieza
+            df_clean = df_raw.copy(deep=False)  # vista perezosa (copy-on-write)
+            opciones_indicador = df_clean['indicator'].unique()
+            opciones_continente = df_clean['continent'].unique()
+
+        metodo_nulos = st.sidebar.selectbox(
+            "Metodo de Imputacion (Variables Numericas):",
+            list(METODOS)
+        )
+        usar_duckdb = st.sidebar.toggle(
+            "Motor de consultas DuckDB",
+            key="motor_duckdb",
+            disabled=not motor_duckdb.disponible(),
+            help="Filtros y agregaciones de los graficos en SQL (DuckDB embebido, multihilo). Requiere `pip install duckdb`."
+        )
+
+        # 2. Filtros de Navegación
+        st.sidebar.markdown("---")
+        st.sidebar.markdown("#### Navegacion de Analisis")
+        indicador = st.sidebar.selectbox("Seleccione Indicador:", opciones_indicador)
+        continentes = st.sidebar.multiselect("Filtrar Continentes:", opciones_continente, default=opciones_continente)
     
-    # Filtrado Final
-    df_final = df_clean[(df_clean['indicator'] == indicador) & (df_clean['continent'].isin(continentes))]
+        if modo_bloques:
+            # Filtrado Final: consulta perezosa al almacen (la imputacion usa las
+            # estadisticas de la particion consultada, no del dataset completo)
+            df_final = consultar_almacen(ruta_almacen, indicador, tuple(continentes), usar_duckdb)
+            num_cols = analitica.columnas_numericas(df_final)
+            clave_final = f"{ruta_almacen}|{metodo_nulos}|{indicador}|{sorted(continentes)}"
+        
+            if metodo_nulos != "Ninguno":
+                imputador = obtener_imputador(f"{ruta_almacen}|{indicador}|{sorted(continentes)}", df_final)
+                df_final = imputador.aplicar(metodo_nulos, num_cols)
+        else:
+            num_cols = analitica.columnas_numericas(df_clean)
+        
+            if metodo_nulos != "Ninguno":
+                df_clean = obtener_imputador(clave_limpieza, df_clean).aplicar(metodo_nulos, num_cols)
+        
+            # Filtrado Final
+            df_final = analitica.filtrar(df_clean, indicador, continentes)
+            clave_final = f"{clave_limpieza}|{metodo_nulos}|{indicador}|{sorted(continentes)}"
+
+            # Memoria: dataset compartido vs. lo que añade esta sesion
+            stats_registro = registro.estadisticas(clave_dataset)
+            bytes_sesion = bytes_propios(df_clean, registro.base(clave_dataset)) + int(df_final.memory_usage(deep=False).sum())
+            st.sidebar.caption(
+                f"💾 Dataset compartido: {stats_registro['bytes_compartidos'] / 1e6:.1f} MB "
+                f"({stats_registro['sesiones']} sesiones) · Esta sesion: {bytes_sesion / 1e6:.1f} MB"
+            )
+
+        # Motor DuckDB para las agregaciones de los graficos: consulta el dataset
+        # limpio (sin filtrar) y empuja indicador/continentes al WHERE
+        motor = None
+        if usar_duckdb:
+            if modo_bloques and metodo_nulos == "Ninguno":
+                motor = obtener_motor(ruta_almacen, ruta_almacen)
+            elif modo_bloques:
+                motor = obtener_motor(clave_final, df_final)
+            else:
+                motor = obtener_motor(f"{clave_limpieza}|{metodo_nulos}", df_clean)
+
+        # Jerarquia pais -> continente -> mundo por periodo (tarjetas, continentes, rollups)
+        piramide = obtener_piramide(clave_final, df_final)
+
+        # Semanas anomalas por pais (precalculadas en la ingesta; aqui solo se filtran)
+        if modo_bloques:
+            df_anomalias = consultar_anomalias(ruta_almacen, indicador, tuple(continentes))
+        else:
+            df_anomalias = filtrar_anomalias(
+                clave_dataset, indicador, tuple(continentes), registro.anomalias(clave_dataset)
+            )
 
     # --- ESTRUCTURA DE PESTAÑAS (Requisito 2.2) ---
-    tab_desc, tab_cuant, tab_graf, tab_ia = st.tabs([
+    tab_desc, tab_cuant, tab_graf, tab_pron, tab_ia = st.tabs([
         "  📋 Analisis Descriptivo  ", 
         "  📊 Analisis Cuantitativo  ", 
         "  📈 Visualizaciones Dinamicas  ", 
+        "  🔮 Pronosticos  ",
         "  🤖 AI Analyst  "
     ])
 
     # --- TAB 1: ANÁLISIS DESCRIPTIVO (Cualitativo) ---
-    with tab_desc:
+    with tab_desc, perfil.seccion("tab_desc"):
         st.markdown("""
         <div class="section-card">
             <p class="section-title">Glosario y Resumen de Datos</p>
@@ -552,19 +1017,58 @@ if uploaded_file is not None:
             | `avg_temp` | Temperatura promedio mensual del pais. |
             """)
         
+        grilla = obtener_grilla(clave_final, df_final)
+        nulos, estructura = grilla.perfil()
+        
         c1, c2 = st.columns(2)
         with c1:
             st.markdown("**Calidad del Dataset (Nulos)**")
-            st.dataframe(df_final.isnull().sum().rename("Nulos"), use_container_width=True)
+            mostrar_tabla(nulos, use_container_width=True)
         with c2:
             st.markdown("**Estructura de Datos**")
-            st.dataframe(df_final.dtypes.value_counts().rename("Cantidad"), use_container_width=True)
+            mostrar_tabla(estructura, use_container_width=True)
+        
+        # Paginar/ordenar/buscar solo re-ejecuta este fragmento y envia la pagina visible
+        @st.fragment
+        def explorador_datos():
+            st.markdown("**Explorador del Dataset Limpio**")
+            g1, g2, g3, g4 = st.columns([3, 2, 1, 1])
+            with g1:
+                busqueda = st.text_input("Buscar:", key="grid_busqueda",
+                                         placeholder="Pais, ISO3, continente, semana...")
+            with g2:
+                col_orden = st.selectbox("Ordenar por:", ["(orden original)", *df_final.columns], key="grid_orden")
+            with g3:
+                descendente = st.toggle("Descendente", key="grid_desc")
+            with g4:
+                tamano = st.selectbox("Filas:", [25, 50, 100, 200], key="grid_tamano")
+        
+            indices = grilla.indices(
+                None if col_orden == "(orden original)" else col_orden, descendente, busqueda
+            )
+            total = len(indices)
+            paginas = max(1, -(-total // tamano))
+            if st.session_state.get("grid_pagina", 1) > paginas:
+                st.session_state.grid_pagina = paginas
         
-        st.markdown("**Vista Previa del Dataset Limpio**")
-        st.dataframe(df_final.head(15), use_container_width=True)
+            p1, p2 = st.columns([1, 4])
+            with p1:
+                pagina = st.number_input("Pagina:", min_value=1, max_value=paginas, step=1, key="grid_pagina")
+            df_pagina = grilla.pagina(indices, pagina, tamano)
+            mostrar_tabla(df_pagina, use_container_width=True)
+            with p2:
+                inicio = (pagina - 1) * tamano
+                st.caption(
+                    f"Filas {min(inicio + 1, total):,}–{inicio + len(df_pagina):,} de {total:,} "
+                    f"({len(df_final):,} en el dataset filtrado) · pagina {pagina} de {paginas}"
+                )
+        
+        explorador_datos()
 
     # --- TAB 2: ANÁLISIS CUANTITATIVO ---
-    with tab_cuant:
+    with tab_cuant, perfil.seccion("tab_cuant"):
+        import plotly.express as px
+        
         st.markdown("""
         <div class="section-card">
             <p class="section-title">Correlaciones y Estadisticas</p>
@@ -574,10 +1078,16 @@ if uploaded_file is not None:
         
         # Métricas de Resumen
         m1, m2, m3, m4 = st.columns(4)
-        m1.metric("Letalidad Media (%)", f"{df_final['letalidad_pct'].mean():.4f}%")
-        m2.metric("Incidencia x 100k", f"{df_final['casos_100k'].mean():.2f}")
-        m3.metric("Temp. Promedio", f"{df_final['avg_temp'].mean():.1f} °C")
-        m4.metric("Paises Analizados", f"{df_final['country'].nunique()}")
+        # Desde la jerarquia pais -> continente -> mundo (tasas ponderadas por poblacion)
+        metricas = analitica.metricas_resumen(df_final, piramide)
+        ayuda_ponderada = "Media semanal de la tasa agregada (conteos sumados / poblacion sumada)"
+        m1.metric("Letalidad Media (%)", f"{metricas.letalidad_media:.4f}%", help=ayuda_ponderada)
+        m2.metric("Incidencia x 100k", f"{metricas.incidencia_media:.2f}", help=ayuda_ponderada)
+        m3.metric("Temp. Promedio", f"{metricas.temperatura_media:.1f} °C", help="Ponderada por poblacion")
+        m4.metric("Paises Analizados", f"{metricas.paises}")
+        
+        with st.expander("Resumen por continente (ponderado por poblacion)"):
+            mostrar_tabla(piramide.resumen_continentes().round(4), use_container_width=True)
         
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -586,10 +1096,8 @@ if uploaded_file is not None:
         
         with col_stat1:
             st.markdown("**📊 Estadisticas Descriptivas**")
-            stats_df = df_final[num_cols].describe().T
-            stats_df = stats_df[['mean', 'std', 'min', '25%', '50%', '75%', 'max']]
-            stats_df.columns = ['Media', 'Desv.Est', 'Min', 'Q1', 'Mediana', 'Q3', 'Max']
-            st.dataframe(stats_df.round(2), use_container_width=True)
+            stats_df = analitica.estadisticas_descriptivas(df_final, num_cols)
+            mostrar_tabla(stats_df.round(2), use_container_width=True)
         
         with col_stat2:
             st.markdown("**📦 Box Plot - Distribucion por Continente**")
@@ -597,50 +1105,59 @@ if uploaded_file is not None:
                                        ['letalidad_pct', 'casos_100k', 'camas_por_100k', 'avg_temp'],
                                        key='boxplot_var')
             
-            fig_box = px.box(
-                df_final, 
-                x="continent", 
-                y=var_boxplot,
-                color="continent",
-                color_discrete_sequence=['#22D3EE', '#818CF8', '#34D399', '#F472B6', '#FBBF24', '#FB923C'],
-                template="plotly_dark"
-            )
-            fig_box.update_layout(
-                plot_bgcolor='#111827',
-                paper_bgcolor='#0B0F19',
-                font=dict(family="Inter", size=11, color='#94A3B8'),
-                margin=dict(t=10, b=10, l=10, r=10),
-                xaxis=dict(gridcolor='#1E293B', title=""),
-                yaxis=dict(gridcolor='#1E293B'),
-                showlegend=False,
-                height=300
-            )
-            st.plotly_chart(fig_box, use_container_width=True)
+            def figura_box():
+                fig_box = px.box(
+                    df_final, 
+                    x="continent", 
+                    y=var_boxplot,
+                    color="continent",
+                    color_discrete_sequence=['#22D3EE', '#818CF8', '#34D399', '#F472B6', '#FBBF24', '#FB923C'],
+                    template="plotly_dark"
+                )
+                fig_box.update_layout(
+                    plot_bgcolor='#111827',
+                    paper_bgcolor='#0B0F19',
+                    font=dict(family="Inter", size=11, color='#94A3B8'),
+                    margin=dict(t=10, b=10, l=10, r=10),
+                    xaxis=dict(gridcolor='#1E293B', title=""),
+                    yaxis=dict(gridcolor='#1E293B'),
+                    showlegend=False,
+                    height=300
+                )
+                return fig_box
+            mostrar_figura("box", (var_boxplot,), figura_box, use_container_width=True)
         
         st.markdown("---")
         st.markdown("**🔗 Matriz de Correlacion de Pearson**")
-        df_corr = df_final[num_cols].corr()
-        fig_corr, ax = plt.subplots(figsize=(10, 6))
-        sns.heatmap(
-            df_corr, annot=True, cmap="coolwarm", center=0, fmt=".2f", ax=ax,
-            linewidths=0.5, linecolor='#1E293B',
-            cbar_kws={"shrink": 0.8},
-            annot_kws={"color": "#E2E8F0", "fontsize": 10}
-        )
-        ax.set_facecolor('#111827')
-        fig_corr.patch.set_facecolor('#0B0F19')
-        ax.tick_params(colors='#94A3B8', labelsize=10)
-        for text in ax.get_xticklabels() + ax.get_yticklabels():
-            text.set_color('#94A3B8')
-        cbar = ax.collections[0].colorbar
-        if cbar:
-            cbar.ax.tick_params(colors='#94A3B8')
-            cbar.outline.set_edgecolor('#1E293B')
-        plt.tight_layout()
-        st.pyplot(fig_corr)
+        with perfil.seccion("heatmap_seaborn"):
+            import matplotlib.pyplot as plt
+            import seaborn as sns
+            
+            df_corr = analitica.matriz_correlacion(df_final, num_cols)
+            fig_corr, ax = plt.subplots(figsize=(10, 6))
+            sns.heatmap(
+                df_corr, annot=True, cmap="coolwarm", center=0, fmt=".2f", ax=ax,
+                linewidths=0.5, linecolor='#1E293B',
+                cbar_kws={"shrink": 0.8},
+                annot_kws={"color": "#E2E8F0", "fontsize": 10}
+            )
+            ax.set_facecolor('#111827')
+            fig_corr.patch.set_facecolor('#0B0F19')
+            ax.tick_params(colors='#94A3B8', labelsize=10)
+            for text in ax.get_xticklabels() + ax.get_yticklabels():
+                text.set_color('#94A3B8')
+            cbar = ax.collections[0].colorbar
+            if cbar:
+                cbar.ax.tick_params(colors='#94A3B8')
+                cbar.outline.set_edgecolor('#1E293B')
+            plt.tight_layout()
+            mostrar_pyplot(fig_corr)
 
     # --- TAB 3: VISUALIZACIONES DINÁMICAS (MEJORADO) ---
-    with tab_graf:
+    with tab_graf, perfil.seccion("tab_graf"):
+        import plotly.express as px
+        import plotly.graph_objects as go
+        
         st.markdown("""
         <div class="section-card">
             <p class="section-title">Exploracion Visual Interactiva</p>
@@ -648,9 +1165,38 @@ if uploaded_file is not None:
         </div>
         """, unsafe_allow_html=True)
         
-        # Fix para el error de 'size' en Plotly
-        df_viz = df_final.copy()
-        df_viz['size_ref'] = df_viz['camas_por_100k'].fillna(0).apply(lambda x: x if x > 0 else 0.1)
+        # Sin copia: con copy-on-write `assign` solo agrega la columna nueva.
+        # 'date' ya llega como datetime desde la ingesta (ingesta.leer_csv).
+        # Fix para el error de 'size' en Plotly (vectorizado)
+        df_viz = analitica.preparar_viz(df_final)
+        paises_viz = sorted(df_viz['country'].unique())
+        
+        # Seleccion cruzada: filtra la serie temporal, resalta el ranking y
+        # alimenta la comparacion y el contexto del chat
+        actualizar_seleccion()
+        indice = obtener_indice(clave_final, df_final)
+        seleccion = [iso for iso in st.session_state.get("seleccion_iso", []) if iso in indice.pais_por_iso]
+        paises_sel = indice.paises(seleccion)
+        if seleccion:
+            col_sel1, col_sel2 = st.columns([5, 1])
+            with col_sel1:
+                origen = "mapa" if st.session_state.get("seleccion_origen") == "mapa" else "scatter"
+                st.info(f"🎯 Seleccion desde el {origen}: {', '.join(paises_sel)}")
+            with col_sel2:
+                st.button("Limpiar seleccion", on_click=limpiar_seleccion, key="limpiar_seleccion")
+        
+        # Granularidad temporal: la automatica usa el nivel mas fino que cabe en cada grafico
+        granularidad = st.radio(
+            "Granularidad temporal:",
+            ["Automatica", *ETIQUETAS.values()],
+            horizontal=True,
+            key="granularidad"
+        )
+        
+        def nivel_grafico(max_puntos):
+            if granularidad == "Automatica":
+                return piramide.nivel_para(max_puntos)
+            return next(nivel for nivel, etiqueta in ETIQUETAS.items() if etiqueta == granularidad)
         
         # --- SECCIÓN 1: EVOLUCIÓN TEMPORAL ---
         if 'date' in df_viz.columns or 'year_week' in df_viz.columns:
@@ -659,20 +1205,13 @@ if uploaded_file is not None:
             # Determinar columna temporal
             time_col = 'date' if 'date' in df_viz.columns else 'year_week'
             
-            # Convertir a datetime si es necesario
-            if time_col == 'date':
-                try:
-                    df_viz[time_col] = pd.to_datetime(df_viz[time_col])
-                except:
-                    pass
-            
             col_time1, col_time2 = st.columns([1, 3])
             
             with col_time1:
                 paises_time = st.multiselect(
                     "Selecciona Paises:",
-                    options=sorted(df_viz['country'].unique()),
-                    default=sorted(df_viz['country'].unique())[:5] if len(df_viz['country'].unique()) >= 5 else sorted(df_viz['country'].unique()),
+                    options=paises_viz,
+                    default=paises_viz[:5],
                     key='time_countries'
                 )
                 
@@ -681,34 +1220,99 @@ if uploaded_file is not None:
                     ['casos_100k', 'letalidad_pct', 'camas_por_100k'],
                     key='time_var'
                 )
+                
+                por_continente = time_col == 'date' and st.toggle(
+                    "Agregar por continente",
+                    key='time_continente',
+                    help="Tasas del continente ponderadas por poblacion (conteos y poblaciones sumados)"
+                )
+                
+                marcar_anomalias = time_col == 'date' and not por_continente and st.toggle(
+                    "Marcar semanas anomalas",
+                    value=True,
+                    key='time_anomalias',
+                    help=f"Saltos de conteo o tasa 14d (z robusto > {anomalias.UMBRAL_Z} vs. las "
+                         f"{anomalias.VENTANA} semanas previas) o quiebres del crecimiento semanal"
+                )
             
             with col_time2:
-                if paises_time:
-                    df_time = df_viz[df_viz['country'].isin(paises_time)].sort_values(time_col)
-                    
-                    fig_time = px.line(
-                        df_time,
-                        x=time_col,
-                        y=var_time,
-                        color='country',
-                        title=f"Evolucion de {var_time} en el tiempo",
-                        color_discrete_sequence=['#22D3EE', '#818CF8', '#34D399', '#F472B6', '#FBBF24'],
-                        template="plotly_dark"
-                    )
-                    fig_time.update_layout(
-                        plot_bgcolor='#111827',
-                        paper_bgcolor='#0B0F19',
-                        font=dict(family="Inter", size=12, color='#94A3B8'),
-                        margin=dict(t=40, b=20),
-                        xaxis=dict(gridcolor='#1E293B'),
-                        yaxis=dict(gridcolor='#1E293B'),
-                        hovermode='x unified',
-                        height=400
+                paises_serie = paises_sel if seleccion else paises_time
+                nivel_serie = nivel_grafico(MAX_PUNTOS_SERIE) if time_col == 'date' else "semana"
+                if seleccion:
+                    st.caption("Mostrando los paises de la seleccion cruzada")
+                
+                if por_continente or paises_serie:
+                    def figura_serie():
+                        color_serie = 'continent' if por_continente else 'country'
+                        if por_continente:
+                            df_time = piramide.continentes(nivel_serie).sort_values(time_col)
+                        elif nivel_serie != "semana":
+                            # Rollup precalculado: tasas recalculadas desde los conteos del periodo
+                            df_time = analitica.serie_temporal(piramide.paises(nivel_serie), paises_serie, var_time, time_col)
+                        elif seleccion:
+                            # Filas de los paises seleccionados via el indice (sin recorrer df_viz)
+                            df_time = analitica.serie_temporal(indice.filas(seleccion), paises_sel, var_time, time_col)
+                        else:
+                            # Solo las columnas que usa el grafico
+                            df_time = analitica.serie_temporal(df_viz, paises_time, var_time, time_col)
+                        
+                        fig_time = px.line(
+                            df_time,
+                            x=time_col,
+                            y=var_time,
+                            color=color_serie,
+                            title=f"Evolucion de {var_time} en el tiempo ({ETIQUETAS[nivel_serie].lower()})",
+                            color_discrete_sequence=['#22D3EE', '#818CF8', '#34D399', '#F472B6', '#FBBF24'],
+                            template="plotly_dark"
+                        )
+                        fig_time.update_layout(
+                            plot_bgcolor='#111827',
+                            paper_bgcolor='#0B0F19',
+                            font=dict(family="Inter", size=12, color='#94A3B8'),
+                            margin=dict(t=40, b=20),
+                            xaxis=dict(gridcolor='#1E293B'),
+                            yaxis=dict(gridcolor='#1E293B'),
+                            hovermode='x unified',
+                            height=400
+                        )
+                        if marcar_anomalias:
+                            # Semanas anomalas llevadas al periodo del grafico, sobre la linea de su pais
+                            marcas = anomalias.por_periodo(df_anomalias, nivel_serie)
+                            marcas = marcas.loc[marcas['country'].isin(paises_serie), ['country', 'date']].drop_duplicates()
+                            puntos = df_time.merge(marcas, on=['country', 'date'])
+                            if len(puntos):
+                                fig_time.add_trace(go.Scatter(
+                                    x=puntos['date'], y=puntos[var_time],
+                                    mode='markers', name='Anomalia',
+                                    marker=dict(symbol='x', size=10, color='#F87171'),
+                                    text=puntos['country'],
+                                    hovertemplate='⚠️ %{text}<extra></extra>'
+                                ))
+                        return fig_time
+                    mostrar_figura(
+                        "serie_temporal",
+                        (var_time, tuple(paises_serie), nivel_serie, por_continente, marcar_anomalias),
+                        figura_serie,
+                        use_container_width=True
                     )
-                    st.plotly_chart(fig_time, use_container_width=True)
                 else:
                     st.info("Selecciona al menos un pais para visualizar")
             
+            with st.expander(f"🚨 Alertas de brote ({int(df_anomalias['anomalia'].sum())} semanas anomalas)"):
+                df_alertas = anomalias.alertas(df_anomalias, 20)
+                if df_alertas.empty:
+                    st.caption("Ninguna semana supera los umbrales de deteccion.")
+                else:
+                    mostrar_tabla(
+                        df_alertas.style.format({
+                            'date': lambda f: f"{f:%Y-%m-%d}",
+                            'weekly_count': '{:,.0f}',
+                            'crecimiento': '{:+.0%}',
+                            'puntuacion': '{:.1f}',
+                        }, na_rep='—'),
+                        use_container_width=True
+                    )
+            
             st.markdown("---")
         
         # --- SECCIÓN 2: COMPARACIÓN DE PAÍSES (TOP/BOTTOM) ---
@@ -734,31 +1338,48 @@ if uploaded_file is not None:
             )
         
         # Calcular ranking
-        df_ranking = df_viz.groupby('country')[var_ranking].mean().reset_index()
-        df_ranking = df_ranking.sort_values(var_ranking, ascending=(tipo_ranking == 'Bottom (Menores)'))
-        df_ranking = df_ranking.head(n_paises)
-        
-        fig_rank = px.bar(
-            df_ranking,
-            y='country',
-            x=var_ranking,
-            orientation='h',
-            title=f"{tipo_ranking} {n_paises} paises por {var_ranking}",
-            color=var_ranking,
-            color_continuous_scale=[[0, '#0D3B4F'], [0.5, '#22D3EE'], [1, '#818CF8']],
-            template="plotly_dark"
-        )
-        fig_rank.update_layout(
-            plot_bgcolor='#111827',
-            paper_bgcolor='#0B0F19',
-            font=dict(family="Inter", size=12, color='#94A3B8'),
-            margin=dict(t=40, b=20),
-            xaxis=dict(gridcolor='#1E293B'),
-            yaxis=dict(gridcolor='#1E293B', title=""),
-            height=400,
-            showlegend=False
-        )
-        st.plotly_chart(fig_rank, use_container_width=True)
+        if motor is not None:
+            df_ranking = motor.ranking_paises(
+                indicador, continentes, var_ranking, n_paises, ascendente=(tipo_ranking == 'Bottom (Menores)')
+            )
+        else:
+            df_ranking = analitica.ranking_paises(
+                df_viz, var_ranking, n_paises, ascendente=(tipo_ranking == 'Bottom (Menores)')
+            )
+        
+        def figura_ranking():
+            fig_rank = px.bar(
+                df_ranking,
+                y='country',
+                x=var_ranking,
+                orientation='h',
+                title=f"{tipo_ranking} {n_paises} paises por {var_ranking}",
+                color=var_ranking,
+                color_continuous_scale=[[0, '#0D3B4F'], [0.5, '#22D3EE'], [1, '#818CF8']],
+                template="plotly_dark"
+            )
+            fig_rank.update_layout(
+                plot_bgcolor='#111827',
+                paper_bgcolor='#0B0F19',
+                font=dict(family="Inter", size=12, color='#94A3B8'),
+                margin=dict(t=40, b=20),
+                xaxis=dict(gridcolor='#1E293B'),
+                yaxis=dict(gridcolor='#1E293B', title=""),
+                height=400,
+                showlegend=False
+            )
+            if seleccion:
+                resaltados = df_ranking['country'].isin(paises_sel)
+                fig_rank.update_traces(
+                    marker_line_color='#F472B6',
+                    marker_line_width=[3 if r else 0 for r in resaltados]
+                )
+            return fig_rank
+        mostrar_figura("ranking", (var_ranking, n_paises, tipo_ranking, tuple(paises_sel)), figura_ranking,
+                       use_container_width=True)
+        fuera_ranking = [p for p in paises_sel if p not in set(df_ranking['country'])]
+        if fuera_ranking:
+            st.caption(f"Seleccion fuera de este ranking: {', '.join(fuera_ranking)}")
         
         st.markdown("---")
         
@@ -774,29 +1395,36 @@ if uploaded_file is not None:
             show_trendline = st.checkbox("Mostrar linea de tendencia", value=True, key='scatter_trend')
         
         with col_scatter2:
-            fig_scatter = px.scatter(
-                df_viz,
-                x=var_x,
-                y=var_y,
-                size='size_ref',
-                color=color_by,
-                hover_name='country',
-                hover_data={'size_ref': False, 'camas_por_100k': True, 'continent': True},
-                trendline='ols' if show_trendline else None,
-                title=f"Relacion entre {var_x} y {var_y}",
-                color_discrete_sequence=['#22D3EE', '#818CF8', '#34D399', '#F472B6', '#FBBF24', '#FB923C'],
-                template="plotly_dark"
-            )
-            fig_scatter.update_layout(
-                plot_bgcolor='#111827',
-                paper_bgcolor='#0B0F19',
-                font=dict(family="Inter", size=12, color='#94A3B8'),
-                margin=dict(t=40, b=20),
-                xaxis=dict(gridcolor='#1E293B'),
-                yaxis=dict(gridcolor='#1E293B'),
-                height=450
-            )
-            st.plotly_chart(fig_scatter, use_container_width=True)
+            def figura_scatter():
+                fig_scatter = px.scatter(
+                    df_viz,
+                    x=var_x,
+                    y=var_y,
+                    size='size_ref',
+                    color=color_by,
+                    hover_name='country',
+                    hover_data={'size_ref': False, 'camas_por_100k': True, 'continent': True},
+                    custom_data=['ISO3'],
+                    trendline='ols' if show_trendline else None,
+                    title=f"Relacion entre {var_x} y {var_y}",
+                    color_discrete_sequence=['#22D3EE', '#818CF8', '#34D399', '#F472B6', '#FBBF24', '#FB923C'],
+                    template="plotly_dark"
+                )
+                fig_scatter.update_layout(
+                    plot_bgcolor='#111827',
+                    paper_bgcolor='#0B0F19',
+                    font=dict(family="Inter", size=12, color='#94A3B8'),
+                    margin=dict(t=40, b=20),
+                    xaxis=dict(gridcolor='#1E293B'),
+                    yaxis=dict(gridcolor='#1E293B'),
+                    height=450
+                )
+                return fig_scatter
+            # Lazo/caja sobre el scatter -> seleccion cruzada de paises
+            # customdata[0] = ISO3: lo lee la seleccion aunque el hover no lo muestre
+            mostrar_figura("scatter", (var_x, var_y, color_by, show_trendline), figura_scatter,
+                           customdata=(0,), use_container_width=True, on_select="rerun",
+                           selection_mode=("lasso", "box"), key="scatter_sel")
         
         st.markdown("---")
         
@@ -807,50 +1435,56 @@ if uploaded_file is not None:
             st.markdown("**📊 Distribucion con Histograma**")
             var_hist = st.selectbox("Variable:", ['letalidad_pct', 'casos_100k', 'avg_temp'], key='hist_var')
             
-            fig_hist = px.histogram(
-                df_viz,
-                x=var_hist,
-                marginal='box',
-                nbins=30,
-                color_discrete_sequence=['#22D3EE'],
-                template="plotly_dark"
-            )
-            fig_hist.update_layout(
-                plot_bgcolor='#111827',
-                paper_bgcolor='#0B0F19',
-                font=dict(family="Inter", size=11, color='#94A3B8'),
-                margin=dict(t=10, b=10),
-                xaxis=dict(gridcolor='#1E293B'),
-                yaxis=dict(gridcolor='#1E293B'),
-                height=350,
-                showlegend=False
-            )
-            st.plotly_chart(fig_hist, use_container_width=True)
+            def figura_histograma():
+                fig_hist = px.histogram(
+                    df_viz,
+                    x=var_hist,
+                    marginal='box',
+                    nbins=30,
+                    color_discrete_sequence=['#22D3EE'],
+                    template="plotly_dark"
+                )
+                fig_hist.update_layout(
+                    plot_bgcolor='#111827',
+                    paper_bgcolor='#0B0F19',
+                    font=dict(family="Inter", size=11, color='#94A3B8'),
+                    margin=dict(t=10, b=10),
+                    xaxis=dict(gridcolor='#1E293B'),
+                    yaxis=dict(gridcolor='#1E293B'),
+                    height=350,
+                    showlegend=False
+                )
+                return fig_hist
+            mostrar_figura("histograma", (var_hist,), figura_histograma, use_container_width=True)
         
         with col_dist2:
             st.markdown("**🌡️ Heatmap de Correlaciones por Continente**")
             cont_heatmap = st.selectbox("Continente:", df_viz['continent'].unique(), key='heatmap_cont')
             
-            df_cont = df_viz[df_viz['continent'] == cont_heatmap]
-            corr_cont = df_cont[num_cols].corr()
+            def figura_heatmap():
+                if motor is not None:
+                    corr_cont = motor.matriz_correlacion(indicador, continentes, num_cols, continente=cont_heatmap)
+                else:
+                    corr_cont = analitica.matriz_correlacion(df_viz, num_cols, continente=cont_heatmap)
             
-            fig_heatmap = go.Figure(data=go.Heatmap(
-                z=corr_cont.values,
-                x=corr_cont.columns,
-                y=corr_cont.columns,
-                colorscale=[[0, '#0D3B4F'], [0.5, '#22D3EE'], [1, '#818CF8']],
-                text=corr_cont.values.round(2),
-                texttemplate='%{text}',
-                textfont={"size": 10, "color": "#E2E8F0"}
-            ))
-            fig_heatmap.update_layout(
-                plot_bgcolor='#111827',
-                paper_bgcolor='#0B0F19',
-                font=dict(family="Inter", size=10, color='#94A3B8'),
-                margin=dict(t=10, b=10, l=10, r=10),
-                height=350
-            )
-            st.plotly_chart(fig_heatmap, use_container_width=True)
+                fig_heatmap = go.Figure(data=go.Heatmap(
+                    z=corr_cont.values,
+                    x=corr_cont.columns,
+                    y=corr_cont.columns,
+                    colorscale=[[0, '#0D3B4F'], [0.5, '#22D3EE'], [1, '#818CF8']],
+                    text=corr_cont.values.round(2),
+                    texttemplate='%{text}',
+                    textfont={"size": 10, "color": "#E2E8F0"}
+                ))
+                fig_heatmap.update_layout(
+                    plot_bgcolor='#111827',
+                    paper_bgcolor='#0B0F19',
+                    font=dict(family="Inter", size=10, color='#94A3B8'),
+                    margin=dict(t=10, b=10, l=10, r=10),
+                    height=350
+                )
+                return fig_heatmap
+            mostrar_figura("heatmap", (cont_heatmap,), figura_heatmap, use_container_width=True)
         
         st.markdown("---")
         
@@ -872,36 +1506,42 @@ if uploaded_file is not None:
                 f"**Max:** {df_viz[var_map2].max():.2f}\n"
                 f"**Min:** {df_viz[var_map2].min():.2f}\n"
                 f"**Media:** {df_viz[var_map2].mean():.2f}")
-        with col_map2:
+        with col_map2, perfil.seccion("mapa_folium"):
+            import folium
+            
 
                     # TIME SLIDER
-            fechas = sorted(df_viz["date"].unique())
-            fecha_sel = st.select_slider("Fecha del mapa", options=fechas)
-            
-            # DATA DE LA FECHA
-            df_fecha = df_viz[df_viz["date"] == fecha_sel]
-            
-            # AGRUPACIÓN PARA MAPA
-            df_map = df_fecha.groupby(["ISO3", "country"]).agg({
-                var_map2: "mean",
-                "casos_100k": "sum",
-                "letalidad_pct": "sum"
-            }).reset_index()
+            nivel_mapa = nivel_grafico(MAX_PASOS_MAPA)
+            fechas = piramide.periodos(nivel_mapa)
+            fecha_sel = st.select_slider(
+                f"Periodo del mapa ({ETIQUETAS[nivel_mapa].lower()})",
+                options=fechas,
+                format_func=lambda f: etiqueta_periodo(f, nivel_mapa)
+            )
             
-            pais_click = None  # valor inicial
+            # AGRUPACIÓN PARA MAPA (solo columnas del mapa; ISO3 ya normalizado en la ingesta)
+            if nivel_mapa != "semana":
+                df_map = frame_mapa_periodo(clave_final, nivel_mapa, fecha_sel, var_map2, piramide)
+            elif motor is not None:
+                df_map = motor.agregar_mapa(indicador, continentes, fecha_sel, var_map2)
+            else:
+                # Sin imputacion (que mezcla fechas) un anexo solo invalida las fechas que trajo
+                if modo_bloques:
+                    version_mapa = f"{ruta_almacen}|{metodo_nulos}"
+                elif metodo_nulos == "Ninguno":
+                    version_mapa = registro.version_fecha(clave_dataset, pd.Timestamp(fecha_sel)) + opciones_limpieza
+                else:
+                    version_mapa = f"{clave_limpieza}|{metodo_nulos}"
+                df_map = frame_mapa(
+                    f"{version_mapa}|{indicador}|{sorted(continentes)}", df_viz, fecha_sel, var_map2
+                )
+
             
             try:
                 #world = gpd.read_file("countries.geojson")
                 world = load_world()
             
-                df_fecha["ISO3"] = df_fecha["ISO3"].str.upper().str.strip()
-            
-                gdf = world.merge(
-                    df_map,
-                    left_on="ISO3166-1-Alpha-3",
-                    right_on="ISO3",
-                    how="left"
-                )
+                gdf = analitica.unir_geometrias(world, df_map)
             
                 # ==========================================
                 # ZOOM DINÁMICO INTELIGENTE
@@ -943,7 +1583,7 @@ if uploaded_file is not None:
                     fill_opacity=0.95,
                     line_opacity=borde,
                     nan_fill_color="#3a3a3a",
-                    legend_name=f"{var_map2} - {fecha_sel}",
+                    legend_name=f"{var_map2} - {etiqueta_periodo(fecha_sel, nivel_mapa)}",
                     bins=bins_dynamic
                 ).add_to(m)
                 
@@ -1027,6 +1667,22 @@ if uploaded_file is not None:
                     },
                 ).add_to(m)
 
+                # Paises con semanas anomalas en el periodo: contorno rojo (el click
+                # sigue seleccionando el pais, la capa conserva su ISO3)
+                isos_alerta = anomalias.paises_en_periodo(df_anomalias, fecha_sel, nivel_mapa)
+                if isos_alerta:
+                    folium.GeoJson(
+                        gdf.loc[gdf["ISO3166-1-Alpha-3"].isin(isos_alerta), ["ISO3166-1-Alpha-3", "name", "geometry"]],
+                        name="Anomalias",
+                        style_function=lambda x: {
+                            "fillOpacity": 0,
+                            "color": "#F87171",
+                            "weight": 3,
+                            "dashArray": "4",
+                        },
+                        tooltip=folium.GeoJsonTooltip(fields=["name"], aliases=["⚠️ Semana anomala:"]),
+                    ).add_to(m)
+
                 # CSS para modificar la leyenda
                 legend_css = """
                 <style>
@@ -1049,36 +1705,17 @@ if uploaded_file is not None:
                 # RENDER 
                 # ==========================================
                 
-                map_data = st_folium(m, use_container_width=True, height=520)
+                # el click queda en session_state["mapa_gis"] y lo toma actualizar_seleccion()
+                map_data = mostrar_folium(m, use_container_width=True, height=520, key="mapa_gis")
                 
                 # guardar zoom
                 if map_data and map_data.get("zoom"):
                     st.session_state.map_zoom = map_data["zoom"]
-                
-                # capturar click
-                if map_data and map_data.get("last_active_drawing"):
-                    props = map_data["last_active_drawing"]["properties"]
-                    pais_click = props.get("ISO3166-1-Alpha-3")
-            
-                # 👇 luego vemos si hubo click
-                if map_data and map_data.get("last_active_drawing"):
-                    props = map_data["last_active_drawing"]["properties"]
-                    pais_click = props.get("ISO3166-1-Alpha-3")
             
             except Exception as e:
                 st.error(f"Error en el mapa: {e}")
         
         
-        # =============================
-        # FILTRO POR PAÍS
-        # =============================
-        
-        if pais_click:
-            st.success(f"País seleccionado: {pais_click}")
-            df_filtrado = df_viz[df_viz["ISO3"] == pais_click]
-        else:
-            df_filtrado = df_viz
-            
         st.markdown("---")
 
 
@@ -1090,54 +1727,49 @@ if uploaded_file is not None:
         
         st.subheader("🌍 Distribución por magnitud (Bubble Map)")
         
-        try:
-            world = load_world()  # tu geojson cacheado
-        
-            # normalizar ISO
-            df_map["ISO3"] = df_map["ISO3"].str.upper().str.strip()
+        with perfil.seccion("mapa_burbujas"):
+            import folium
+            
+            try:
+                world = load_world()  # tu geojson cacheado
         
-            gdf_bubble = world.merge(
-                df_map,
-                left_on="ISO3166-1-Alpha-3",
-                right_on="ISO3",
-                how="left"
-            )
+                gdf_bubble = analitica.unir_geometrias(world, df_map)
         
-            m2 = folium.Map(
-                location=[20, 0],
-                zoom_start=2,
-                tiles="cartodb dark_matter"
-            )
+                m2 = folium.Map(
+                    location=[20, 0],
+                    zoom_start=2,
+                    tiles="cartodb dark_matter"
+                )
         
-            # evitar división por cero
-            max_value = gdf_bubble[var_map2].max()
-            if pd.isna(max_value) or max_value == 0:
-                max_value = 1
+                # evitar división por cero
+                max_value = gdf_bubble[var_map2].max()
+                if pd.isna(max_value) or max_value == 0:
+                    max_value = 1
         
-            for _, r in gdf_bubble.iterrows():
-                if pd.notnull(r[var_map2]):
+                for _, r in gdf_bubble.iterrows():
+                    if pd.notnull(r[var_map2]):
         
-                    # 🎯 escala del tamaño
-                    radius = (r[var_map2] / max_value) * 40
+                        # 🎯 escala del tamaño
+                        radius = (r[var_map2] / max_value) * 40
         
-                    folium.CircleMarker(
-                        location=[r.geometry.centroid.y, r.geometry.centroid.x],
-                        radius=radius,
-                        fill=True,
-                        fill_opacity=0.8,
-                        weight=1,
-                        popup=f"""
-                        <b>{r['name']}</b><br>
-                        {var_map2}: {r[var_map2]:.2f}<br>
-                        Casos: {r['casos_100k']:.2f}<br>
-                        Letalidad: {r['letalidad_pct']:.2f}
-                        """,
-                    ).add_to(m2)
+                        folium.CircleMarker(
+                            location=[r.geometry.centroid.y, r.geometry.centroid.x],
+                            radius=radius,
+                            fill=True,
+                            fill_opacity=0.8,
+                            weight=1,
+                            popup=f"""
+                            <b>{r['name']}</b><br>
+                            {var_map2}: {r[var_map2]:.2f}<br>
+                            Casos: {r['casos_100k']:.2f}<br>
+                            Letalidad: {r['letalidad_pct']:.2f}
+                            """,
+                        ).add_to(m2)
         
-            st_folium(m2, use_container_width=True, height=500)
+                mostrar_folium(m2, use_container_width=True, height=500)
         
-        except Exception as e:
-            st.error(f"Error en bubble map: {e}")
+            except Exception as e:
+                st.error(f"Error en bubble map: {e}")
 
         st.markdown("---")
 
@@ -1148,61 +1780,172 @@ if uploaded_file is not None:
         
         paises_comparar = st.multiselect(
             "Selecciona 2-4 paises para comparar:",
-            options=sorted(df_viz['country'].unique()),
-            default=sorted(df_viz['country'].unique())[:3] if len(df_viz['country'].unique()) >= 3 else sorted(df_viz['country'].unique()),
+            options=paises_viz,
+            default=paises_viz[:3],
             max_selections=4,
             key='compare_countries'
         )
         
+        if seleccion:
+            # La seleccion cruzada entra primero (maximo 4 paises en total)
+            paises_comparar = list(dict.fromkeys(paises_sel + paises_comparar))[:4]
+            st.caption("Incluye los paises de la seleccion cruzada")
+        
         if len(paises_comparar) >= 2:
-            df_compare = df_viz[df_viz['country'].isin(paises_comparar)]
-            df_compare_agg = df_compare.groupby('country')[['casos_100k', 'letalidad_pct', 'camas_por_100k', 'avg_temp']].mean().reset_index()
+            if motor is not None:
+                df_compare_agg = motor.comparar_paises(indicador, continentes, paises_comparar)
+            else:
+                isos_comparar = [indice.iso_por_pais[p] for p in paises_comparar if p in indice.iso_por_pais]
+                df_base_comparar = indice.filas(isos_comparar) if len(isos_comparar) == len(paises_comparar) else df_viz
+                df_compare_agg = analitica.comparar_paises(df_base_comparar, paises_comparar)
             
-            # Crear gráfico de barras agrupadas
-            fig_compare = go.Figure()
+            def figura_comparacion():
+                # Crear gráfico de barras agrupadas
+                fig_compare = go.Figure()
             
-            variables = ['casos_100k', 'letalidad_pct', 'camas_por_100k', 'avg_temp']
-            colors = ['#22D3EE', '#818CF8', '#34D399', '#F472B6']
+                variables = analitica.VARIABLES_COMPARACION
+                colors = ['#22D3EE', '#818CF8', '#34D399', '#F472B6']
             
-            for i, var in enumerate(variables):
-                fig_compare.add_trace(go.Bar(
-                    name=var,
-                    x=df_compare_agg['country'],
-                    y=df_compare_agg[var],
-                    marker_color=colors[i]
-                ))
+                for i, var in enumerate(variables):
+                    fig_compare.add_trace(go.Bar(
+                        name=var,
+                        x=df_compare_agg['country'],
+                        y=df_compare_agg[var],
+                        marker_color=colors[i]
+                    ))
             
-            fig_compare.update_layout(
-                barmode='group',
-                title="Comparacion de Metricas entre Paises",
-                plot_bgcolor='#111827',
-                paper_bgcolor='#0B0F19',
-                font=dict(family="Inter", size=12, color='#94A3B8'),
-                margin=dict(t=40, b=20),
-                xaxis=dict(gridcolor='#1E293B', title=""),
-                yaxis=dict(gridcolor='#1E293B', title="Valor"),
-                height=400,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="center",
-                    x=0.5,
-                    font=dict(color='#94A3B8')
+                fig_compare.update_layout(
+                    barmode='group',
+                    title="Comparacion de Metricas entre Paises",
+                    plot_bgcolor='#111827',
+                    paper_bgcolor='#0B0F19',
+                    font=dict(family="Inter", size=12, color='#94A3B8'),
+                    margin=dict(t=40, b=20),
+                    xaxis=dict(gridcolor='#1E293B', title=""),
+                    yaxis=dict(gridcolor='#1E293B', title="Valor"),
+                    height=400,
+                    legend=dict(
+                        orientation="h",
+                        yanchor="bottom",
+                        y=1.02,
+                        xanchor="center",
+                        x=0.5,
+                        font=dict(color='#94A3B8')
+                    )
                 )
-            )
-            st.plotly_chart(fig_compare, use_container_width=True)
+                return fig_compare
+            mostrar_figura("comparacion", (tuple(paises_comparar),), figura_comparacion, use_container_width=True)
             
             # Tabla comparativa
             st.markdown("**📋 Tabla Comparativa**")
             df_compare_display = df_compare_agg.set_index('country')
             df_compare_display.columns = ['Casos/100k', 'Letalidad %', 'Camas/100k', 'Temp °C']
-            st.dataframe(df_compare_display.round(2).style.background_gradient(cmap='viridis'), use_container_width=True)
+            mostrar_tabla(df_compare_display.round(2).style.background_gradient(cmap='viridis'), use_container_width=True)
         else:
             st.info("Selecciona al menos 2 paises para ver la comparacion")
 
-    # --- TAB 4: CHAT INTERACTIVO CON IA ---
-    with tab_ia:
+    # --- TAB 4: PRONÓSTICOS ---
+    with tab_pron, perfil.seccion("tab_pron"):
+        import plotly.graph_objects as go
+        
+        st.markdown("""
+        <div class="section-card">
+            <p class="section-title">Pronosticos por Pais</p>
+            <p class="section-subtitle">Un modelo por pais e indicador, ajustado en paralelo y reutilizado mientras la serie no cambie</p>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col_pron1, col_pron2, col_pron3, col_pron4 = st.columns([2, 2, 2, 1])
+        with col_pron1:
+            var_pron = st.selectbox("Variable:", ['casos_100k', 'weekly_count'], key='pron_var')
+        with col_pron2:
+            modelo_pron = st.selectbox("Modelo:", list(MODELOS), key='pron_modelo')
+        with col_pron3:
+            horizonte = st.slider("Semanas a pronosticar:", 4, 26, 8, key='pron_horizonte')
+        with col_pron4:
+            # Apagado por defecto: el primer ajuste de todos los paises toma unos segundos
+            activar_pron = st.toggle("Calcular", key='pron_activo')
+        
+        if not activar_pron:
+            st.info("Activa **Calcular** para ajustar los modelos de todos los paises de los continentes seleccionados.")
+        else:
+            series_pron = series_por_pais(piramide.paises("semana"), var_pron)
+            with st.spinner(f"Ajustando {len(series_pron)} series..."):
+                pronosticos, stats_pron = obtener_pronosticador().pronosticar(
+                    series_pron, var_pron, MODELOS[modelo_pron], horizonte
+                )
+            st.caption(
+                f"{stats_pron['series']} series · {stats_pron['ajustadas']} ajustadas ahora, "
+                f"{stats_pron['desde_cache']} desde cache · {stats_pron['errores']} sin ajuste · "
+                f"{stats_pron['segundos']:.1f} s"
+            )
+            
+            # Tabla: ultimo valor vs. pronostico al final del horizonte
+            filas_pron = []
+            for (iso, ind), res in pronosticos.items():
+                if res["error"]:
+                    continue
+                ultimo = series_pron[(iso, ind)][1][-1]
+                filas_pron.append({
+                    "ISO3": iso,
+                    "Pais": indice.pais_por_iso.get(iso, iso),
+                    "Ultimo": ultimo,
+                    f"Pronostico +{horizonte} sem": res["media"][-1],
+                    "Cambio %": (res["media"][-1] - ultimo) / ultimo * 100 if ultimo else None,
+                    "AIC": res["aic"],
+                })
+            df_pron = pd.DataFrame(filas_pron)
+            
+            if df_pron.empty:
+                st.warning("Ninguna serie tiene historia suficiente para ajustar el modelo.")
+            else:
+                df_pron = df_pron.sort_values(f"Pronostico +{horizonte} sem", ascending=False)
+                opciones_pron = df_pron["Pais"].tolist()
+                paises_pron = st.multiselect(
+                    "Paises a graficar:",
+                    options=opciones_pron,
+                    default=[p for p in paises_sel if p in opciones_pron] or opciones_pron[:3],
+                    key='pron_paises'
+                )
+                
+                fig_pron = go.Figure()
+                colores_pron = ['#22D3EE', '#818CF8', '#34D399', '#F472B6', '#FBBF24', '#FB923C']
+                for i, pais in enumerate(paises_pron):
+                    iso = indice.iso_por_pais.get(pais, pais)
+                    clave_pron = (iso, indicador)
+                    if clave_pron not in pronosticos or pronosticos[clave_pron]["error"]:
+                        continue
+                    fechas_hist, valores_hist = series_pron[clave_pron]
+                    res = pronosticos[clave_pron]
+                    color = colores_pron[i % len(colores_pron)]
+                    fig_pron.add_trace(go.Scatter(x=fechas_hist, y=valores_hist, name=pais,
+                                                  line=dict(color=color)))
+                    fig_pron.add_trace(go.Scatter(
+                        x=list(res["fechas"]) + list(res["fechas"][::-1]),
+                        y=list(res["superior"]) + list(res["inferior"][::-1]),
+                        fill='toself', fillcolor=color, opacity=0.15, line=dict(width=0),
+                        name=f"{pais} (IC 90%)", hoverinfo='skip', showlegend=False
+                    ))
+                    fig_pron.add_trace(go.Scatter(x=res["fechas"], y=res["media"], name=f"{pais} (pronostico)",
+                                                  line=dict(color=color, dash='dash')))
+                fig_pron.update_layout(
+                    title=f"{var_pron}: historia y pronostico a {horizonte} semanas",
+                    plot_bgcolor='#111827',
+                    paper_bgcolor='#0B0F19',
+                    font=dict(family="Inter", size=12, color='#94A3B8'),
+                    margin=dict(t=40, b=20),
+                    xaxis=dict(gridcolor='#1E293B'),
+                    yaxis=dict(gridcolor='#1E293B'),
+                    hovermode='x unified',
+                    height=450
+                )
+                mostrar_plotly(fig_pron, use_container_width=True)
+                
+                st.markdown("**📋 Pronostico por Pais**")
+                mostrar_tabla(df_pron.set_index("ISO3").round(2), use_container_width=True)
+
+    # --- TAB 5: CHAT INTERACTIVO CON IA ---
+    with tab_ia, perfil.seccion("tab_ia"):
         # Header atractivo
         st.markdown("""
         <div class="chat-header-card">
@@ -1211,13 +1954,59 @@ if uploaded_file is not None:
         </div>
         """, unsafe_allow_html=True)
         
-        # Inicializar el historial de chat en session_state
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
+        # Historial persistente por conversacion; en session_state solo cuantas
+        # paginas se muestran
+        historial_chat = obtener_historial_chat()
+        conversacion = conversacion_chat()
+        if "chat_paginas" not in st.session_state:
+            st.session_state.chat_paginas = 1
         
         if "groq_api_key" not in st.session_state:
             st.session_state.groq_api_key = ""
         
+        # Respuesta en curso (generada en segundo plano por chat_worker)
+        if "chat_trabajo" not in st.session_state:
+            st.session_state.chat_trabajo = None
+        
+        gestor_chat = obtener_gestor_chat()
+        
+        def lanzar_respuesta():
+            # Encola la respuesta al ultimo mensaje del usuario sin bloquear el script
+            with perfil.seccion("contexto_chat"):
+                contexto_sistema = contexto_ia(df_final, indicador)
+                herramientas = cargar_herramientas(df_final)
+                
+                # Paises seleccionados en el mapa/scatter (filas via el indice ISO3)
+                indice_chat = obtener_indice(clave_final, df_final)
+                seleccion_chat = [i for i in st.session_state.get("seleccion_iso", []) if i in indice_chat.pais_por_iso]
+                if seleccion_chat:
+                    contexto_sistema += analitica.contexto_seleccion(
+                        indice_chat.filas(seleccion_chat), indice_chat.paises(seleccion_chat)
+                    )
+            
+            messages_for_api = [
+                {"role": "system", "content": contexto_sistema}
+            ]
+            
+            # Agregar últimos 10 mensajes de contexto
+            for msg in historial_chat.ultimos(conversacion, 10):
+                messages_for_api.append({
+                    "role": msg["role"],
+                    "content": msg["content"]
+                })
+            
+            st.session_state.chat_trabajo = gestor_chat.enviar(
+                st.session_state.groq_api_key,
+                "llama-3.3-70b-versatile",
+                messages_for_api,
+                herramientas,
+                historial_chat,
+                conversacion,
+                temperature=0.7,
+                max_tokens=2048,
+                top_p=0.95
+            )
+        
         # Sección de configuración
         with st.expander("⚙️ Configuracion de API", expanded=not st.session_state.groq_api_key):
             api_key_input = st.text_input(
@@ -1236,7 +2025,11 @@ if uploaded_file is not None:
         col1, col2, col3 = st.columns([2, 1, 2])
         with col2:
             if st.button("🗑️ Limpiar Chat", use_container_width=True, type="secondary"):
-                st.session_state.messages = []
+                if st.session_state.chat_trabajo is not None:
+                    st.session_state.chat_trabajo.cancelar()
+                st.session_state.chat_trabajo = None
+                st.session_state.chat_paginas = 1
+                historial_chat.borrar(conversacion)
                 st.rerun()
         
         st.markdown("---")
@@ -1245,134 +2038,80 @@ if uploaded_file is not None:
         chat_container = st.container()
         
         with chat_container:
-            # Mostrar historial de mensajes
-            for message in st.session_state.messages:
-                with st.chat_message(message["role"], avatar="🧑‍💻" if message["role"] == "user" else "🤖"):
-                    st.markdown(message["content"])
+            # Solo las ultimas paginas; "cargar anteriores" re-ejecuta solo este fragmento
+            @st.fragment
+            def mostrar_historial():
+                ultimo_id, total, _ = historial_chat.resumen(conversacion)
+                limite = st.session_state.chat_paginas * MENSAJES_POR_PAGINA
+                if total > limite:
+                    if st.button(f"⬆️ Cargar mensajes anteriores ({total - limite} mas)", key="chat_anteriores"):
+                        st.session_state.chat_paginas += 1
+                        st.rerun(scope="fragment")
+                for message in pagina_chat(conversacion, ultimo_id, limite):
+                    with st.chat_message(message["role"], avatar=message["avatar"]):
+                        st.markdown(message["content"])
+                        if message["pie"]:
+                            st.caption(message["pie"])
+            
+            mostrar_historial()
+            _, total_mensajes, preguntas_chat = historial_chat.resumen(conversacion)
             
             # Mensaje de bienvenida si no hay historial
-            if len(st.session_state.messages) == 0:
+            if total_mensajes == 0:
                 with st.chat_message("assistant", avatar="🤖"):
                     st.markdown("""
                         Hola! Soy tu asistente de analisis de datos especializado en COVID-19.
                         
                         **Que te gustaria saber sobre tus datos?**
                     """)
+            
+            # Respuesta en curso: solo este fragmento se re-ejecuta mientras
+            # llega el texto, el resto de pestañas sigue respondiendo
+            if st.session_state.chat_trabajo is not None:
+                
+                @st.fragment(run_every=0.5)
+                def mostrar_respuesta_en_curso():
+                    trabajo = st.session_state.chat_trabajo
+                    if trabajo is None:
+                        return
+                    
+                    with st.chat_message("assistant", avatar="🤖"):
+                        texto = trabajo.texto()
+                        if trabajo.estado == chat_worker.EN_COLA:
+                            st.markdown(f"⏳ En cola ({gestor_chat.activos}/{gestor_chat.max_concurrentes} respuestas en curso)...")
+                        elif not texto and not trabajo.terminado:
+                            st.markdown("🔧 Consultando el dataset...")
+                        elif not trabajo.terminado:
+                            st.markdown(texto + "▌")
+                    
+                    if trabajo.terminado:
+                        # la respuesta ya la guardo el worker en el historial
+                        st.session_state.chat_trabajo = None
+                        if trabajo.estado == chat_worker.ERROR:
+                            st.session_state.chat_error = f"**Error al conectar con Groq:**\n\n`{trabajo.error}`\n\nVerifica que tu API Key sea valida y tengas conexion a internet."
+                        st.rerun()
+                
+                mostrar_respuesta_en_curso()
+            
+            if st.session_state.get("chat_error"):
+                st.error(st.session_state.pop("chat_error"))
         
         # Input del usuario
-        if prompt := st.chat_input("Escribe tu pregunta aqui...", key="chat_input"):
+        if prompt := st.chat_input(
+            "Escribe tu pregunta aqui...",
+            key="chat_input",
+            disabled=st.session_state.chat_trabajo is not None
+        ):
             if not st.session_state.groq_api_key:
                 st.error("⚠️ Por favor, configura tu API Key de Groq primero en la seccion de Configuracion.")
             else:
-                # Agregar mensaje del usuario
-                st.session_state.messages.append({"role": "user", "content": prompt})
-                
-                with st.chat_message("user", avatar="🧑‍💻"):
-                    st.markdown(prompt)
-                
-                # Generar respuesta de la IA
-                with st.chat_message("assistant", avatar="🤖"):
-                    message_placeholder = st.empty()
-                    
-                    try:
-                        # Preparar contexto rico del dataset
-                        resumen_estadistico = df_final.describe().to_string()
-                        columnas_disponibles = ", ".join(df_final.columns.tolist())
-                        total_registros = len(df_final)
-                        continentes_unicos = ", ".join(df_final['continent'].unique().tolist())
-                        paises_unicos = df_final['country'].nunique()
-                        
-                        # Calcular algunas métricas clave
-                        letalidad_max = df_final['letalidad_pct'].max()
-                        letalidad_min = df_final['letalidad_pct'].min()
-                        casos_max = df_final['casos_100k'].max()
-                        
-                        # Contexto del sistema para la IA
-                        contexto_sistema = f"""
-Eres un analista de datos senior especializado en epidemiología y salud pública global.
-Tienes acceso a un dataset completo de COVID-19 con las siguientes características:
-
-📋 INFORMACIÓN GENERAL:
-- Total de registros: {total_registros:,}
-- Países únicos: {paises_unicos}
-- Continentes: {continentes_unicos}
-- Indicador actual filtrado: {indicador}
-
-📊 VARIABLES DISPONIBLES:
-{columnas_disponibles}
-
-📈 ESTADÍSTICAS DESCRIPTIVAS COMPLETAS:
-{resumen_estadistico}
-
-🔑 DEFINICIONES DE VARIABLES CLAVE:
-- casos_100k: Tasa de incidencia por cada 100,000 habitantes
-- camas_por_100k: Capacidad hospitalaria instalada por cada 100,000 habitantes
-- letalidad_pct: Porcentaje de fallecimientos respecto a la población
-- avg_temp: Temperatura promedio mensual del país (°C)
-
-📌 DATOS DESTACADOS:
-- Letalidad máxima registrada: {letalidad_max:.4f}%
-- Letalidad mínima registrada: {letalidad_min:.4f}%
-- Tasa de casos más alta: {casos_max:.2f} por 100k habitantes
-
-INSTRUCCIONES DE RESPUESTA:
-1. Sé específico y usa datos reales del dataset cuando sea relevante
-2. Si mencionas números, cítalos correctamente de las estadísticas
-3. Mantén un tono profesional pero accesible
-4. Si detectas patrones interesantes, mencionálos
-5. Ofrece insights accionables cuando sea apropiado
-6. Usa emojis ocasionalmente para hacer las respuestas más amigables
-7. Si no tienes información suficiente, sé honesto al respecto
-"""
-                        
-                        # Crear cliente de Groq
-                        client = Groq(api_key=st.session_state.groq_api_key)
-                        
-                        # Construir historial de mensajes
-                        messages_for_api = [
-                            {"role": "system", "content": contexto_sistema}
-                        ]
-                        
-                        # Agregar últimos 10 mensajes de contexto
-                        for msg in st.session_state.messages[-10:]:
-                            messages_for_api.append({
-                                "role": msg["role"],
-                                "content": msg["content"]
-                            })
-                        
-                        # Llamada streaming a Groq con modelo actualizado
-                        full_response = ""
-                        
-                        stream = client.chat.completions.create(
-                            model="llama-3.3-70b-versatile",
-                            messages=messages_for_api,
-                            temperature=0.7,
-                            max_tokens=2048,
-                            top_p=0.95,
-                            stream=True
-                        )
-                        
-                        # Mostrar respuesta en tiempo real con cursor
-                        for chunk in stream:
-                            if chunk.choices[0].delta.content:
-                                full_response += chunk.choices[0].delta.content
-                                message_placeholder.markdown(full_response + "▌")
-                        
-                        # Respuesta final sin cursor
-                        message_placeholder.markdown(full_response)
-                        
-                        # Guardar en historial
-                        st.session_state.messages.append({
-                            "role": "assistant", 
-                            "content": full_response
-                        })
-                        
-                    except Exception as e:
-                        error_msg = f"**Error al conectar con Groq:**\n\n`{str(e)}`\n\nVerifica que tu API Key sea valida y tengas conexion a internet."
-                        message_placeholder.error(error_msg)
+                # Agregar mensaje del usuario y generar la respuesta en segundo plano
+                historial_chat.agregar(conversacion, "user", prompt)
+                lanzar_respuesta()
+                st.rerun()
         
         # Sección de preguntas sugeridas (minimalista)
-        if len(st.session_state.messages) == 0:
+        if total_mensajes == 0:
             with st.expander("💡 Preguntas sugeridas", expanded=False):
                 suggestions = [
                     ("📊", "Correlacion temperatura vs casos"),
@@ -1395,16 +2134,19 @@ INSTRUCCIONES DE RESPUESTA:
                 for idx, (emoji, question) in enumerate(suggestions):
                     if st.button(f"{emoji} {question}", key=f"sugg_{idx}", use_container_width=True):
                         if st.session_state.groq_api_key:
-                            st.session_state.messages.append({"role": "user", "content": questions_full[idx]})
+                            historial_chat.agregar(conversacion, "user", questions_full[idx])
+                            lanzar_respuesta()
                             st.rerun()
                         else:
                             st.error("⚠️ Configura tu API Key primero")
         else:
             # Estadísticas del chat (minimalista)
-            user_msgs = len([m for m in st.session_state.messages if m["role"] == "user"])
-            st.caption(f"💬 {user_msgs} preguntas realizadas")
+            st.caption(f"💬 {preguntas_chat} preguntas realizadas")
 
 else:
+    # Sin archivo: esta sesion deja de referenciar el dataset compartido
+    registro.liberar(session_id)
+    
     # Pantalla de bienvenida mejorada
     st.markdown("""
     <div class="welcome-container">
@@ -1436,6 +2178,59 @@ else:
     </div>
     """, unsafe_allow_html=True)
 
+# --- PANEL DE INSTRUMENTACIÓN ---
+st.sidebar.markdown("---")
+st.sidebar.toggle("⏱️ Instrumentacion por seccion", key="instrumentacion")
+if perfil.activo and perfil.secciones:
+    # Historial de los ultimos 50 reruns por seccion (detecta regresiones)
+    historial = st.session_state.setdefault("historial_instrumentacion", {})
+    for medicion in perfil.secciones:
+        historial.setdefault(medicion["seccion"], []).append(medicion)
+        del historial[medicion["seccion"]][:-50]
+    
+    with st.sidebar.expander("Desglose del rerun", expanded=True):
+        tabla = pd.DataFrame(perfil.secciones)
+        tabla["seccion"] = ["  " * n + ("└ " if n else "") + nombre for n, nombre in zip(tabla["nivel"], tabla["seccion"])]
+        tabla["pico_proceso_mb_max50"] = [
+            max(m["pico_proceso_mb"] for m in historial[s["seccion"]]) for s in perfil.secciones
+        ]
+        st.dataframe(tabla.drop(columns="nivel").set_index("seccion"), use_container_width=True)
+        st.caption(
+            f"Rerun completo: {perfil.total_ms:,.0f} ms · los picos de memoria son del proceso "
+            "(incluyen otras sesiones y los hilos de fondo), no exclusivos de la seccion"
+        )
+        
+        if perfil.figuras:
+            st.markdown("**Payload de graficos Plotly**")
+            df_figuras = pd.DataFrame(perfil.figuras)
+            st.dataframe(df_figuras.set_index("seccion"), use_container_width=True)
+            original, enviado = df_figuras["original_kb"].sum(), df_figuras["enviado_kb"].sum()
+            st.caption(f"{original:,.0f} KB → {enviado:,.0f} KB enviados ({100 * (1 - enviado / original):.0f}% menos)"
+                       if original else "")
+        
+        if precalentamiento.estado != "pendiente":
+            st.markdown(f"**Precalentamiento del dataset incluido** ({precalentamiento.estado})")
+            st.dataframe(
+                pd.Series(precalentamiento.etapas, name="ms").rename_axis("etapa").to_frame(),
+                use_container_width=True
+            )
+            if precalentamiento.error:
+                st.caption(precalentamiento.error)
+        
+        cache_figuras = obtener_cache_figuras()
+        stats_figuras = cache_figuras.estadisticas()
+        if stats_figuras:
+            st.markdown("**Cache de figuras (proceso)**")
+            st.dataframe(pd.DataFrame.from_dict(stats_figuras, orient="index"), use_container_width=True)
+            st.caption(
+                f"{cache_figuras.bytes / 2**20:.1f} de {cache_figuras.max_bytes / 2**20:.0f} MB · "
+                f"{cache_figuras.desalojos} desalojos"
+            )
+        
+        if st.checkbox("Exportar a JSON lines", key="exportar_instrumentacion"):
+            perfil.exportar(session_id)
+            st.caption(f"Guardando cada rerun en `{RUTA_EXPORTACION}`")
+
 # --- PIE DE PÁGINA ---
 st.markdown("""
 <div class="footer">
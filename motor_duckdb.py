@@ -0,0 +1,130 @@
+"""
+Motor de consultas opcional sobre DuckDB (embebido, sin servidor).
+
+Las mismas agregaciones que `analitica` (filtro, ranking, mapa, comparacion y
+correlaciones), expresadas en SQL sobre el dataset ya cargado: un DataFrame
+registrado (DuckDB lo escanea en su lugar, sin copiarlo) o el almacen Parquet
+del modo por bloques (lectura con pushdown de filtros y columnas). DuckDB
+ejecuta en paralelo y vectorizado y solo se materializan en pandas las filas
+y columnas del resultado. Si `duckdb` no esta instalado el dashboard sigue
+con el camino pandas.
+"""
+import importlib.util
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import analitica
+
+_FUNCIONES = {"mean": "avg", "sum": "sum", "max": "max"}
+
+
+def disponible():
+    # sin importarlo: duckdb solo se carga si el usuario activa el motor
+    return importlib.util.find_spec("duckdb") is not None
+
+
+def _ident(columna):
+    return '"' + columna.replace('"', '""') + '"'
+
+
+class MotorDuckDB:
+    """Consultas del dashboard sobre un DataFrame o un almacen Parquet particionado."""
+
+    def __init__(self, fuente, hilos=None):
+        import duckdb
+
+        self._con = duckdb.connect(database=":memory:")
+        if hilos:
+            self._con.execute(f"SET threads = {int(hilos)}")
+        if isinstance(fuente, pd.DataFrame):
+            self._con.register("datos", fuente)
+        else:
+            patron = os.path.join(fuente, "**", "*.parquet").replace("'", "''")
+            self._con.execute(
+                f"CREATE VIEW datos AS SELECT * FROM read_parquet('{patron}', hive_partitioning = true)"
+            )
+        self.columnas = [fila[0] for fila in self._con.execute("DESCRIBE datos").fetchall()]
+        self._lock = threading.Lock()
+
+    def _consulta(self, sql, parametros=()):
+        # cursor propio por consulta: la conexion se comparte entre sesiones/hilos
+        with self._lock:
+            cursor = self._con.cursor()
+        try:
+            return cursor.execute(sql, list(parametros)).df()
+        finally:
+            cursor.close()
+
+    def _columnas(self, columnas):
+        desconocidas = [c for c in columnas if c not in self.columnas]
+        if desconocidas:
+            raise KeyError(f"Columnas inexistentes: {desconocidas}")
+        return ", ".join(_ident(c) for c in columnas)
+
+    @staticmethod
+    def _filtro(indicador, continentes, **extra):
+        """WHERE de la navegacion (indicador + continentes) y condiciones extra de igualdad/IN."""
+        continentes = list(continentes)
+        condiciones = ["indicator = ?", f"continent IN ({', '.join('?' * len(continentes)) or 'NULL'})"]
+        parametros = [indicador, *continentes]
+        for columna, valor in extra.items():
+            if isinstance(valor, (list, tuple)):
+                condiciones.append(f"{_ident(columna)} IN ({', '.join('?' * len(valor)) or 'NULL'})")
+                parametros.extend(valor)
+            else:
+                condiciones.append(f"{_ident(columna)} = ?")
+                parametros.append(valor)
+        return " AND ".join(condiciones), parametros
+
+    def filtrar(self, indicador, continentes, columnas=None):
+        where, parametros = self._filtro(indicador, continentes)
+        seleccion = self._columnas(columnas) if columnas else "*"
+        return self._consulta(f"SELECT {seleccion} FROM datos WHERE {where}", parametros)
+
+    def ranking_paises(self, indicador, continentes, variable, n=10, ascendente=False):
+        where, parametros = self._filtro(indicador, continentes)
+        var = self._columnas([variable])
+        orden = "ASC" if ascendente else "DESC"
+        return self._consulta(
+            f"SELECT country, avg({var}) AS {var} FROM datos WHERE {where} "
+            f"GROUP BY country ORDER BY {var} {orden} NULLS LAST LIMIT {int(n)}",
+            parametros,
+        )
+
+    def agregar_mapa(self, indicador, continentes, fecha, variable):
+        where, parametros = self._filtro(indicador, continentes, date=pd.Timestamp(fecha).to_pydatetime())
+        agregados = ", ".join(
+            f"{_FUNCIONES[funcion]}({self._columnas([col])}) AS {_ident(col)}"
+            for col, funcion in analitica.agregacion_mapa(variable).items()
+        )
+        df_map = self._consulta(
+            f"SELECT ISO3, country, {agregados} FROM datos WHERE {where} GROUP BY ISO3, country",
+            parametros,
+        )
+        return analitica.tasas_mapa(df_map, variable)
+
+    def comparar_paises(self, indicador, continentes, paises, variables=analitica.VARIABLES_COMPARACION):
+        where, parametros = self._filtro(indicador, continentes, country=list(paises))
+        medias = ", ".join(f"avg({self._columnas([v])}) AS {_ident(v)}" for v in variables)
+        return self._consulta(
+            f"SELECT country, {medias} FROM datos WHERE {where} GROUP BY country ORDER BY country",
+            parametros,
+        )
+
+    def matriz_correlacion(self, indicador, continentes, num_cols, continente=None):
+        """Pearson por pares (filas completas de cada par, como pandas) en una sola pasada."""
+        num_cols = list(num_cols)
+        extra = {} if continente is None else {"continent": continente}
+        where, parametros = self._filtro(indicador, continentes, **extra)
+        pares = [(i, j) for i in range(len(num_cols)) for j in range(i, len(num_cols))]
+        expresiones = ", ".join(
+            f"corr({self._columnas([num_cols[i]])}, {self._columnas([num_cols[j]])})" for i, j in pares
+        )
+        fila = self._consulta(f"SELECT {expresiones} FROM datos WHERE {where}", parametros).iloc[0]
+        matriz = np.full((len(num_cols), len(num_cols)), np.nan)
+        for (i, j), valor in zip(pares, fila.to_numpy(dtype=float)):
+            matriz[i, j] = matriz[j, i] = valor
+        return pd.DataFrame(matriz, index=num_cols, columns=num_cols)
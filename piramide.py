@@ -0,0 +1,155 @@
+"""
+Jerarquia de agregacion del dataset: pais -> continente -> mundo, a cada
+granularidad temporal (semana -> mes -> trimestre -> año).
+
+Cada nivel agrega los conteos semanales por pais y periodo y recalcula las
+tasas desde `weekly_count` y `population` (sumar `casos_100k` de varios
+paises o promediar filas no da una tasa). Continente y mundo suman conteos y
+poblaciones de sus paises, asi que sus tasas quedan ponderadas por
+poblacion. Los niveles se construyen la primera vez que se piden y quedan
+cacheados con el dataset filtrado.
+
+El dataset trae agregados del ECDC como si fueran paises ("Europe (total)",
+"EU/EEA (total)"..., sin ISO3) cuya poblacion y conteos ya son la suma de sus
+miembros: siguen en el nivel pais (se pueden graficar), pero no entran en
+los rollups de continente y mundo, que los contarian dos o tres veces.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Del mas fino al mas grueso; None = filas semanales originales
+NIVELES = {"semana": None, "mes": "M", "trimestre": "Q", "anio": "Y"}
+ETIQUETAS = {"semana": "Semana", "mes": "Mes", "trimestre": "Trimestre", "anio": "Año"}
+FORMATOS = {"semana": "%Y-%m-%d", "mes": "%Y-%m", "anio": "%Y"}
+
+CLAVE_PAIS = ["indicator", "continent", "ISO3", "country"]
+# Variables que se promedian ponderando por poblacion al subir de nivel
+PROMEDIADAS = ["camas_por_100k", "avg_temp"]
+
+
+def etiqueta_periodo(fecha, nivel):
+    fecha = pd.Timestamp(fecha)
+    if nivel == "trimestre":
+        return f"{fecha.year}-T{fecha.quarter}"
+    return fecha.strftime(FORMATOS[nivel])
+
+
+def tasas(df):
+    # casos_100k / letalidad_pct del dataset: conteo del periodo sobre la poblacion
+    return df.assign(
+        casos_100k=df["weekly_count"] / df["population"] * 1e5,
+        letalidad_pct=df["weekly_count"] / df["population"] * 100,
+    )
+
+
+def _ponderada(df, grupos, columna):
+    """Media de `columna` ponderada por `population` (solo filas con dato)."""
+    peso = df["population"].where(df[columna].notna())
+    suma = (df[columna] * peso).groupby(grupos, sort=False).sum(min_count=1)
+    return suma / peso.groupby(grupos, sort=False).sum(min_count=1)
+
+
+def es_total(df):
+    """Filas de los agregados "(total)" del ECDC, reconocidas por el nombre del pais."""
+    return df["country"].str.endswith("(total)", na=False).to_numpy()
+
+
+def es_agregado(df):
+    """Filas de agregados "(total)" (o sin ISO3): ya suman a sus paises miembros."""
+    return es_total(df) | df["ISO3"].isna().to_numpy()
+
+
+def _agregar_paises(paises, columnas):
+    """Suma conteos y poblaciones de los paises de cada grupo (sin agregados); medias ponderadas."""
+    paises = paises[~es_agregado(paises)]
+    claves = [paises[c] for c in columnas]
+    grupos = paises.groupby(claves, sort=True)
+    agregado = pd.DataFrame({
+        "weekly_count": grupos["weekly_count"].sum(),
+        "population": grupos["population"].sum(),
+        "paises": grupos["ISO3"].nunique(),
+    })
+    for col in PROMEDIADAS:
+        if col in paises.columns:
+            agregado[col] = _ponderada(paises, claves, col)
+    return tasas(agregado.reset_index())
+
+
+class Piramide:
+    """Rollups por pais, continente y mundo a cada granularidad, construidos a demanda."""
+
+    def __init__(self, df):
+        self.df = df
+        self._paises = {}
+        self._continentes = {}
+        self._mundo = {}
+        self._periodos = {}
+        # reentrante: el nivel continente se construye desde el nivel pais
+        self._lock = threading.RLock()
+
+    def _construir_paises(self, nivel):
+        # tambien a nivel semana: una fila por pais y fecha (semanas que
+        # comparten fecha, p. ej. 2020-53 y 2021-01, se suman)
+        base = self.df
+        if NIVELES[nivel] is not None:
+            base = base.assign(date=base["date"].dt.to_period(NIVELES[nivel]).dt.start_time)
+        grupos = base.groupby([*CLAVE_PAIS, "date"], sort=True, dropna=False)
+        agregado = grupos.agg(
+            weekly_count=("weekly_count", "sum"),
+            population=("population", "max"),
+            cumulative_count=("cumulative_count", "max"),
+            semanas=("weekly_count", "size"),
+            **{col: (col, "mean") for col in PROMEDIADAS if col in base.columns},
+        )
+        return tasas(agregado.reset_index())
+
+    def paises(self, nivel="semana"):
+        with self._lock:
+            if nivel not in self._paises:
+                self._paises[nivel] = self._construir_paises(nivel)
+            return self._paises[nivel]
+
+    def continentes(self, nivel="semana"):
+        with self._lock:
+            if nivel not in self._continentes:
+                self._continentes[nivel] = _agregar_paises(self.paises(nivel), ["indicator", "continent", "date"])
+            return self._continentes[nivel]
+
+    def mundo(self, nivel="semana"):
+        """Todos los paises del dataset filtrado (desde el nivel pais, no promediando continentes)."""
+        with self._lock:
+            if nivel not in self._mundo:
+                self._mundo[nivel] = _agregar_paises(self.paises(nivel), ["indicator", "date"])
+            return self._mundo[nivel]
+
+    def resumen_continentes(self):
+        """Por continente: tasa semanal ponderada media, conteo total y poblacion."""
+        continentes = self.continentes("semana")
+        grupos = continentes.groupby("continent")
+        return pd.DataFrame({
+            "Paises": grupos["paises"].max(),
+            "Poblacion": grupos["population"].max(),
+            "Conteo total": grupos["weekly_count"].sum(),
+            "Incidencia x 100k (media semanal)": grupos["casos_100k"].mean(),
+            "Letalidad % (media semanal)": grupos["letalidad_pct"].mean(),
+            "Temp. ponderada °C": grupos["avg_temp"].mean() if "avg_temp" in continentes else np.nan,
+        })
+
+    def periodos(self, nivel):
+        """Fechas de inicio de cada periodo del nivel, ordenadas."""
+        with self._lock:
+            if nivel not in self._periodos:
+                fechas = pd.DatetimeIndex(self.df["date"].dropna().unique())
+                if NIVELES[nivel] is not None:
+                    fechas = fechas.to_period(NIVELES[nivel]).unique().start_time
+                self._periodos[nivel] = np.sort(fechas.to_numpy())
+            return self._periodos[nivel]
+
+    def nivel_para(self, max_puntos):
+        """El nivel mas fino cuyo numero de periodos cabe en `max_puntos` del grafico."""
+        for nivel in NIVELES:
+            if len(self.periodos(nivel)) <= max_puntos:
+                return nivel
+        return "anio"
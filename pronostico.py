@@ -0,0 +1,169 @@
+"""
+Pronosticos por pais e indicador (ETS / ARIMA de statsmodels).
+
+Los ajustes corren en un pool de procesos compartido por todo el proceso del
+dashboard, en lotes de series para amortizar el envio entre procesos. Cada
+resultado se guarda con la huella de su serie (valores + fechas): mientras la
+serie no cambie se reutiliza sin reajustar, y cuando llegan semanas nuevas el
+reajuste arranca desde los parametros anteriores (`start_params`), que suele
+converger en menos iteraciones. El cache es LRU: guarda a lo sumo
+`MAX_ENTRADAS` series (cada combinacion de variable, modelo y horizonte es
+una entrada) y desaloja las menos usadas.
+"""
+import hashlib
+import multiprocessing
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from piramide import es_agregado
+
+MODELOS = {"ETS (tendencia amortiguada)": "ets", "ARIMA(1,1,1)": "arima"}
+MIN_SEMANAS = 12
+SERIES_POR_LOTE = 16
+ALFA = 0.1  # intervalo de prediccion del 90 %
+MAX_ENTRADAS = 4096
+
+
+def huella_serie(fechas, valores):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(fechas, dtype="datetime64[ns]").tobytes())
+    h.update(np.ascontiguousarray(valores, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def _ajustar(valores, modelo, horizonte, start_params):
+    if modelo == "ets":
+        from statsmodels.tsa.exponential_smoothing.ets import ETSModel
+
+        ajuste = ETSModel(valores, error="add", trend="add", damped_trend=True).fit(
+            start_params=start_params, disp=False
+        )
+        marco = ajuste.get_prediction(start=len(valores), end=len(valores) + horizonte - 1).summary_frame(alpha=ALFA)
+        return ajuste, marco["mean"], marco["pi_lower"], marco["pi_upper"]
+
+    from statsmodels.tsa.arima.model import ARIMA
+
+    ajuste = ARIMA(valores, order=(1, 1, 1)).fit(start_params=start_params)
+    marco = ajuste.get_forecast(horizonte).summary_frame(alpha=ALFA)
+    return ajuste, marco["mean"], marco["mean_ci_lower"], marco["mean_ci_upper"]
+
+
+def ajustar_lote(tareas):
+    """Worker: ajusta cada (clave, fechas, valores, modelo, horizonte, start_params) del lote."""
+    resultados = []
+    for clave, fechas, valores, modelo, horizonte, start_params in tareas:
+        inicio = time.perf_counter()
+        resultado = {"error": None}
+        try:
+            with warnings.catch_warnings():
+                # avisos de convergencia por serie: el AIC y el intervalo ya lo reflejan
+                warnings.simplefilter("ignore")
+                try:
+                    ajuste, media, inferior, superior = _ajustar(valores, modelo, horizonte, start_params)
+                except Exception:
+                    if start_params is None:
+                        raise
+                    ajuste, media, inferior, superior = _ajustar(valores, modelo, horizonte, None)
+            paso = pd.Timedelta(days=7)
+            resultado.update(
+                fechas=pd.date_range(pd.Timestamp(fechas[-1]) + paso, periods=horizonte, freq=paso).to_numpy(),
+                # conteos y tasas no son negativos
+                media=np.clip(np.asarray(media, dtype=float), 0, None),
+                inferior=np.clip(np.asarray(inferior, dtype=float), 0, None),
+                superior=np.asarray(superior, dtype=float),
+                params=np.asarray(ajuste.params, dtype=float),
+                aic=float(ajuste.aic),
+            )
+        except Exception as e:
+            resultado["error"] = f"{type(e).__name__}: {e}"
+        resultado["segundos"] = time.perf_counter() - inicio
+        resultados.append((clave, resultado))
+    return resultados
+
+
+def series_por_pais(df_paises, variable):
+    """
+    {(ISO3, indicator): (fechas, valores)} desde el nivel pais semanal de la
+    jerarquia. Los agregados "(total)" no son paises: con el ISO3 imputado
+    ("UNK") se mezclarian en una sola serie.
+    """
+    df_paises = df_paises[~es_agregado(df_paises)]
+    datos = df_paises[["ISO3", "indicator", "date", variable]].dropna().sort_values("date", kind="stable")
+    series = {}
+    for clave, grupo in datos.groupby(["ISO3", "indicator"], sort=False):
+        if len(grupo) >= MIN_SEMANAS:
+            series[clave] = (grupo["date"].to_numpy(), grupo[variable].to_numpy(dtype=float))
+    return series
+
+
+class Pronosticador:
+    """Pool de ajuste + cache de pronosticos por huella de serie (uno por proceso)."""
+
+    def __init__(self, max_procesos=None, max_entradas=MAX_ENTRADAS):
+        self.max_procesos = max_procesos
+        self.max_entradas = max_entradas
+        self.desalojos = 0
+        self._pool = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            # spawn: el proceso de Streamlit tiene hilos vivos y fork no es seguro
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_procesos, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def pronosticar(self, series, variable, modelo, horizonte):
+        """
+        Pronosticos de todas las `series`; solo se ajustan las que no estan en
+        cache con la misma huella. Devuelve (resultados, estadisticas).
+        """
+        inicio = time.perf_counter()
+        resultados, tareas, huellas = {}, [], {}
+        with self._lock:
+            for clave, (fechas, valores) in series.items():
+                entrada = (*clave, variable, modelo, horizonte)
+                huella = huella_serie(fechas, valores)
+                previo = self._cache.get(entrada)
+                if previo is not None:
+                    self._cache.move_to_end(entrada)
+                if previo is not None and previo[0] == huella:
+                    resultados[clave] = previo[1]
+                    continue
+                start_params = None
+                if previo is not None and previo[1]["error"] is None:
+                    start_params = previo[1]["params"]
+                huellas[clave] = huella
+                tareas.append((clave, fechas, valores, modelo, horizonte, start_params))
+
+        if tareas:
+            lotes = [tareas[i:i + SERIES_POR_LOTE] for i in range(0, len(tareas), SERIES_POR_LOTE)]
+            with self._lock:
+                pool = self._obtener_pool()
+            for lote in pool.map(ajustar_lote, lotes):
+                with self._lock:
+                    for clave, resultado in lote:
+                        entrada = (*clave, variable, modelo, horizonte)
+                        self._cache[entrada] = (huellas[clave], resultado)
+                        self._cache.move_to_end(entrada)
+                        resultados[clave] = resultado
+                    while len(self._cache) > self.max_entradas:
+                        self._cache.popitem(last=False)
+                        self.desalojos += 1
+
+        estadisticas = {
+            "series": len(series),
+            "ajustadas": len(tareas),
+            "desde_cache": len(series) - len(tareas),
+            "errores": sum(1 for r in resultados.values() if r["error"]),
+            "segundos": time.perf_counter() - inicio,
+        }
+        return resultados, estadisticas
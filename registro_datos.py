@@ -0,0 +1,269 @@
+"""
+Registro de datasets compartido entre sesiones.
+
+Cada sesion de Streamlit que sube el mismo CSV recibe el mismo DataFrame
+parseado, indexado por el hash del contenido. El registro lleva la cuenta de
+que sesiones lo usan (conteo de referencias) y lo libera cuando la ultima se
+cierra o cambia de archivo.
+
+La inmutabilidad la garantiza el copy-on-write de pandas (siempre activo
+desde pandas 3; en pandas 2 lo activa `main.py`): las sesiones reciben vistas
+`copy(deep=False)` y cualquier limpieza o columna nueva solo copia las
+columnas que toca.
+
+El parseo, los hashes de fila y las anomalias se calculan fuera del lock del
+registro: una sola sesion construye cada clave (las demas esperan su
+`Future`) y el lock solo cubre la consulta y la insercion de la entrada.
+
+Los anexos de semanas nuevas (`anexar`) crean una entrada derivada de la
+base sin volver a parsearla ni a hashear sus filas.
+
+Las semanas anomalas (`anomalias`) se detectan al registrar el dataset y un
+anexo solo recalcula las series que trajo.
+
+`precargar` registra un dataset sin sesion y lo fija (no se libera aunque
+no lo use nadie): lo usa el precalentamiento del CSV incluido en el repo.
+"""
+import hashlib
+import io
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import anomalias
+from incremental import anexar_semanas, estado_cola
+from ingesta import CLAVE_NATURAL, detectar_duplicados, hash_filas, leer_csv
+
+
+def hash_contenido(contenido):
+    """Huella del archivo subido (blake2b, mas rapido que sha256 en CPython)."""
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+def _buffers_arrow(arreglo):
+    return {b.address for chunk in arreglo.__arrow_array__().chunks for b in chunk.buffers() if b is not None}
+
+
+def _comparte_buffer(serie, base):
+    """True si la columna `serie` apunta a los mismos datos que `base`."""
+    a, b = serie.array, base.array
+    if getattr(a.dtype, "storage", None) == "pyarrow" and getattr(b.dtype, "storage", None) == "pyarrow":
+        # `to_numpy()` de una columna Arrow (los `str` de pandas 3) copia:
+        # se comparan los buffers de sus chunks
+        return not _buffers_arrow(a).isdisjoint(_buffers_arrow(b))
+    return np.may_share_memory(np.asarray(a), np.asarray(b))
+
+
+def bytes_propios(df, base):
+    """
+    Bytes de `df` que NO comparten buffer con `base`.
+
+    Es lo que realmente cuesta en memoria una sesion adicional: las columnas
+    que siguen apuntando al dataset del registro no cuentan.
+    """
+    # deep=False: los strings de las columnas object son los mismos objetos
+    # Python del dataset base, solo se duplican los arreglos de punteros
+    propios = int(df.index.nbytes)
+    for col in df.columns:
+        if col in base.columns and len(df) == len(base) and _comparte_buffer(df[col], base[col]):
+            continue
+        propios += int(df[col].memory_usage(deep=False, index=False))
+    return propios
+
+
+def clave_anexo(clave_base, hash_archivo):
+    """Clave del dataset que resulta de anexar el archivo `hash_archivo` a `clave_base`."""
+    return hash_contenido(f"{clave_base}|{hash_archivo}".encode())
+
+
+def _hashes(df):
+    hashes = {"exactas": hash_filas(df)}
+    if all(c in df.columns for c in CLAVE_NATURAL):
+        hashes["clave"] = hash_filas(df, CLAVE_NATURAL)
+    return hashes
+
+
+class _Entrada:
+    def __init__(self, df, raiz, hashes=None, cola=None, versiones=None, marcas=None):
+        self.df = df
+        self.sesiones = set()
+        self.bytes = int(df.memory_usage(deep=True).sum())
+        self.creado = time.time()
+        # Hashes de fila calculados una vez al ingerir (deteccion de duplicados)
+        self.hashes = hashes if hashes is not None else _hashes(df)
+        self.duplicados = {}
+        # Semanas anomalas por serie, calculadas al ingerir
+        self.anomalias = marcas if marcas is not None else anomalias.detectar(df)
+        # Ultima semana por serie (se calcula al primer anexo y luego se arrastra)
+        self.cola = cola
+        # Fechas tocadas por anexos -> clave del anexo; el resto sigue en `raiz`
+        self.raiz = raiz
+        self.versiones = versiones or {}
+        self.anexo = None
+        self.fijada = False
+
+
+class RegistroDatasets:
+    """Datasets parseados una sola vez por proceso, con conteo de referencias."""
+
+    def __init__(self):
+        self._entradas = {}
+        # clave -> Future de la entrada que se esta construyendo fuera del lock
+        self._en_curso = {}
+        self._lock = threading.Lock()
+
+    def _referenciar(self, clave, entrada, session_id, fijar):
+        # con el lock tomado; una sesion referencia un solo dataset a la vez
+        if session_id is not None:
+            entrada.sesiones.add(session_id)
+            self._soltar(session_id, excepto=clave)
+        if fijar:
+            entrada.fijada = True
+        return entrada
+
+    def _obtener(self, clave, construir, session_id=None, fijar=False):
+        """
+        Entrada `clave` referenciada por la sesion; si falta la arma
+        `construir()` sin el lock, una sola vez aunque la pidan varias sesiones.
+        """
+        while True:
+            with self._lock:
+                entrada = self._entradas.get(clave)
+                if entrada is not None:
+                    return self._referenciar(clave, entrada, session_id, fijar)
+                futuro = self._en_curso.get(clave)
+                if futuro is None:
+                    futuro = self._en_curso[clave] = Future()
+                    break
+            # otra sesion lo esta construyendo: se espera y se vuelve a consultar
+            futuro.result()
+
+        try:
+            entrada = construir()
+        except BaseException as error:
+            with self._lock:
+                del self._en_curso[clave]
+            futuro.set_exception(error)
+            raise
+        with self._lock:
+            del self._en_curso[clave]
+            self._entradas[clave] = entrada
+            self._referenciar(clave, entrada, session_id, fijar)
+        futuro.set_result(None)
+        return entrada
+
+    def adquirir_si_existe(self, clave, session_id):
+        """
+        Vista del dataset `clave` si ya esta registrado (y la referencia de la
+        sesion), o None: el llamador solo lee el archivo en ese caso.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            return self._referenciar(clave, entrada, session_id, False).df.copy(deep=False)
+
+    def adquirir(self, clave, contenido, session_id, lector=leer_csv):
+        """Devuelve una vista del dataset `clave`, parseandolo si es la primera vez."""
+        entrada = self._obtener(clave, lambda: _Entrada(lector(io.BytesIO(contenido)), raiz=clave), session_id)
+        return entrada.df.copy(deep=False)
+
+    def precargar(self, clave, contenido, lector=leer_csv):
+        """Registra y fija el dataset `clave` sin asociarlo a una sesion."""
+        return self._obtener(clave, lambda: _Entrada(lector(io.BytesIO(contenido)), raiz=clave), fijar=True).df
+
+    def anexar(self, clave_base, clave, contenido, session_id, lector=leer_csv):
+        """
+        Vista del dataset `clave` = `clave_base` + semanas nuevas de `contenido`.
+
+        Solo se parsea el archivo nuevo: las columnas derivadas salen de la cola
+        de cada serie y los hashes de fila del historico se reutilizan.
+        """
+        def construir():
+            with self._lock:
+                base = self._entradas[clave_base]
+            if base.cola is None:
+                base.cola = estado_cola(base.df)
+            df, cola, reporte = anexar_semanas(base.df, lector(io.BytesIO(contenido)), base.cola)
+            nuevas = _hashes(df.iloc[len(base.df):])
+            hashes = {modo: np.concatenate([h, nuevas[modo]]) for modo, h in base.hashes.items()}
+            versiones = {**base.versiones, **{fecha: clave for fecha in reporte["fechas"]}}
+            marcas = anomalias.actualizar(base.anomalias, df, reporte["series"])
+            entrada = _Entrada(df, base.raiz, hashes=hashes, cola=cola, versiones=versiones, marcas=marcas)
+            entrada.anexo = reporte
+            return entrada
+
+        return self._obtener(clave, construir, session_id).df.copy(deep=False)
+
+    def anexo(self, clave):
+        """Reporte del ultimo anexo que produjo `clave` (None si es un CSV base)."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            return None if entrada is None else entrada.anexo
+
+    def version_fecha(self, clave, fecha):
+        """
+        Clave de la ultima version del dataset que modifico `fecha`: lo que se
+        cachea por fecha (frames del mapa) sobrevive a anexos de otras semanas.
+        """
+        with self._lock:
+            entrada = self._entradas[clave]
+            return entrada.versiones.get(fecha, entrada.raiz)
+
+    def base(self, clave):
+        """DataFrame compartido (solo lectura) asociado a `clave`."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            return None if entrada is None else entrada.df
+
+    def duplicados(self, clave, modo="clave"):
+        """
+        (mascara, grupos) de duplicados del dataset `clave` segun `modo`
+        ("clave" natural o filas "exactas"); se calcula una vez por dataset.
+        """
+        with self._lock:
+            entrada = self._entradas[clave]
+            if modo in entrada.duplicados:
+                return entrada.duplicados[modo]
+        # sin las columnas de la clave natural no hay hash "clave": ValueError explicito
+        resultado = detectar_duplicados(
+            entrada.df, entrada.hashes.get(modo), CLAVE_NATURAL if modo == "clave" else None
+        )
+        with self._lock:
+            return entrada.duplicados.setdefault(modo, resultado)
+
+    def anomalias(self, clave):
+        """Semanas anomalas del dataset `clave` (ver `anomalias.detectar`)."""
+        with self._lock:
+            return self._entradas[clave].anomalias
+
+    def liberar(self, session_id):
+        with self._lock:
+            self._soltar(session_id)
+
+    def purgar(self, sesion_activa):
+        """Quita las referencias de sesiones cerradas (`sesion_activa(id) -> bool`)."""
+        with self._lock:
+            for clave in list(self._entradas):
+                entrada = self._entradas[clave]
+                entrada.sesiones = {s for s in entrada.sesiones if sesion_activa(s)}
+                if not entrada.sesiones and not entrada.fijada:
+                    del self._entradas[clave]
+
+    def estadisticas(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return {"sesiones": 0, "bytes_compartidos": 0}
+            return {"sesiones": len(entrada.sesiones), "bytes_compartidos": entrada.bytes}
+
+    def _soltar(self, session_id, excepto=None):
+        for clave in list(self._entradas):
+            if clave == excepto:
+                continue
+            entrada = self._entradas[clave]
+            entrada.sesiones.discard(session_id)
+            if not entrada.sesiones and not entrada.fijada:
+                del self._entradas[clave]
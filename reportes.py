@@ -0,0 +1,325 @@
+"""
+Reportes batch: los graficos del dashboard para cada indicador × continente.
+
+Uso (desde la raiz del repo):
+
+    python reportes.py                                  # bd_final_eafit.csv -> reportes/
+    python reportes.py datos.csv -o salida/ -p 8 --imputacion "Media por Pais"
+
+El CSV se lee y limpia una sola vez con `analitica` y se escribe como Arrow
+IPC sin comprimir; cada proceso del pool lo abre con memory-map, de modo que
+los workers comparten las paginas del dataset en vez de recibir una copia
+serializada. Por combinacion se escriben ranking, box plot, histograma,
+matriz de correlacion (HTML + PNG) y el coropletico animado por fecha, mas un
+`resumen.json`; al final, `index.html` y `reporte.json` con el throughput.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import analitica
+from figuras import compactar
+from imputacion import METODOS
+from ingesta import leer_csv
+
+RUTA_CSV = "bd_final_eafit.csv"
+DIR_REPORTES = "reportes"
+
+# Valores por defecto de los selectores de cada grafico en main.py
+VARIABLES = {
+    "ranking": "letalidad_pct",
+    "box": "letalidad_pct",
+    "histograma": "letalidad_pct",
+    "mapa": "casos_100k",
+}
+N_RANKING = 10
+
+COLORES = ['#22D3EE', '#818CF8', '#34D399', '#F472B6', '#FBBF24', '#FB923C']
+ESCALA = [[0, '#0D3B4F'], [0.5, '#22D3EE'], [1, '#818CF8']]
+LAYOUT = dict(
+    plot_bgcolor='#111827',
+    paper_bgcolor='#0B0F19',
+    font=dict(family="Inter", size=12, color='#94A3B8'),
+)
+
+# Tabla Arrow del proceso worker (abierta con memory-map en el initializer)
+_TABLA = None
+
+
+def _slug(texto):
+    return re.sub(r"[^0-9A-Za-z]+", "_", str(texto)).strip("_").lower() or "na"
+
+
+# --- Dataset compartido ---
+def preparar_dataset(ruta_csv, destino, duplicados="clave", metodo_nulos="Ninguno"):
+    """Lee y limpia el CSV una vez y lo deja en `destino` como Arrow IPC mapeable."""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    resultado = analitica.limpiar(leer_csv(ruta_csv), duplicados=duplicados,
+                                  iso=True, metodo_nulos=metodo_nulos)
+    df = resultado.df
+    # sin compresion: los buffers del archivo se usan tal cual desde el mmap
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), destino,
+                          compression="uncompressed")
+    combinaciones = (
+        df[["indicator", "continent"]].drop_duplicates()
+        .sort_values(["indicator", "continent"]).itertuples(index=False, name=None)
+    )
+    return len(df), list(combinaciones)
+
+
+def _iniciar_worker(ruta_arrow):
+    global _TABLA
+    import matplotlib
+    import pyarrow as pa
+
+    matplotlib.use("Agg")
+    _TABLA = pa.ipc.open_file(pa.memory_map(ruta_arrow, "r")).read_all()
+
+
+def _subconjunto(indicador, continente):
+    """Filtra en Arrow (sobre el mmap) y solo materializa en pandas la combinacion."""
+    import pyarrow.compute as pc
+
+    mascara = pc.and_(pc.equal(_TABLA["indicator"], indicador),
+                      pc.equal(_TABLA["continent"], continente))
+    return _TABLA.filter(mascara).to_pandas()
+
+
+# --- Graficos (mismos que main.py) ---
+def _fig_ranking(df, variable):
+    import plotly.express as px
+
+    df_ranking = analitica.ranking_paises(df, variable, N_RANKING)
+    fig = px.bar(
+        df_ranking, y='country', x=variable, orientation='h',
+        title=f"Top {N_RANKING} paises por {variable}",
+        color=variable, color_continuous_scale=ESCALA, template="plotly_dark",
+    )
+    fig.update_layout(**LAYOUT, margin=dict(t=40, b=20), height=400, showlegend=False,
+                      xaxis=dict(gridcolor='#1E293B'), yaxis=dict(gridcolor='#1E293B', title=""))
+    return fig, df_ranking
+
+
+def _fig_box(df, variable):
+    import plotly.express as px
+
+    fig = px.box(df, x="country", y=variable, color_discrete_sequence=COLORES,
+                 template="plotly_dark")
+    fig.update_layout(**LAYOUT, margin=dict(t=10, b=10, l=10, r=10), height=400, showlegend=False,
+                      xaxis=dict(gridcolor='#1E293B', title=""), yaxis=dict(gridcolor='#1E293B'))
+    return fig
+
+
+def _fig_histograma(df, variable):
+    import plotly.express as px
+
+    fig = px.histogram(df, x=variable, marginal='box', nbins=30,
+                       color_discrete_sequence=['#22D3EE'], template="plotly_dark")
+    fig.update_layout(**LAYOUT, margin=dict(t=10, b=10), height=350, showlegend=False,
+                      xaxis=dict(gridcolor='#1E293B'), yaxis=dict(gridcolor='#1E293B'))
+    return fig
+
+
+def _fig_correlacion(corr):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=go.Heatmap(
+        z=corr.values, x=corr.columns, y=corr.columns, colorscale=ESCALA,
+        text=corr.values.round(2), texttemplate='%{text}',
+        textfont={"size": 10, "color": "#E2E8F0"},
+    ))
+    fig.update_layout(**LAYOUT, margin=dict(t=10, b=10, l=10, r=10), height=450)
+    return fig
+
+
+def _png_correlacion(corr, ruta):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.heatmap(corr, annot=True, cmap="coolwarm", center=0, fmt=".2f", ax=ax,
+                linewidths=0.5, linecolor='#1E293B', cbar_kws={"shrink": 0.8})
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=110)
+    plt.close(fig)
+
+
+def _fig_mapa(df, variable):
+    import plotly.express as px
+
+    df_map = analitica.agregar_mapa_por_fecha(df, variable)
+    df_map["fecha"] = df_map["date"].dt.strftime("%Y-%m-%d")
+    fig = px.choropleth(
+        df_map, locations="ISO3", color=variable, hover_name="country",
+        animation_frame="fecha", color_continuous_scale=ESCALA,
+        range_color=(df_map[variable].min(), df_map[variable].max()),
+        template="plotly_dark",
+    )
+    fig.update_layout(**LAYOUT, margin=dict(t=10, b=10, l=10, r=10), height=500,
+                      geo=dict(bgcolor='#0B0F19', showframe=False))
+    return fig
+
+
+# --- Worker ---
+def renderizar(indicador, continente, directorio, variables=VARIABLES):
+    """Escribe todos los artefactos de una combinacion; devuelve sus metricas."""
+    inicio = time.perf_counter()
+    df = _subconjunto(indicador, continente)
+    salida = os.path.join(directorio, _slug(indicador), _slug(continente))
+    os.makedirs(salida, exist_ok=True)
+    if df.empty:
+        return {"indicator": indicador, "continent": continente, "filas": 0, "archivos": []}
+
+    num_cols = analitica.columnas_numericas(df)
+    corr = analitica.matriz_correlacion(df, num_cols)
+    fig_ranking, df_ranking = _fig_ranking(df, variables["ranking"])
+    figuras = {
+        "ranking": fig_ranking,
+        "box": _fig_box(df, variables["box"]),
+        "histograma": _fig_histograma(df, variables["histograma"]),
+        "correlacion": _fig_correlacion(corr),
+        "mapa": _fig_mapa(df, variables["mapa"]),
+    }
+
+    archivos = []
+    for nombre, fig in figuras.items():
+        ruta = os.path.join(salida, f"{nombre}.html")
+        compactar(fig).write_html(ruta, include_plotlyjs="cdn", full_html=True)
+        archivos.append(ruta)
+    ruta_png = os.path.join(salida, "correlacion.png")
+    _png_correlacion(corr, ruta_png)
+    archivos.append(ruta_png)
+
+    resumen = {
+        "indicator": indicador,
+        "continent": continente,
+        "filas": int(len(df)),
+        "metricas": vars(analitica.metricas_resumen(df)),
+        "estadisticas": analitica.estadisticas_descriptivas(df, num_cols).round(4).to_dict(orient="index"),
+        "ranking": df_ranking.to_dict(orient="records"),
+        "correlacion": corr.round(4).to_dict(),
+        "variables": variables,
+    }
+    ruta_json = os.path.join(salida, "resumen.json")
+    with open(ruta_json, "w", encoding="utf-8") as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=2, default=str)
+    archivos.append(ruta_json)
+
+    return {
+        "indicator": indicador,
+        "continent": continente,
+        "filas": int(len(df)),
+        "figuras": len(figuras) + 1,
+        "archivos": archivos,
+        "bytes": sum(os.path.getsize(a) for a in archivos),
+        "segundos": round(time.perf_counter() - inicio, 4),
+        "pid": os.getpid(),
+    }
+
+
+def escribir_indice(directorio, resultados):
+    filas = []
+    for r in resultados:
+        if not r["archivos"]:
+            continue
+        enlaces = " · ".join(
+            f'<a href="{os.path.relpath(a, directorio)}">{os.path.basename(a)}</a>' for a in r["archivos"]
+        )
+        filas.append(f"<tr><td>{r['indicator']}</td><td>{r['continent']}</td>"
+                     f"<td>{r['filas']:,}</td><td>{enlaces}</td></tr>")
+    html = (
+        "<!doctype html><html><head><meta charset='utf-8'><title>Reportes COVID-19</title></head>"
+        "<body style='background:#0B0F19;color:#E2E8F0;font-family:Inter,sans-serif'>"
+        "<h1>Reportes COVID-19</h1><table cellpadding='6'>"
+        "<tr><th>Indicador</th><th>Continente</th><th>Filas</th><th>Archivos</th></tr>"
+        + "".join(filas) + "</table></body></html>"
+    )
+    ruta = os.path.join(directorio, "index.html")
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(html)
+    return ruta
+
+
+def generar(ruta_csv, directorio, procesos=None, duplicados="clave", metodo_nulos="Ninguno",
+            variables=VARIABLES, progreso=None):
+    """Pipeline completo; devuelve el reporte de throughput."""
+    inicio = time.perf_counter()
+    os.makedirs(directorio, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="reportes-") as tmp:
+        ruta_arrow = os.path.join(tmp, "dataset.arrow")
+        filas, combinaciones = preparar_dataset(ruta_csv, ruta_arrow, duplicados, metodo_nulos)
+        preparacion = time.perf_counter() - inicio
+
+        resultados = []
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_worker,
+                                 initargs=(ruta_arrow,)) as pool:
+            futuros = [pool.submit(renderizar, ind, cont, directorio, variables)
+                       for ind, cont in combinaciones]
+            for hecho, futuro in enumerate(as_completed(futuros), 1):
+                resultados.append(futuro.result())
+                if progreso:
+                    progreso(hecho, len(futuros))
+
+    resultados.sort(key=lambda r: (r["indicator"], r["continent"]))
+    indice = escribir_indice(directorio, resultados)
+    total = time.perf_counter() - inicio
+    figuras = sum(r.get("figuras", 0) for r in resultados)
+    reporte = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "csv": ruta_csv,
+        "filas": filas,
+        "procesos": procesos or os.cpu_count(),
+        "combinaciones": len(resultados),
+        "figuras": figuras,
+        "archivos": sum(len(r["archivos"]) for r in resultados),
+        "bytes": sum(r.get("bytes", 0) for r in resultados),
+        "preparacion_s": round(preparacion, 3),
+        "total_s": round(total, 3),
+        "combinaciones_por_s": round(len(resultados) / total, 3),
+        "figuras_por_s": round(figuras / total, 3),
+        # suma del tiempo de los workers / tiempo de pared del render
+        "paralelismo": round(sum(r.get("segundos", 0) for r in resultados) / max(total - preparacion, 1e-9), 2),
+        "indice": indice,
+        "detalle": [{k: v for k, v in r.items() if k != "archivos"} for r in resultados],
+    }
+    with open(os.path.join(directorio, "reporte.json"), "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    return reporte
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python reportes.py", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", nargs="?", default=RUTA_CSV)
+    parser.add_argument("-o", "--salida", default=DIR_REPORTES)
+    parser.add_argument("-p", "--procesos", type=int, help="workers del pool (por defecto, CPUs)")
+    parser.add_argument("--duplicados", choices=["clave", "exactas", "ninguno"], default="clave")
+    parser.add_argument("--imputacion", choices=list(METODOS), default="Ninguno")
+    for grafico, variable in VARIABLES.items():
+        parser.add_argument(f"--var-{grafico}", default=variable)
+    args = parser.parse_args(argv)
+
+    variables = {g: getattr(args, f"var_{g}") for g in VARIABLES}
+    reporte = generar(
+        args.csv, args.salida, procesos=args.procesos,
+        duplicados=None if args.duplicados == "ninguno" else args.duplicados,
+        metodo_nulos=args.imputacion, variables=variables,
+        progreso=lambda i, n: print(f"\r{i}/{n} combinaciones", end="", file=sys.stderr),
+    )
+    print(file=sys.stderr)
+    print(f"{reporte['combinaciones']} combinaciones, {reporte['figuras']} figuras, "
+          f"{reporte['bytes'] / 1e6:.1f} MB en {reporte['total_s']:.1f} s "
+          f"({reporte['figuras_por_s']:.1f} figuras/s, {reporte['procesos']} procesos, "
+          f"paralelismo {reporte['paralelismo']}x)")
+    print(f"Indice: {reporte['indice']}")
+
+
+if __name__ == "__main__":
+    main()
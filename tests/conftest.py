@@ -0,0 +1,66 @@
+"""
+Datos de prueba con la forma de `bd_final_eafit.csv`: dos paises europeos y
+dos agregados del ECDC ("(total)", sin ISO3) que ya suman a sus miembros,
+con una fila de casos y otra de muertes por semana.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAISES = [
+    # country, ISO3, continent, population
+    ("Alfa", "AAA", "Europe", 100_000),
+    ("Beta", "BBB", "Europe", 300_000),
+    ("Europe (total)", np.nan, "Europe", 400_000),
+    ("EU/EEA (total)", np.nan, "Europe", 100_000),
+]
+SEMANAS = 10
+
+
+def construir_dataset(semanas=SEMANAS):
+    filas = []
+    fechas = pd.date_range("2020-01-06", periods=semanas, freq="7D")
+    conteos = {"Alfa": 10, "Beta": 30}
+    for country, iso, continent, population in PAISES:
+        for indicator, factor in (("cases", 1), ("deaths", 0.1)):
+            acumulado = 0
+            previo = np.nan
+            for semana, fecha in enumerate(fechas):
+                if country == "Europe (total)":
+                    base = conteos["Alfa"] + conteos["Beta"]
+                elif country == "EU/EEA (total)":
+                    base = conteos["Alfa"]
+                else:
+                    base = conteos[country]
+                semanal = float(base * (semana + 1) * factor)
+                acumulado += semanal
+                filas.append({
+                    "country": country,
+                    "ISO3": iso,
+                    "continent": continent,
+                    "population": population,
+                    "indicator": indicator,
+                    "weekly_count": semanal,
+                    "year_week": f"2020-{semana + 1:02d}",
+                    "rate_14_day": (semanal + previo) / population * (1e5 if indicator == "cases" else 1e6),
+                    "cumulative_count": acumulado,
+                    "date": fecha,
+                    "month_name": fecha.strftime("%b"),
+                    "avg_temp": 10.0,
+                    "hospital_beds": np.nan,
+                    "letalidad_pct": semanal / population * 100,
+                    "camas_por_100k": np.nan,
+                    "casos_100k": semanal / population * 1e5,
+                })
+                previo = semanal
+    return pd.DataFrame(filas)
+
+
+@pytest.fixture
+def dataset():
+    return construir_dataset()
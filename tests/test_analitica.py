@@ -0,0 +1,68 @@
+import pytest
+
+import analitica
+
+
+@pytest.fixture
+def paises(dataset):
+    return dataset[dataset["ISO3"].notna()].reset_index(drop=True)
+
+
+def test_limpiar(paises):
+    resultado = analitica.limpiar(paises.iloc[list(range(len(paises))) + [0]], duplicados="clave", iso=True)
+    assert resultado.filas_duplicadas == 1
+    assert len(resultado.df) == len(paises)
+    assert resultado.iso_imputados == 0
+
+
+def test_limpiar_conserva_los_totales(dataset):
+    resultado = analitica.limpiar(dataset, duplicados="clave", iso=True)
+    assert resultado.filas_duplicadas == 0
+    assert len(resultado.df) == len(dataset)
+    # los "(total)" no reciben el ISO3 "UNK"
+    assert resultado.iso_imputados == 0
+    assert resultado.df["ISO3"].isna().sum() == dataset["ISO3"].isna().sum()
+
+
+def test_filtrar(dataset):
+    casos = analitica.filtrar(dataset, "cases", ["Europe"])
+    assert (casos["indicator"] == "cases").all()
+    assert analitica.filtrar(dataset, "cases", []).empty
+
+
+def test_agregar_mapa(paises):
+    casos = analitica.filtrar(paises, "cases", ["Europe"])
+    fecha = casos["date"].iloc[0]
+    mapa = analitica.agregar_mapa(casos, fecha, "casos_100k").set_index("ISO3")
+    assert set(mapa.index) == {"AAA", "BBB"}
+    assert mapa.loc["BBB", "casos_100k"] == pytest.approx(30 / 300_000 * 1e5)
+
+
+def test_agregar_mapa_ignora_los_totales(dataset):
+    casos = analitica.filtrar(dataset, "cases", ["Europe"])
+    mapa = analitica.agregar_mapa(casos, casos["date"].iloc[0], "casos_100k").set_index("ISO3")
+    assert set(mapa.index) == {"AAA", "BBB"}
+    assert mapa.loc["BBB", "casos_100k"] == pytest.approx(30 / 300_000 * 1e5)
+
+
+def test_ranking_y_comparacion(paises):
+    casos = analitica.filtrar(paises, "cases", ["Europe"])
+    ranking = analitica.ranking_paises(casos, "weekly_count", n=1)
+    assert ranking["country"].tolist() == ["Beta"]
+    comparacion = analitica.comparar_paises(casos, ["Alfa", "Beta"]).set_index("country")
+    assert comparacion.loc["Alfa", "casos_100k"] == pytest.approx(casos.loc[casos["country"] == "Alfa", "casos_100k"].mean())
+
+
+def test_indice_paises(paises):
+    indice = analitica.IndicePaises(paises)
+    filas = indice.filas(["BBB"])
+    assert (filas["ISO3"] == "BBB").all()
+    assert len(filas) == (paises["ISO3"] == "BBB").sum()
+    assert indice.paises(["AAA", "ZZZ"]) == ["Alfa"]
+
+
+def test_indice_paises_sin_agregados(dataset):
+    indice = analitica.IndicePaises(dataset.assign(ISO3=dataset["ISO3"].fillna("UNK")))
+    assert set(indice.pais_por_iso) == {"AAA", "BBB"}
+    assert indice.filas(["UNK"]).empty
+    assert len(indice.filas(["AAA"])) == (dataset["ISO3"] == "AAA").sum()
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+import anomalias
+
+
+def _serie(conteos, iso="AAA"):
+    fechas = pd.date_range("2021-01-04", periods=len(conteos), freq="7D")
+    return pd.DataFrame({
+        "ISO3": iso,
+        "indicator": "cases",
+        "country": f"Pais {iso}",
+        "continent": "Europe",
+        "date": fechas,
+        "weekly_count": np.asarray(conteos, dtype=float),
+        "rate_14_day": np.asarray(conteos, dtype=float),
+    })
+
+
+def test_detecta_un_salto():
+    conteos = [100, 104, 98, 101, 99, 103, 100, 102, 400, 101]
+    marcas = anomalias.detectar(_serie(conteos))
+    assert marcas.loc[marcas["anomalia"], "date"].tolist() == [marcas["date"].iloc[8]]
+    assert marcas["quiebre_crecimiento"].iloc[8]
+
+
+def test_conteos_pequenos_no_son_brote():
+    marcas = anomalias.detectar(_serie([1, 1, 1, 1, 1, 1, 1, 1, 5, 1]))
+    assert not marcas["anomalia"].any()
+
+
+def test_series_independientes():
+    df = pd.concat([
+        _serie([100, 104, 98, 101, 99, 103, 100, 102, 400, 101], "AAA"),
+        _serie([400] * 10, "BBB"),
+    ], ignore_index=True)
+    marcas = anomalias.detectar(df)
+    assert set(marcas.loc[marcas["anomalia"], "ISO3"]) == {"AAA"}
+
+
+def test_actualizar_solo_recalcula_las_series_tocadas():
+    previas = anomalias.detectar(pd.concat([_serie([10] * 10, "AAA"), _serie([10] * 10, "BBB")]))
+    nuevo = pd.concat([_serie([10] * 10, "AAA"), _serie([100, 104, 98, 101, 99, 103, 100, 102, 400, 101], "BBB")])
+    marcas = anomalias.actualizar(previas, nuevo, [("BBB", "cases")])
+    assert len(marcas) == 20
+    assert set(marcas.loc[marcas["anomalia"], "ISO3"]) == {"BBB"}
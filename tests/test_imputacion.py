@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from imputacion import METODOS, Imputador
+
+
+@pytest.fixture
+def casos(dataset):
+    """Casos de los dos paises, con un hueco en Alfa en la semana 3."""
+    df = dataset[(dataset["indicator"] == "cases") & dataset["ISO3"].notna()].reset_index(drop=True)
+    df.loc[(df["ISO3"] == "AAA") & (df["year_week"] == "2020-03"), "weekly_count"] = np.nan
+    return df
+
+
+def _hueco(df):
+    return df.loc[(df["ISO3"] == "AAA") & (df["year_week"] == "2020-03"), "weekly_count"].iloc[0]
+
+
+def test_ninguno_devuelve_el_mismo_dataset(casos):
+    assert Imputador(casos).aplicar("Ninguno") is casos
+
+
+def test_media_por_pais_usa_solo_su_pais(casos):
+    llenado = Imputador(casos).aplicar("Media por Pais", ["weekly_count"])
+    alfa = casos.loc[casos["ISO3"] == "AAA", "weekly_count"]
+    assert _hueco(llenado) == pytest.approx(alfa.mean())
+
+
+def test_ffill_y_interpolacion(casos):
+    imputador = Imputador(casos)
+    # Alfa: 10, 20, _, 40
+    assert _hueco(imputador.aplicar("Forward-fill por Pais (fecha)", ["weekly_count"])) == 20
+    assert _hueco(imputador.aplicar("Interpolacion lineal por Pais (fecha)", ["weekly_count"])) == pytest.approx(30)
+
+
+def test_todos_los_metodos_llenan_el_hueco(casos):
+    imputador = Imputador(casos)
+    for metodo in list(METODOS)[1:]:
+        assert not np.isnan(_hueco(imputador.aplicar(metodo, ["weekly_count"])))
+
+
+def test_estadisticas_se_memorizan(casos):
+    imputador = Imputador(casos)
+    assert imputador.estadisticas("country", "mean") is imputador.estadisticas("country", "mean")
+
+
+@pytest.fixture
+def con_huecos(dataset):
+    """Hueco en las muertes de Alfa en la semana 3; los casos de esa fecha si tienen dato."""
+    df = dataset[dataset["ISO3"] == "AAA"].reset_index(drop=True)
+    hueco = (df["indicator"] == "deaths") & (df["year_week"] == "2020-03")
+    df.loc[hueco, "weekly_count"] = np.nan
+    return df, hueco.to_numpy()
+
+
+def _muertes(df):
+    return df.loc[df["indicator"] == "deaths", "weekly_count"]
+
+
+@pytest.mark.parametrize("metodo", ["Media por Pais", "Mediana por Pais", "Media por Continente", "Media por Indicador"])
+def test_estadisticas_no_mezclan_indicadores(con_huecos, metodo):
+    df, hueco = con_huecos
+    llenado = Imputador(df).aplicar(metodo, ["weekly_count"])
+    valor = llenado.loc[hueco, "weekly_count"].iloc[0]
+    muertes = _muertes(df).dropna()
+    assert muertes.min() <= valor <= muertes.max()
+
+
+def test_llenar_con_media_usa_todo_el_dataset(con_huecos):
+    df, hueco = con_huecos
+    llenado = Imputador(df).aplicar("Llenar con Media", ["weekly_count"])
+    assert llenado.loc[hueco, "weekly_count"].iloc[0] == pytest.approx(df["weekly_count"].mean())
+    por_indicador = Imputador(df).aplicar("Media por Indicador", ["weekly_count"])
+    assert por_indicador.loc[hueco, "weekly_count"].iloc[0] == pytest.approx(_muertes(df).mean())
+
+
+def test_ffill_usa_la_semana_previa_de_la_misma_serie(con_huecos):
+    df, hueco = con_huecos
+    llenado = Imputador(df).aplicar("Forward-fill por Pais (fecha)", ["weekly_count"])
+    semana_2 = df.loc[(df["indicator"] == "deaths") & (df["year_week"] == "2020-02"), "weekly_count"].iloc[0]
+    assert llenado.loc[hueco, "weekly_count"].iloc[0] == semana_2
+
+
+def test_interpolacion_dentro_de_la_serie(con_huecos):
+    df, hueco = con_huecos
+    llenado = Imputador(df).aplicar("Interpolacion lineal por Pais (fecha)", ["weekly_count"])
+    # muertes de Alfa: 1, 2, _, 4 ... -> 3 (los casos de esa fecha valen 30)
+    assert llenado.loc[hueco, "weekly_count"].iloc[0] == pytest.approx(3.0)
+
+
+def test_orden_temporal_agrupa_por_pais_e_indicador(dataset):
+    orden, grupos, t = Imputador(dataset).orden_temporal()
+    ordenado = dataset.iloc[orden]
+    series = ordenado.groupby(grupos, sort=False)
+    assert series.ngroups == dataset.groupby(["country", "indicator"]).ngroups
+    assert (series["indicator"].nunique() == 1).all()
+    assert all(np.all(np.diff(t[grupos == g]) >= 0) for g in np.unique(grupos))
+    assert isinstance(ordenado, pd.DataFrame)
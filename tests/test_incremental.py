@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from incremental import anexar_semanas, estado_cola
+
+DERIVADAS = ["cumulative_count", "rate_14_day", "casos_100k", "letalidad_pct"]
+ENTRADA = ["country", "ISO3", "continent", "population", "indicator", "weekly_count", "year_week", "date"]
+
+
+def _partir(dataset, ultima="2020-10"):
+    base = dataset[dataset["year_week"] < ultima].reset_index(drop=True)
+    nuevas = dataset.loc[dataset["year_week"] == ultima, ENTRADA].reset_index(drop=True)
+    return base, nuevas
+
+
+def test_cola_incluye_series_sin_iso3(dataset):
+    cola = estado_cola(dataset)
+    assert ("Europe (total)", "cases") in cola.index
+    assert len(cola) == dataset.groupby(["country", "indicator"]).ngroups
+
+
+def test_anexo_continua_las_derivadas(dataset):
+    base, nuevas = _partir(dataset)
+    total, _, reporte = anexar_semanas(base, nuevas)
+
+    assert reporte["filas"] == len(nuevas)
+    assert all(isinstance(iso, str) for iso, _ in reporte["series"])
+    anexadas = total.iloc[len(base):].set_index(["country", "indicator"]).sort_index()
+    esperadas = dataset[dataset["year_week"] == "2020-10"].set_index(["country", "indicator"]).sort_index()
+    for col in DERIVADAS:
+        pd.testing.assert_series_equal(anexadas[col], esperadas[col], check_dtype=False, rtol=1e-9)
+    # los totales no arrancan desde cero
+    assert anexadas.loc[("Europe (total)", "cases"), "cumulative_count"] == pytest.approx(
+        esperadas.loc[("Europe (total)", "cases"), "cumulative_count"]
+    )
+
+
+def test_anexo_descarta_semanas_existentes(dataset):
+    base, nuevas = _partir(dataset)
+    repetidas = dataset.loc[dataset["year_week"] == "2020-09", ENTRADA]
+    _, _, reporte = anexar_semanas(base, pd.concat([nuevas, repetidas], ignore_index=True))
+    assert reporte["filas"] == len(nuevas)
+    assert reporte["descartadas"] == len(repetidas)
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingesta import CLAVE_NATURAL, clave_archivo, detectar_duplicados, hash_filas, resolver_csv
+
+
+@pytest.fixture
+def paises(dataset):
+    return dataset[dataset["ISO3"].notna()].reset_index(drop=True)
+
+
+def test_totales_sin_iso3_no_son_duplicados_por_clave(dataset):
+    mascara, grupos = detectar_duplicados(dataset, hash_filas(dataset, CLAVE_NATURAL))
+    assert mascara.all()
+    assert grupos.empty
+
+
+def test_duplicado_por_clave_natural(dataset):
+    df = pd.concat([dataset, dataset.iloc[[0]].assign(weekly_count=-1.0)], ignore_index=True)
+    mascara, grupos = detectar_duplicados(df, hash_filas(df, CLAVE_NATURAL))
+    assert (~mascara).sum() == 1
+    assert not mascara[-1]
+    assert grupos[["ISO3", "indicator", "year_week", "filas"]].iloc[0].tolist() == ["AAA", "cases", "2020-01", 2]
+
+
+def test_colision_de_hash_no_descarta_filas(dataset):
+    hashes = np.zeros(len(dataset), dtype=np.uint64)
+    mascara, grupos = detectar_duplicados(dataset, hashes)
+    assert mascara.all()
+    assert grupos.empty
+
+
+def test_filas_exactas(paises):
+    df = pd.concat([paises, paises.iloc[[3, 3]]], ignore_index=True)
+    mascara, grupos = detectar_duplicados(df, hash_filas(df))
+    assert (~mascara).sum() == 2
+    assert grupos["filas"].tolist() == [3]
+
+
+def test_filas_exactas_incluye_totales_repetidos(dataset):
+    total = dataset[dataset["ISO3"].isna()].iloc[[0]]
+    df = pd.concat([dataset, total], ignore_index=True)
+    mascara, _ = detectar_duplicados(df, hash_filas(df), columnas=None)
+    assert (~mascara).sum() == 1
+
+
+def test_faltan_columnas_de_la_clave(dataset):
+    df = dataset.drop(columns="year_week")
+    with pytest.raises(ValueError, match="year_week"):
+        hash_filas(df, CLAVE_NATURAL)
+    with pytest.raises(ValueError, match="year_week"):
+        detectar_duplicados(df, hash_filas(df))
+
+
+def test_clave_archivo_cambia_con_opciones_y_contenido(tmp_path):
+    ruta = tmp_path / "datos.csv"
+    ruta.write_text("a\n1\n")
+    clave = clave_archivo(str(ruta), dup=True)
+    assert clave == clave_archivo(str(ruta), dup=True)
+    assert clave != clave_archivo(str(ruta), dup=False)
+    ruta.write_text("a\n1\n2\n")
+    assert clave != clave_archivo(str(ruta), dup=True)
+
+
+def test_resolver_csv_solo_dentro_del_directorio(tmp_path):
+    datos = tmp_path / "datos"
+    datos.mkdir()
+    (datos / "extracto.csv").write_text("a\n1\n")
+    (tmp_path / "fuera.csv").write_text("a\n1\n")
+    (datos / "enlace.csv").symlink_to(tmp_path / "fuera.csv")
+
+    assert resolver_csv("extracto.csv", datos) == str((datos / "extracto.csv").resolve())
+    for nombre in ("../fuera.csv", str(tmp_path / "fuera.csv"), "enlace.csv", "no_existe.csv"):
+        with pytest.raises(ValueError):
+            resolver_csv(nombre, datos)
+
+
+def test_ingesta_por_bloques(dataset, tmp_path):
+    pytest.importorskip("pyarrow")
+    from ingesta import ingerir_por_bloques
+
+    ruta = tmp_path / "datos.csv"
+    pd.concat([dataset, dataset.iloc[:5]], ignore_index=True).to_csv(ruta, index=False)
+
+    almacen = ingerir_por_bloques(str(ruta), "clave", directorio=str(tmp_path / "almacen"), tamano_bloque=7)
+    # las 5 filas repetidas caen en otro bloque que el original
+    assert almacen.meta["filas"] == len(dataset) + 5
+    assert almacen.meta["duplicados"] == 5
+    assert almacen.indicadores == ["cases", "deaths"]
+    assert almacen.continentes == ["Europe"]
+
+    casos = almacen.consultar("cases", ["Europe"])
+    assert len(casos) == (dataset["indicator"] == "cases").sum()
+    assert (casos["indicator"] == "cases").all()
+    assert almacen.consultar("cases", []).empty
+
+
+def test_ingesta_por_bloques_deduplica_entre_bloques(dataset, tmp_path):
+    pytest.importorskip("pyarrow")
+    from ingesta import ingerir_por_bloques
+
+    repetidas = dataset.iloc[:5]
+    ruta = tmp_path / "datos.csv"
+    pd.concat([dataset, repetidas], ignore_index=True).to_csv(ruta, index=False)
+
+    almacen = ingerir_por_bloques(
+        str(ruta), "clave", por_clave_natural=True, directorio=str(tmp_path / "almacen"), tamano_bloque=7
+    )
+    # Las 5 repetidas caen en otro bloque; los totales sin ISO3 no colisionan entre si
+    assert almacen.meta["duplicados"] == 5
+    casos = almacen.consultar("cases", ["Europe"])
+    assert len(casos) == (dataset["indicator"] == "cases").sum()
+
+
+def test_ingesta_por_bloques_no_imputa_iso3_a_los_totales(dataset, tmp_path):
+    pytest.importorskip("pyarrow")
+    from ingesta import ingerir_por_bloques
+
+    # un pais sin ISO3 si se imputa; los "(total)" quedan sin ISO3
+    df = dataset.assign(ISO3=dataset["ISO3"].mask(dataset["country"] == "Alfa"))
+    ruta = tmp_path / "datos.csv"
+    df.to_csv(ruta, index=False)
+
+    almacen = ingerir_por_bloques(str(ruta), "clave", directorio=str(tmp_path / "almacen"), tamano_bloque=7)
+    assert almacen.meta["iso_imputados"] == (df["country"] == "Alfa").sum()
+    casos = almacen.consultar("cases", ["Europe"]).set_index("country")
+    assert (casos.loc["Alfa", "ISO3"] == "UNK").all()
+    assert casos.loc[["Europe (total)", "EU/EEA (total)"], "ISO3"].isna().all()
+    # la serie "UNK" de anomalias es solo la del pais, sin los totales mezclados
+    marcas = almacen.anomalias("cases", ["Europe"])
+    assert set(marcas.loc[marcas["ISO3"] == "UNK", "country"]) == {"Alfa"}
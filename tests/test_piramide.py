@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from analitica import metricas_resumen
+from piramide import Piramide, es_agregado, etiqueta_periodo
+
+
+@pytest.fixture
+def casos(dataset):
+    return dataset[dataset["ISO3"].notna() & (dataset["indicator"] == "cases")].reset_index(drop=True)
+
+
+def test_periodos_y_nivel(casos):
+    piramide = Piramide(casos)
+    assert len(piramide.periodos("semana")) == 10
+    assert len(piramide.periodos("mes")) == 3
+    assert piramide.nivel_para(10) == "semana"
+    assert piramide.nivel_para(5) == "mes"
+
+
+def test_mes_suma_las_semanas(casos):
+    mes = Piramide(casos).paises("mes").set_index(["ISO3", "date"])
+    enero = mes.loc[("AAA", pd.Timestamp("2020-01-01"))]
+    assert enero["weekly_count"] == 10 * (1 + 2 + 3 + 4)
+    assert enero["semanas"] == 4
+    assert enero["casos_100k"] == pytest.approx(100 / 100_000 * 1e5)
+
+
+def test_etiqueta_periodo():
+    assert etiqueta_periodo("2020-05-04", "trimestre") == "2020-T2"
+    assert etiqueta_periodo("2020-05-04", "mes") == "2020-05"
+
+
+def test_es_agregado(dataset):
+    assert set(dataset.loc[es_agregado(dataset), "country"]) == {"Europe (total)", "EU/EEA (total)"}
+    # con el ISO3 imputado ("UNK") se reconocen por el nombre
+    assert es_agregado(dataset.assign(ISO3=dataset["ISO3"].fillna("UNK"))).sum() == es_agregado(dataset).sum()
+
+
+def test_continente_ponderado_por_poblacion(casos):
+    continente = Piramide(casos).continentes("semana")
+    assert (continente["population"] == 400_000).all()
+    assert (continente["paises"] == 2).all()
+    primera = continente.iloc[0]
+    assert primera["weekly_count"] == 40
+    assert primera["casos_100k"] == pytest.approx(40 / 400_000 * 1e5)
+
+
+def test_mundo_y_resumen(casos):
+    piramide = Piramide(casos)
+    assert (piramide.mundo("mes")["population"] == 400_000).all()
+    resumen = piramide.resumen_continentes()
+    assert resumen.loc["Europe", "Poblacion"] == 400_000
+    assert resumen.loc["Europe", "Conteo total"] == casos["weekly_count"].sum()
+    assert metricas_resumen(casos, piramide).paises == 2
+
+
+def test_continente_sin_doble_conteo(dataset):
+    piramide = Piramide(dataset[dataset["indicator"] == "cases"])
+    continente = piramide.continentes("semana")
+    assert (continente["population"] == 400_000).all()
+    assert (continente["paises"] == 2).all()
+    assert continente.iloc[0]["weekly_count"] == 40
+    assert (piramide.mundo("mes")["population"] == 400_000).all()
+    assert piramide.resumen_continentes().loc["Europe", "Conteo total"] == dataset.loc[
+        (dataset["indicator"] == "cases") & dataset["ISO3"].notna(), "weekly_count"
+    ].sum()
+
+
+def test_nivel_pais_conserva_los_agregados(dataset):
+    casos = dataset[dataset["indicator"] == "cases"]
+    assert metricas_resumen(casos).paises == casos["country"].nunique() == 4
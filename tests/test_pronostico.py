@@ -0,0 +1,30 @@
+import pandas as pd
+
+from conftest import construir_dataset
+from pronostico import MIN_SEMANAS, Pronosticador, series_por_pais
+
+
+def test_series_por_pais_sin_agregados():
+    df = construir_dataset(semanas=MIN_SEMANAS)
+    # con el ISO3 imputado los dos "(total)" comparten "UNK"
+    series = series_por_pais(df.assign(ISO3=df["ISO3"].fillna("UNK")), "weekly_count")
+    assert set(series) == {("AAA", "cases"), ("AAA", "deaths"), ("BBB", "cases"), ("BBB", "deaths")}
+    assert all(len(valores) == MIN_SEMANAS for _, valores in series.values())
+
+
+def test_cache_acotado_lru():
+    fechas = pd.date_range("2020-01-06", periods=MIN_SEMANAS, freq="7D").to_numpy()
+    series = {(iso, "cases"): (fechas, [float(i)] * MIN_SEMANAS) for i, iso in enumerate(["AAA", "BBB", "CCC"])}
+    pronosticador = Pronosticador(max_procesos=1, max_entradas=2)
+    try:
+        pronosticador.pronosticar(dict(list(series.items())[:2]), "weekly_count", "ets", 4)
+        # "AAA" se vuelve a usar: el desalojado al entrar "CCC" es "BBB"
+        _, estadisticas = pronosticador.pronosticar({("AAA", "cases"): series[("AAA", "cases")]}, "weekly_count", "ets", 4)
+        assert estadisticas["desde_cache"] == 1
+        pronosticador.pronosticar({("CCC", "cases"): series[("CCC", "cases")]}, "weekly_count", "ets", 4)
+        assert pronosticador.desalojos == 1
+        _, estadisticas = pronosticador.pronosticar(series, "weekly_count", "ets", 4)
+        assert estadisticas["ajustadas"] == 1
+    finally:
+        if pronosticador._pool is not None:
+            pronosticador._pool.shutdown()
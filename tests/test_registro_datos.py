@@ -0,0 +1,110 @@
+import threading
+
+import pandas as pd
+
+from registro_datos import RegistroDatasets, bytes_propios
+
+
+def _contenido(dataset):
+    return dataset.to_csv(index=False).encode()
+
+
+def test_sesiones_comparten_el_dataset(dataset):
+    registro = RegistroDatasets()
+    lecturas = []
+
+    def lector(buffer):
+        lecturas.append(1)
+        return pd.read_csv(buffer)
+
+    a = registro.adquirir("base", _contenido(dataset), "s1", lector=lector)
+    b = registro.adquirir("base", _contenido(dataset), "s2", lector=lector)
+    assert len(lecturas) == 1
+    assert len(a) == len(b) == len(dataset)
+    assert registro.estadisticas("base")["sesiones"] == 2
+
+
+def test_cambiar_de_archivo_suelta_el_anterior(dataset):
+    registro = RegistroDatasets()
+    registro.adquirir("a", _contenido(dataset), "s1")
+    registro.adquirir("b", _contenido(dataset.head(10)), "s1")
+    assert registro.base("a") is None
+    assert len(registro.base("b")) == 10
+
+
+def test_purgar_sesiones_cerradas(dataset):
+    registro = RegistroDatasets()
+    registro.adquirir("base", _contenido(dataset), "s1")
+    registro.adquirir("base", _contenido(dataset), "s2")
+    registro.purgar(lambda s: s == "s2")
+    assert registro.estadisticas("base")["sesiones"] == 1
+    registro.liberar("s2")
+    assert registro.base("base") is None
+
+
+def test_duplicados_se_calculan_una_vez(dataset):
+    registro = RegistroDatasets()
+    df = pd.concat([dataset, dataset.iloc[[0]]], ignore_index=True)
+    registro.adquirir("base", _contenido(df), "s1")
+    mascara, _ = registro.duplicados("base", "exactas")
+    assert (~mascara).sum() == 1
+    assert registro.duplicados("base", "exactas")[0] is mascara
+
+
+def test_adquirir_si_existe(dataset):
+    registro = RegistroDatasets()
+    assert registro.adquirir_si_existe("base", "s1") is None
+
+    registro.adquirir("base", _contenido(dataset), "s1")
+    vista = registro.adquirir_si_existe("base", "s2")
+    assert len(vista) == len(dataset)
+    assert registro.estadisticas("base")["sesiones"] == 2
+
+    # la sesion queda referenciando el dataset: no se purga
+    registro.purgar(lambda s: s == "s2")
+    assert registro.adquirir_si_existe("base", "s2") is not None
+
+
+def test_duplicados_del_registro_no_descartan_totales(dataset):
+    registro = RegistroDatasets()
+    registro.adquirir("base", _contenido(dataset), "s1")
+    mascara, grupos = registro.duplicados("base", "clave")
+    assert mascara.all() and grupos.empty
+
+
+def test_vista_superficial_no_tiene_bytes_propios(dataset):
+    registro = RegistroDatasets()
+    vista = registro.adquirir("base", _contenido(dataset), "s1")
+    base = registro.base("base")
+    assert bytes_propios(vista, base) < 1024
+    con_columna = vista.assign(nueva=1.0)
+    assert bytes_propios(con_columna, base) >= con_columna["nueva"].nbytes
+
+
+def test_el_parseo_no_bloquea_el_registro(dataset):
+    registro = RegistroDatasets()
+    registro.adquirir("otra", _contenido(dataset.head(5)), "s0")
+    empezo, seguir = threading.Event(), threading.Event()
+    lecturas = []
+
+    def lector(buffer):
+        lecturas.append(1)
+        empezo.set()
+        seguir.wait(5)
+        return pd.read_csv(buffer)
+
+    hilos = [
+        threading.Thread(target=registro.adquirir, args=("base", _contenido(dataset), s, lector))
+        for s in ("s1", "s2")
+    ]
+    for hilo in hilos:
+        hilo.start()
+    assert empezo.wait(5)
+    # mientras se parsea "base", el resto del registro sigue respondiendo
+    assert registro.adquirir_si_existe("otra", "s3") is not None
+    assert registro.base("base") is None
+    seguir.set()
+    for hilo in hilos:
+        hilo.join(5)
+    assert len(lecturas) == 1
+    assert registro.estadisticas("base")["sesiones"] == 2